@@ -0,0 +1,290 @@
+import os
+import csv
+import json
+import calendar
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Define file paths
+current_dir = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.join(current_dir, 'data')
+AGGREGATES_FILE = os.path.join(data_dir, 'attendance_aggregates.json')
+ATTENDANCE_HISTORY_FILE = os.path.join(data_dir, 'attendance_history.json')
+ATTENDANCE_DIR = os.path.join(data_dir, 'attendance')
+
+# Number of sessions kept in each student's recent attendance list
+RECENT_LIMIT = 10
+
+_lock = threading.RLock()
+_cache = {'mtime': None, 'data': None}
+
+
+def session_key(record: Dict[str, Any]) -> str:
+    """Get a stable key for an attendance session record"""
+    if record.get('id'):
+        return record['id']
+    return f"{record.get('date')}_{record.get('time')}"
+
+
+def session_marks(record: Dict[str, Any], attendance_data: Optional[List[dict]] = None) -> List[Tuple[str, str, bool]]:
+    """
+    Get (student_id, name, present) tuples for a session
+    Uses attendance_data when given, otherwise the embedded records or the session CSV
+    """
+    if attendance_data is not None:
+        return [
+            (item.get('student_id'), item.get('name', ''), bool(item.get('present')))
+            for item in attendance_data
+        ]
+
+    if 'records' in record:
+        return [
+            (item.get('student_id'), item.get('student_name', ''), item.get('status') == 'Present')
+            for item in record.get('records', [])
+        ]
+
+    marks = []
+    attendance_file = os.path.join(ATTENDANCE_DIR, record.get('attendance_file', ''))
+    if record.get('attendance_file') and os.path.exists(attendance_file):
+        try:
+            with open(attendance_file, 'r', newline='') as f:
+                for row in csv.DictReader(f):
+                    marks.append((row.get('Student ID'), row.get('Name', ''), row.get('Present') == '1'))
+        except Exception as e:
+            print(f"Error reading attendance file: {e}")
+    return marks
+
+
+def _new_student(record: Dict[str, Any], name: str) -> Dict[str, Any]:
+    return {
+        'name': name,
+        'department': record.get('department'),
+        'year': record.get('year'),
+        'division': record.get('division'),
+        'present': 0,
+        'total': 0,
+        'cells': {},
+        'recent': []
+    }
+
+
+def _apply(data: Dict[str, Any], record: Dict[str, Any], marks: Iterable[Tuple[str, str, bool]], sign: int):
+    """Add (sign=1) or remove (sign=-1) a session's marks from the counters"""
+    students = data['students']
+    key = session_key(record)
+    subject = record.get('subject')
+    date = record.get('date', '')
+    month = date[:7]
+    cell_key = f"{subject}|{month}"
+
+    for student_id, name, present in marks:
+        if not student_id:
+            continue
+
+        entry = students.get(student_id)
+        if entry is None:
+            if sign < 0:
+                continue
+            entry = students[student_id] = _new_student(record, name)
+
+        cell = entry['cells'].setdefault(cell_key, {
+            'subject': subject,
+            'month': month,
+            'present': 0,
+            'total': 0
+        })
+        cell['total'] += sign
+        cell['present'] += sign * int(present)
+        entry['total'] += sign
+        entry['present'] += sign * int(present)
+
+        if cell['total'] <= 0:
+            del entry['cells'][cell_key]
+
+        # Keep the recent list ordered newest first and bounded
+        recent = [r for r in entry['recent'] if r.get('session') != key]
+        if sign > 0:
+            recent.append({
+                'session': key,
+                'date': date,
+                'subject': subject,
+                'teacher_name': record.get('teacher_name'),
+                'present': present
+            })
+            recent.sort(key=lambda r: r.get('date') or '', reverse=True)
+            recent = recent[:RECENT_LIMIT]
+        entry['recent'] = recent
+
+        if entry['total'] <= 0:
+            del students[student_id]
+
+
+def _write(data: Dict[str, Any]):
+    directory = os.path.dirname(AGGREGATES_FILE)
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    temp_file = f"{AGGREGATES_FILE}.tmp"
+    with open(temp_file, 'w') as f:
+        json.dump(data, f)
+    os.replace(temp_file, AGGREGATES_FILE)
+
+    _cache['mtime'] = os.path.getmtime(AGGREGATES_FILE)
+    _cache['data'] = data
+
+
+def rebuild_aggregates() -> Dict[str, Any]:
+    """Rebuild all counters from the attendance history (used once for migration)"""
+    with _lock:
+        data = {'students': {}}
+
+        history = []
+        if os.path.exists(ATTENDANCE_HISTORY_FILE):
+            with open(ATTENDANCE_HISTORY_FILE, 'r') as f:
+                history = json.load(f)
+
+        for record in history:
+            _apply(data, record, session_marks(record), 1)
+
+        _write(data)
+        return data
+
+
+def _load() -> Tuple[Dict[str, Any], bool]:
+    """
+    The counters and whether they were just rebuilt from the history. Sessions are saved to
+    the history before they are recorded here, so a rebuild already includes the change
+    """
+    with _lock:
+        if not os.path.exists(AGGREGATES_FILE):
+            return rebuild_aggregates(), True
+
+        mtime = os.path.getmtime(AGGREGATES_FILE)
+        if _cache['data'] is None or _cache['mtime'] != mtime:
+            with open(AGGREGATES_FILE, 'r') as f:
+                _cache['data'] = json.load(f)
+            _cache['mtime'] = mtime
+        return _cache['data'], False
+
+
+def load_aggregates() -> Dict[str, Any]:
+    """Load the counters, reusing the in-process copy while the file is unchanged"""
+    return _load()[0]
+
+
+def record_session(record: Dict[str, Any], attendance_data: Optional[List[dict]] = None):
+    """Add a newly recorded session to the counters"""
+    try:
+        with _lock:
+            data, rebuilt = _load()
+            if rebuilt:
+                return
+            _apply(data, record, session_marks(record, attendance_data), 1)
+            _write(data)
+    except Exception as e:
+        print(f"Error updating attendance aggregates: {e}")
+
+
+def retract_session(record: Dict[str, Any], attendance_data: Optional[List[dict]] = None):
+    """Remove a deleted session from the counters"""
+    try:
+        with _lock:
+            data, rebuilt = _load()
+            if rebuilt:
+                return
+            _apply(data, record, session_marks(record, attendance_data), -1)
+            _write(data)
+    except Exception as e:
+        print(f"Error updating attendance aggregates: {e}")
+
+
+def correct_session(old_record: Dict[str, Any], new_record: Dict[str, Any],
+                    old_data: Optional[List[dict]] = None, new_data: Optional[List[dict]] = None):
+    """
+    Replace a session's old marks with its corrected marks
+    CSV sessions rewrite their file in place, so pass both sets of marks as attendance data
+    """
+    try:
+        with _lock:
+            data, rebuilt = _load()
+            if rebuilt:
+                return
+            _apply(data, old_record, session_marks(old_record, old_data), -1)
+            _apply(data, new_record, session_marks(new_record, new_data), 1)
+            _write(data)
+    except Exception as e:
+        print(f"Error updating attendance aggregates: {e}")
+
+
+def get_student_aggregate(student_id: str) -> Optional[Dict[str, Any]]:
+    """Get the materialized counters for a single student"""
+    return load_aggregates()['students'].get(student_id)
+
+
+def summarize(entry: Dict[str, Any], subject: Optional[str] = None,
+              start_month: Optional[str] = None, end_month: Optional[str] = None) -> Dict[str, Any]:
+    """Sum a student's cells, optionally restricted to a subject and a month range"""
+    total = 0
+    present = 0
+    by_subject = {}
+
+    for cell in entry.get('cells', {}).values():
+        if subject and cell['subject'] != subject:
+            continue
+        if start_month and cell['month'] < start_month:
+            continue
+        if end_month and cell['month'] > end_month:
+            continue
+
+        stats = by_subject.setdefault(cell['subject'], {'total': 0, 'present': 0})
+        stats['total'] += cell['total']
+        stats['present'] += cell['present']
+        total += cell['total']
+        present += cell['present']
+
+    for stats in by_subject.values():
+        stats['percentage'] = (stats['present'] / stats['total'] * 100) if stats['total'] > 0 else 0
+
+    return {'total': total, 'present': present, 'by_subject': by_subject}
+
+
+def get_class_aggregates(department: Optional[str] = None, year: Optional[str] = None,
+                         division: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Get counters for all students matching the class filters"""
+    result = {}
+    for student_id, entry in load_aggregates()['students'].items():
+        if department and entry.get('department') != department:
+            continue
+        if year and entry.get('year') != year:
+            continue
+        if division and entry.get('division') != division:
+            continue
+        result[student_id] = entry
+    return result
+
+
+def month_span(start_date: Optional[str], end_date: Optional[str]) -> Optional[Tuple[Optional[str], Optional[str]]]:
+    """
+    Convert a date range to a (start_month, end_month) range
+    Returns None when the range does not align with whole months
+    """
+    start_month = None
+    end_month = None
+
+    if start_date:
+        if len(start_date) != 10 or not start_date.endswith('-01'):
+            return None
+        start_month = start_date[:7]
+
+    if end_date:
+        if len(end_date) != 10:
+            return None
+        try:
+            y, m, d = (int(part) for part in end_date.split('-'))
+        except ValueError:
+            return None
+        if d != calendar.monthrange(y, m)[1]:
+            return None
+        end_month = end_date[:7]
+
+    return start_month, end_month
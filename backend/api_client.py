@@ -0,0 +1,215 @@
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from fnmatch import fnmatchcase
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Default API location for the Streamlit app
+API_BASE_URL = "http://localhost:8000"
+
+# Keep-alive connections kept open to the API (also the batch concurrency)
+POOL_SIZE = 10
+
+# Seconds to wait for the API before giving up on a request
+DEFAULT_TIMEOUT = 30
+
+# Most responses kept by a ResponseCache
+CACHE_MAX_ENTRIES = 1024
+
+BatchItem = Union[str, Tuple[str, Optional[Dict[str, Any]]]]
+
+
+def request_key(path: str, params: Optional[Dict[str, Any]], headers: Optional[Dict[str, str]]) -> Tuple:
+    """Identify a GET by path, params and the caller's Authorization header"""
+    authorization = (headers or {}).get("Authorization")
+    return path, tuple(sorted((name, str(value)) for name, value in (params or {}).items())), authorization
+
+
+class ResponseCache:
+    """
+    Cross-rerun cache of successful GET responses, keyed per user token
+    ttls maps path patterns (fnmatch style, e.g. "/api/teachers/*/classes") to
+    seconds; paths without a pattern are never cached. invalidations maps
+    mutation path patterns to the cached path patterns they make stale; a
+    mutation matching no rule drops the whole cache
+    """
+
+    def __init__(self, ttls: Dict[str, float], invalidations: Dict[str, Sequence[str]],
+                 max_entries: int = CACHE_MAX_ENTRIES):
+        self.ttls = ttls
+        self.invalidations = invalidations
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ttl_for(self, path: str) -> Optional[float]:
+        for pattern, ttl in self.ttls.items():
+            if fnmatchcase(path, pattern):
+                return ttl
+        return None
+
+    def get(self, key: Tuple) -> Optional[requests.Response]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, response = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return response
+
+    def put(self, key: Tuple, response: requests.Response, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, patterns: Sequence[str]):
+        """Drop cached responses whose path matches any of the patterns, for every user"""
+        with self._lock:
+            for key in [key for key in self._entries if any(fnmatchcase(key[0], p) for p in patterns)]:
+                del self._entries[key]
+
+    def invalidate_for(self, mutation_path: str):
+        """Drop the responses made stale by a successful POST, PUT or DELETE"""
+        rules = [patterns for mutation, patterns in self.invalidations.items() if fnmatchcase(mutation_path, mutation)]
+        if rules:
+            self.invalidate([pattern for patterns in rules for pattern in patterns])
+        else:
+            self.clear()
+
+    def clear_user(self, headers: Optional[Dict[str, str]]):
+        """Drop every response cached for one Authorization header (e.g. on logout)"""
+        authorization = (headers or {}).get("Authorization")
+        with self._lock:
+            for key in [key for key in self._entries if key[2] == authorization]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class APIClient:
+    """
+    Process-wide HTTP client for the Streamlit app
+    One pooled requests.Session is shared by every page and rerun, so
+    connections to the API are kept alive instead of reopened per call
+    """
+
+    def __init__(self, base_url: str = API_BASE_URL, pool_size: int = POOL_SIZE, timeout: float = DEFAULT_TIMEOUT,
+                 cache: Optional[ResponseCache] = None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.cache = cache
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="api-client")
+
+    def url(self, path: str) -> str:
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, self.url(path), **kwargs)
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None,
+            headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """GET a path, serving and storing successful responses through the cache"""
+        ttl = self.cache.ttl_for(path) if self.cache is not None else None
+        if ttl is None:
+            return self.request("GET", path, params=params, headers=headers)
+
+        key = request_key(path, params, headers)
+        response = self.cache.get(key)
+        if response is None:
+            response = self.request("GET", path, params=params, headers=headers)
+            if response.status_code == 200:
+                self.cache.put(key, response, ttl)
+        return response
+
+    def mutate(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Send a POST, PUT or DELETE and invalidate the cached responses it makes stale"""
+        response = self.request(method, path, **kwargs)
+        if self.cache is not None and response.status_code < 400:
+            self.cache.invalidate_for(path)
+        return response
+
+
+class RequestScope:
+    """
+    Requests made during one Streamlit rerun
+    Identical GETs (same path, params and Authorization header) share one
+    request, whether they are in flight concurrently or repeated later in
+    the rerun. Any POST, PUT or DELETE clears the shared results so later
+    reads see the change
+    """
+
+    def __init__(self, client: APIClient):
+        self.client = client
+        self._responses = {}
+        self._lock = threading.Lock()
+
+    def _submit(self, path: str, params: Optional[Dict[str, Any]], headers: Optional[Dict[str, str]],
+                run_inline: bool) -> Future:
+        key = request_key(path, params, headers)
+        with self._lock:
+            future = self._responses.get(key)
+            if future is not None:
+                return future
+            if not run_inline:
+                future = self.client.executor.submit(self.client.get, path, params, headers)
+                self._responses[key] = future
+                return future
+            future = self._responses[key] = Future()
+
+        try:
+            future.set_result(self.client.get(path, params, headers))
+        except Exception as e:
+            future.set_exception(e)
+            with self._lock:
+                # Failed requests are not shared, so a later call retries
+                if self._responses.get(key) is future:
+                    del self._responses[key]
+        return future
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None,
+            headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """GET a path, reusing an identical request from this rerun"""
+        return self._submit(path, params, headers, run_inline=True).result()
+
+    def batch(self, items: Sequence[BatchItem], headers: Optional[Dict[str, str]] = None) -> List[requests.Response]:
+        """
+        GET several paths concurrently over the pooled connections
+        Items are paths or (path, params) pairs; responses come back in the same order
+        """
+        futures = []
+        for item in items:
+            path, params = (item, None) if isinstance(item, str) else item
+            futures.append(self._submit(path, params, headers, run_inline=False))
+        return [future.result() for future in futures]
+
+    def _mutate(self, method: str, path: str, **kwargs) -> requests.Response:
+        with self._lock:
+            self._responses.clear()
+        return self.client.mutate(method, path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self._mutate("POST", path, **kwargs)
+
+    def put(self, path: str, **kwargs) -> requests.Response:
+        return self._mutate("PUT", path, **kwargs)
+
+    def delete(self, path: str, **kwargs) -> requests.Response:
+        return self._mutate("DELETE", path, **kwargs)
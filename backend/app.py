@@ -1,7 +1,10 @@
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from compression import CompressionMiddleware
 from routers import auth, students, teachers, attendance, admin
 from security import get_current_active_user
+import database
+import recognition
 
 app = FastAPI(title="Facial Attendance System API")
 
@@ -14,6 +17,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress report, history and dashboard payloads (small and binary responses are skipped)
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+
+@app.on_event("startup")
+def prepare_storage():
+    """Create the data files, directories and default admin before serving requests"""
+    database.initialize_db()
+    database.create_admin_if_not_exists()
+
+
+@app.on_event("startup")
+def preload_recognition():
+    """Load the face recognition models up front when RECOGNITION_PRELOAD is set"""
+    if recognition.preload_requested():
+        recognition.preload()
+
+
 # Include routers
 app.include_router(auth.router, tags=["Authentication"])
 app.include_router(students.router, prefix="/students", tags=["Students"])
@@ -1,17 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form, BackgroundTasks, Query
 from typing import List, Optional, Dict, Any
 from datetime import datetime
-import cv2
-import numpy as np
+from collections import Counter
 import os
-import io
-from PIL import Image
 import json
+import copy
 
 from models import User, UserRole
 from security import get_current_active_user, is_admin, is_teacher
 import database as db
-from deepface.DeepFace import verify, extract_faces
+import aggregates
+import rollups
+import report_cache
+import events
+import history_index
+import pagination
+import serialization
+import recognition
 
 router = APIRouter(tags=["attendance"])
 
@@ -24,70 +29,157 @@ base_dirs = {
     'temp': os.path.join(data_dir, 'temp')
 }
 
-# Ensure directories exist
-for dir_path in base_dirs.values():
-    if not os.path.exists(dir_path):
-        os.makedirs(dir_path)
 
-
-def process_face(face_img):
-    """Process face array to ensure correct format"""
-    try:
-        if isinstance(face_img, dict) and 'face' in face_img and isinstance(face_img['face'], np.ndarray):
-            face_img = face_img['face']
-        
-        if not isinstance(face_img, np.ndarray):
-            face_img = np.array(face_img)
-        
-        if face_img.dtype != np.uint8:
-            if face_img.dtype in [np.float32, np.float64]:
-                face_img = (face_img * 255).astype(np.uint8)
-            else:
-                face_img = face_img.astype(np.uint8)
-        
-        if len(face_img.shape) == 3 and face_img.shape[2] == 3:
-            if not hasattr(face_img, 'color_format') or face_img.color_format != 'BGR':
-                face_img = cv2.cvtColor(face_img, cv2.COLOR_RGB2BGR)
-        elif len(face_img.shape) == 2:
-            face_img = cv2.cvtColor(face_img, cv2.COLOR_GRAY2BGR)
-        
-        face_img = cv2.fastNlMeansDenoisingColored(face_img, None, 10, 10, 7, 21)
-        face_img = cv2.detailEnhance(face_img, sigma_s=10, sigma_r=0.15)
+def class_students(department: str, year: str, division: str, subject: str) -> List[Dict[str, Any]]:
+    """The students of a class taking a subject, with their photo files"""
+    students = []
+    storage = db.load_storage()
+    for filename, data in storage.get('students_data', {}).items():
+        # Filter by class info
+        if (data.get('department') == department and 
+            data.get('year') == year and 
+            data.get('division') == division and
+            subject in data.get('subjects', [])):
             
-        return face_img
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing face: {str(e)}")
+            students.append({
+                'name': data.get('name'),
+                'student_id': data.get('id'),
+                'filename': filename,
+                'templates': data.get('templates', [])
+            })
+    return students
 
 
-def verify_face(img1_path: str, img2_path: str) -> dict:
-    """Compare two face images using ArcFace"""
-    try:
-        img1 = cv2.imread(img1_path)
-        img2 = cv2.imread(img2_path)
+async def recognize_photos(photos: List[UploadFile], students: List[Dict[str, Any]],
+                           first_photo_number: int = 1, added_by: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Find students in uploaded class photos, numbered from first_photo_number
+    Returns the Present 'records' of the students found, the 'photos' with their provenance,
+    and the 'face_quality' and 'matching' summaries
+    """
+    # Each student's templates (enrollment photos and captured faces), compared through their centroid
+    references = recognition.student_templates([
+        (student['student_id'], [
+            os.path.join(base_dirs['student_images'], photo)
+            for photo in [student['filename']] + student['templates']
+        ])
+        for student in students
+    ])
+    matcher = recognition.EarlyExitMatcher(
+        references,
+        confident=recognition.config.EARLY_EXIT_THRESHOLD if recognition.config.EARLY_EXIT else None
+    )
+    
+    # Faces are embedded in batches of BATCH_SIZE as they are found, and matched batch by batch,
+    # so detection and embedding stop once every student is matched
+    pending_crops = []
+    crop_sources = []
+    # Faces too small, blurry or turned away to embed, per reason
+    faces_detected = 0
+    faces_rejected = Counter()
+    stopped_early = False
+    photo_info = []
+    
+    def match_pending():
+        matcher.add(recognition.embed_crops(pending_crops))
+        pending_crops.clear()
+    
+    # Roughly how many faces each photo should hold, so a detector cascade can tell when it missed some
+    expected_faces = (len(students) + len(photos) - 1) // len(photos)
+    last_photo_number = first_photo_number + len(photos) - 1
+    for photo_number, photo in enumerate(photos, start=first_photo_number):
+        info = {
+            'photo_number': photo_number,
+            'added_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'added_by': added_by
+        }
+        photo_info.append(info)
+        if matcher.done:
+            stopped_early = True
+            info['skipped'] = True
+            continue
         
-        if img1 is None or img2 is None:
-            raise ValueError("Could not load images")
+        # Save uploaded photo temporarily
+        contents = await photo.read()
+        temp_path = os.path.join(base_dirs['temp'], f"class_{photo_number}.jpg")
+        with open(temp_path, "wb") as f:
+            f.write(contents)
         
-        result = verify(
-            img1_path=img1_path,
-            img2_path=img2_path,
-            model_name='ArcFace',
-            detector_backend='retinaface',
-            enforce_detection=False,
-            distance_metric='cosine',
-            align=True,
-            normalization='base'
-        )
+        # Detect faces
+        faces = recognition.extract_faces(temp_path, expected_faces)
+        kept, rejected = recognition.quality_gate(faces)
+        faces_detected += len(faces)
+        faces_rejected.update(rejected)
+        info['faces_detected'] = len(faces)
         
-        similarity = (1 - result['distance']) * 100
-        return {
-            'verified': similarity >= 50,
-            'similarity': similarity,
-            'distance': result['distance'],
-            'model': 'ArcFace'
+        for face_idx, face in kept:
+            if matcher.done:
+                stopped_early = True
+                break
+            processed_face = recognition.process_face(face)
+            if processed_face is not None:
+                pending_crops.append(processed_face)
+                crop_sources.append((photo_number, face_idx))
+            if len(pending_crops) >= recognition.config.BATCH_SIZE:
+                match_pending()
+        
+        # Match what is left of this photo before detecting the next one, which may not be needed
+        if pending_crops and photo_number < last_photo_number and matcher.confident is not None:
+            match_pending()
+    
+    if pending_crops:
+        match_pending()
+    
+    results = []
+    captures = []
+    matched_per_photo = Counter()
+    for face, student_idx, similarity in matcher.matches():
+        photo_number, face_idx = crop_sources[face]
+        student = students[student_idx]
+        matched_per_photo[photo_number] += 1
+        if recognition.config.TEMPLATE_CAPTURES and similarity >= recognition.config.CAPTURE_THRESHOLD:
+            captures.append((student['student_id'], matcher.probes[face]))
+        results.append({
+            'student_name': student['name'],
+            'student_id': student['student_id'],
+            'status': 'Present',
+            'confidence': similarity,
+            'photo_number': photo_number,
+            'face_number': face_idx,
+            'model': recognition.config.MODEL_NAME,
+            'manually_corrected': False
+        })
+    
+    recognition.add_captures(captures)
+    for info in photo_info:
+        if not info.get('skipped'):
+            info['students_matched'] = matched_per_photo[info['photo_number']]
+    
+    return {
+        'records': results,
+        'photos': photo_info,
+        'face_quality': recognition.quality.summary(faces_detected, faces_rejected),
+        'matching': {
+            'faces_embedded': len(matcher.probes),
+            'comparisons': matcher.comparisons,
+            'stopped_early': stopped_early
         }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Face verification error: {str(e)}")
+    }
+
+
+def merge_recognized(record: Dict[str, Any], recognized: Dict[str, Any]):
+    """Add the photos, face_quality and matching of photos added later to a session record"""
+    record.setdefault('photos', []).extend(recognized['photos'])
+    
+    quality = record.setdefault('face_quality', {'detected': 0, 'kept': 0, 'rejected': {}})
+    quality['detected'] += recognized['face_quality']['detected']
+    quality['kept'] += recognized['face_quality']['kept']
+    for reason, count in recognized['face_quality']['rejected'].items():
+        quality['rejected'][reason] = quality['rejected'].get(reason, 0) + count
+    matching = record.setdefault('matching', {'faces_embedded': 0, 'comparisons': 0, 'stopped_early': False})
+    matching['faces_embedded'] += recognized['matching']['faces_embedded']
+    matching['comparisons'] += recognized['matching']['comparisons']
+    matching['stopped_early'] = matching['stopped_early'] or recognized['matching']['stopped_early']
 
 
 @router.post("/attendance")
@@ -111,78 +203,9 @@ async def take_attendance(
         )
     
     try:
-        results = []
-        all_students = []
-        photo_number = 1
-        
-        # Load all students
-        storage = db.load_storage()
-        if 'students_data' in storage:
-            for filename, data in storage['students_data'].items():
-                # Filter by class info
-                if (data.get('department') == department and 
-                    data.get('year') == year and 
-                    data.get('division') == division and
-                    subject in data.get('subjects', [])):
-                    
-                    all_students.append({
-                        'name': data.get('name'),
-                        'student_id': data.get('id'),
-                        'filename': filename
-                    })
-        
-        # Process each uploaded photo
-        for photo in photos:
-            # Save uploaded photo temporarily
-            contents = await photo.read()
-            temp_path = os.path.join(base_dirs['temp'], f"class_{photo_number}.jpg")
-            with open(temp_path, "wb") as f:
-                f.write(contents)
-            
-            # Detect faces
-            faces = extract_faces(
-                img_path=temp_path,
-                enforce_detection=False,
-                detector_backend='retinaface',
-                align=True
-            )
-            
-            # Process each face in the photo
-            face_idx = 0
-            for face in faces:
-                processed_face = process_face(face)
-                if processed_face is not None:
-                    face_path = os.path.join(base_dirs['temp'], f"face_{photo_number}_{face_idx}.jpg")
-                    cv2.imwrite(face_path, processed_face)
-                    
-                    # Compare with all students
-                    for student in all_students:
-                        student_path = os.path.join(base_dirs['student_images'], student['filename'])
-                        result = verify_face(face_path, student_path)
-                        
-                        if result and result['verified']:
-                            # Check if student already marked as present with higher confidence
-                            existing_result = next((r for r in results if r['student_name'] == student['name']), None)
-                            
-                            if existing_result is None or result['similarity'] > existing_result['confidence']:
-                                # If this is a better match, replace or add
-                                if existing_result:
-                                    results.remove(existing_result)
-                                
-                                results.append({
-                                    'student_name': student['name'],
-                                    'student_id': student['student_id'],
-                                    'status': 'Present',
-                                    'confidence': result['similarity'],
-                                    'photo_number': photo_number,
-                                    'face_number': face_idx,
-                                    'model': 'ArcFace',
-                                    'manually_corrected': False
-                                })
-                
-                face_idx += 1
-            
-            photo_number += 1
+        all_students = class_students(department, year, division, subject)
+        recognized = await recognize_photos(photos, all_students, added_by=current_user.get('id'))
+        results = recognized['records']
         
         # Add absent students
         present_student_ids = [r['student_id'] for r in results]
@@ -193,7 +216,7 @@ async def take_attendance(
                     'student_id': student['student_id'],
                     'status': 'Absent',
                     'confidence': 0.0,
-                    'model': 'ArcFace',
+                    'model': recognition.config.MODEL_NAME,
                     'manually_corrected': False
                 })
         
@@ -207,6 +230,9 @@ async def take_attendance(
             'subject': subject,
             'time_slot': time_slot,
             'records': results,
+            'photos': recognized['photos'],
+            'face_quality': recognized['face_quality'],
+            'matching': recognized['matching'],
             'taken_by': current_user.get('id')
         }
         
@@ -214,6 +240,10 @@ async def take_attendance(
         attendance_history = db.load_attendance_history()
         attendance_history.append(attendance_record)
         db.save_attendance_history(attendance_history)
+        aggregates.record_session(attendance_record)
+        rollups.record_session(attendance_record)
+        report_cache.invalidate_class(department, year, division)
+        events.publish_attendance_session(attendance_record)
         
         return attendance_record
     except Exception as e:
@@ -227,26 +257,21 @@ async def get_attendance_history(
     year: Optional[str] = None,
     division: Optional[str] = None,
     subject: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=pagination.MAX_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get attendance history with optional filtering"""
-    attendance_history = db.load_attendance_history()
-    
-    # Apply filters
-    filtered_history = attendance_history
-    
-    if date:
-        filtered_history = [h for h in filtered_history if h.get('date') == date]
-    if department:
-        filtered_history = [h for h in filtered_history if h.get('department') == department]
-    if year:
-        filtered_history = [h for h in filtered_history if h.get('year') == year]
-    if division:
-        filtered_history = [h for h in filtered_history if h.get('division') == division]
-    if subject:
-        filtered_history = [h for h in filtered_history if h.get('subject') == subject]
+    """Get attendance history with optional filtering, paginated with limit/cursor"""
+    try:
+        history, next_cursor = history_index.page_history(
+            limit, cursor,
+            date=date, department=department, year=year, division=division, subject=subject
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return filtered_history
+    return serialization.fast_response(pagination.page_response(history, limit, next_cursor, fields))
 
 
 @router.get("/attendance/stats")
@@ -259,21 +284,12 @@ async def get_attendance_stats(
     current_user: User = Depends(get_current_active_user)
 ):
     """Get attendance statistics"""
-    attendance_history = db.load_attendance_history()
-    
-    # Apply filters
-    filtered_history = attendance_history
-    
-    if department:
-        filtered_history = [h for h in filtered_history if h.get('department') == department]
-    if year:
-        filtered_history = [h for h in filtered_history if h.get('year') == year]
-    if division:
-        filtered_history = [h for h in filtered_history if h.get('division') == division]
-    if start_date:
-        filtered_history = [h for h in filtered_history if h.get('date', '') >= start_date]
-    if end_date:
-        filtered_history = [h for h in filtered_history if h.get('date', '') <= end_date]
+    # The sessions come from the history index; the CSV of sessions without embedded records is
+    # only read when the range is not answered from the materialized counters
+    filtered_history, _ = history_index.page_history(
+        None, None, start_date, end_date,
+        department=department, year=year, division=division
+    )
     
     # Calculate statistics
     if not filtered_history:
@@ -283,26 +299,41 @@ async def get_attendance_stats(
     student_stats = {}
     total_sessions = len(filtered_history)
     
-    for record in filtered_history:
-        for student in record.get('records', []):
-            student_id = student.get('student_id')
-            student_name = student.get('student_name')
+    # Whole-month ranges are answered from the materialized counters
+    span = aggregates.month_span(start_date, end_date)
+    if span is not None:
+        counters = aggregates.get_class_aggregates(department, year, division)
+        for student_id, entry in counters.items():
+            summary = aggregates.summarize(entry, start_month=span[0], end_month=span[1])
+            if summary['total'] == 0:
+                continue
             
-            if student_id not in student_stats:
-                student_stats[student_id] = {
-                    'student_id': student_id,
-                    'student_name': student_name,
-                    'present': 0,
-                    'absent': 0,
-                    'total': 0
-                }
-            
-            student_stats[student_id]['total'] += 1
-            
-            if student.get('status') == 'Present':
-                student_stats[student_id]['present'] += 1
-            else:
-                student_stats[student_id]['absent'] += 1
+            student_stats[student_id] = {
+                'student_id': student_id,
+                'student_name': entry.get('name'),
+                'present': summary['present'],
+                'absent': summary['total'] - summary['present'],
+                'total': summary['total']
+            }
+    else:
+        # The same marks the counters are built from, so both paths count the same sessions
+        for record in filtered_history:
+            for student_id, student_name, present in aggregates.session_marks(record):
+                if student_id not in student_stats:
+                    student_stats[student_id] = {
+                        'student_id': student_id,
+                        'student_name': student_name,
+                        'present': 0,
+                        'absent': 0,
+                        'total': 0
+                    }
+                
+                student_stats[student_id]['total'] += 1
+                
+                if present:
+                    student_stats[student_id]['present'] += 1
+                else:
+                    student_stats[student_id]['absent'] += 1
     
     # Calculate percentages
     for student_id, stats in student_stats.items():
@@ -314,8 +345,7 @@ async def get_attendance_stats(
     # Compile session stats
     session_stats = []
     for record in filtered_history:
-        present_count = sum(1 for s in record.get('records', []) if s.get('status') == 'Present')
-        total_count = len(record.get('records', []))
+        present_count, total_count = rollups.session_counts(record)
         attendance_percentage = (present_count / total_count) * 100 if total_count > 0 else 0
         
         session_stats.append({
@@ -328,11 +358,11 @@ async def get_attendance_stats(
             'attendance_percentage': attendance_percentage
         })
     
-    return {
+    return serialization.fast_response({
         'total_sessions': total_sessions,
         'student_stats': list(student_stats.values()),
         'session_stats': session_stats
-    }
+    })
 
 
 @router.put("/attendance/{date}/{time}")
@@ -357,6 +387,8 @@ async def update_attendance(
     # Find the specific attendance record
     for i, record in enumerate(attendance_history):
         if record.get('date') == date and record.get('time') == time:
+            old_record = copy.deepcopy(record)
+            
             # Apply updates
             for update in updates:
                 student_id = update.get('student_id')
@@ -375,6 +407,9 @@ async def update_attendance(
             
             # Save changes
             db.save_attendance_history(attendance_history)
+            aggregates.correct_session(old_record, attendance_history[i])
+            rollups.correct_session(old_record, attendance_history[i])
+            report_cache.invalidate_class(record.get('department'), record.get('year'), record.get('division'))
             return {"detail": "Attendance updated successfully"}
     
     raise HTTPException(status_code=404, detail="Attendance record not found")
@@ -399,14 +434,21 @@ async def delete_attendance(
     attendance_history = db.load_attendance_history()
     
     # Find and remove the record
-    initial_count = len(attendance_history)
+    removed_records = [
+        record for record in attendance_history 
+        if record.get('date') == date and record.get('time') == time
+    ]
     attendance_history = [
         record for record in attendance_history 
         if not (record.get('date') == date and record.get('time') == time)
     ]
     
-    if len(attendance_history) < initial_count:
+    if removed_records:
         db.save_attendance_history(attendance_history)
+        for record in removed_records:
+            aggregates.retract_session(record)
+            rollups.retract_session(record)
+            report_cache.invalidate_class(record.get('department'), record.get('year'), record.get('division'))
         return {"detail": "Attendance record deleted successfully"}
     
     raise HTTPException(status_code=404, detail="Attendance record not found")
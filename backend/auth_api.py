@@ -10,9 +10,14 @@ from security import (
     ACCESS_TOKEN_EXPIRE_MINUTES, is_admin, is_teacher, is_class_teacher
 )
 import database as db
+import serialization
 
 router = APIRouter(tags=["authentication"])
 
+# Stored users are validated on write, so list responses skip per-item model validation
+USER_RECORD = serialization.RecordType.from_model(User)
+
+
 @router.post("/token", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     """Authenticate user and generate JWT token"""
@@ -88,7 +93,7 @@ async def read_users(
             detail="Only administrators can view all users"
         )
     
-    return db.get_all_users(role)
+    return serialization.fast_response(USER_RECORD.shape_all(db.get_all_users(role)))
 
 
 @router.get("/users/{user_id}", response_model=User)
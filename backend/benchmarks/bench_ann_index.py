@@ -0,0 +1,100 @@
+"""
+Benchmark the campus-wide ANN index against an exact scan of the whole gallery
+
+Usage (from the backend directory):
+    python benchmarks/bench_ann_index.py
+    python benchmarks/bench_ann_index.py --identities 50000 --probes-per-query 8 16 32
+
+Builds an IVFIndex over a synthetic gallery of normalized embeddings, then reports for
+each --probes-per-query setting the per-query latency (p50 and p99), recall@1 against the
+exact nearest photo and how often the match decision agrees with the exact scan, plus
+insert, delete and save/load times.
+Exits with status 1 when the default setting misses --max-ms (p50) or --min-recall.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recognition import config, embeddings  # noqa: E402
+from recognition.index import IVFIndex  # noqa: E402
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--identities", type=int, default=10000)
+    parser.add_argument("--dimension", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.03, help="per-component noise of the query embeddings")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--probes-per-query", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--max-ms", type=float, default=1.0)
+    parser.add_argument("--min-recall", type=float, default=0.95)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    gallery = embeddings.normalize(rng.normal(size=(args.identities, args.dimension)).astype(np.float32))
+    keys = [f"student_{i}.jpg" for i in range(args.identities)]
+    picked = rng.integers(0, args.identities, args.queries)
+    queries = embeddings.normalize(
+        gallery[picked] + rng.normal(scale=args.noise, size=(args.queries, args.dimension)).astype(np.float32)
+    )
+
+    index = IVFIndex(args.dimension)
+    _, build_s = timed(lambda: index.add(keys, gallery))
+    exact_scores = queries @ gallery.T * 100
+    exact_top = exact_scores.argmax(axis=1)
+    exact_match = exact_scores.max(axis=1) >= config.MATCH_THRESHOLD
+
+    _, exact_s = timed(lambda: [int(np.argmax(gallery @ query)) for query in queries])
+    print(f"{args.identities} x {args.dimension} gallery, {len(index.centroids)} lists, built in {build_s:.2f}s")
+    print(f"exact scan: {exact_s * 1000 / args.queries:.3f} ms/query")
+    print(f"{'probes':>7} {'p50 ms':>8} {'p99 ms':>8} {'recall@1':>9} {'decisions':>10}")
+
+    failed = False
+    for n_probe in args.probes_per_query:
+        index.search(queries[:1], args.k, n_probe)
+        latencies, results = [], []
+        for query in queries:
+            result, seconds = timed(lambda: index.search(query, args.k, n_probe)[0])
+            latencies.append(seconds * 1000)
+            results.append(result[0])
+        recall_1 = np.mean([key == keys[exact] for (key, _), exact in zip(results, exact_top)])
+        agree = np.mean([(score >= config.MATCH_THRESHOLD) == match for (_, score), match in zip(results, exact_match)])
+        p50, p99 = np.percentile(latencies, [50, 99])
+        print(f"{n_probe:>7} {p50:>8.3f} {p99:>8.3f} {recall_1:>9.4f} {agree * 100:>9.2f}%")
+        if n_probe == config.INDEX_PROBES and (p50 > args.max_ms or recall_1 < args.min_recall):
+            print(f"FAIL: {n_probe} probes per query need p50 <= {args.max_ms} ms and recall@1 >= {args.min_recall}")
+            failed = True
+
+    _, remove_s = timed(lambda: index.remove(keys[:100]))
+    _, insert_s = timed(lambda: index.add([f"new_{i}.jpg" for i in range(100)], gallery[:100]))
+    _, repack_s = timed(lambda: index.search(queries[0], args.k))
+    print(f"delete 100: {remove_s * 1000:.1f} ms, insert 100: {insert_s * 1000:.1f} ms, "
+          f"first query after the changes: {repack_s * 1000:.1f} ms")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "index.npz")
+        _, save_s = timed(lambda: index.save(path))
+        loaded, load_s = timed(lambda: IVFIndex.load(path))
+        print(f"save: {save_s * 1000:.1f} ms ({os.path.getsize(path) / 1e6:.1f} MB), load: {load_s * 1000:.1f} ms, "
+              f"{len(loaded)} entries")
+
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
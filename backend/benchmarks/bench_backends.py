@@ -0,0 +1,106 @@
+"""
+Benchmark recognition backends on CPU: load time, memory, detection and embedding throughput
+
+Usage (from the backend directory):
+    python benchmarks/bench_backends.py --backends deepface onnx --batch-size 32
+
+Each backend runs in its own interpreter so load time and peak memory are not shared.
+Detection runs on the photos in --images (data/student_images by default), or on
+synthetic 640x480 images when that directory is empty; embedding runs on --crops crops.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+REPEATS = 3
+
+
+def measure(name, images, crops_count, batch_size):
+    import numpy as np
+    from recognition import backends, embeddings, loader
+
+    cv2 = loader.cv2()
+    start = time.perf_counter()
+    backend = backends.get_backend(name)
+    backend.load()
+    load_s = time.perf_counter() - start
+
+    paths = []
+    if os.path.isdir(images):
+        paths = sorted(
+            os.path.join(images, f) for f in os.listdir(images)
+            if f.lower().endswith((".jpg", ".jpeg", ".png"))
+        )
+    if not paths:
+        rng = np.random.default_rng(0)
+        scratch = os.path.join(BACKEND_DIR, "data", "temp")
+        os.makedirs(scratch, exist_ok=True)
+        for i in range(8):
+            path = os.path.join(scratch, f"bench_{i}.jpg")
+            cv2.imwrite(path, rng.integers(0, 256, (480, 640, 3), dtype=np.uint8))
+            paths.append(path)
+
+    backend.detector.detect(paths[0])
+    best_detect = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for path in paths:
+            backend.detector.detect(path)
+        best_detect = min(best_detect, time.perf_counter() - start)
+
+    rng = np.random.default_rng(1)
+    crops = [rng.integers(0, 256, (112, 112, 3), dtype=np.uint8) for _ in range(crops_count)]
+    embeddings.embed_crops(crops[:batch_size], batch_size, backend)
+    best_embed = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        embeddings.embed_crops(crops, batch_size, backend)
+        best_embed = min(best_embed, time.perf_counter() - start)
+
+    return {
+        "backend": name,
+        "load_s": load_s,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "detect_ms_per_image": best_detect * 1000 / len(paths),
+        "crops_per_s": crops_count / best_embed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["deepface", "onnx"])
+    parser.add_argument("--images", default=os.path.join(BACKEND_DIR, "data", "student_images"))
+    parser.add_argument("--crops", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.images, args.crops, args.batch_size)))
+        return
+
+    print(f"{'backend':>10} {'load s':>8} {'peak MB':>9} {'detect ms/img':>14} {'crops/s':>9}   (batch {args.batch_size})")
+    for name in args.backends:
+        result = subprocess.run(
+            [sys.executable, __file__, "--worker", name, "--images", args.images,
+             "--crops", str(args.crops), "--batch-size", str(args.batch_size)],
+            capture_output=True,
+            text=True
+        )
+        if result.returncode != 0:
+            print(f"{name:>10} failed: {result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'unknown error'}")
+            continue
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        print(f"{name:>10} {stats['load_s']:>8.2f} {stats['peak_rss_mb']:>9.0f} "
+              f"{stats['detect_ms_per_image']:>14.1f} {stats['crops_per_s']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark ArcFace embedding of session face crops: one DeepFace call per crop vs batched forward passes
+
+Usage (from the backend directory, with deepface installed):
+    python benchmarks/bench_batch_embeddings.py --crops 64 --batch-sizes 1 16 32 64
+
+Reports milliseconds per crop for:
+    per-crop   DeepFace.represent on each aligned crop (detector skipped), as take_attendance did
+    batch=N    recognition.embed_crops with N crops stacked per forward pass
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import recognition  # noqa: E402
+from recognition import loader  # noqa: E402
+
+REPEATS = 3
+
+
+def make_crops(count, seed=0):
+    """Random BGR uint8 crops the size extract_faces returns"""
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, (224, 224, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def per_crop(crops):
+    deepface_api = loader.deepface()
+    for crop in crops:
+        deepface_api.represent(
+            img_path=crop,
+            model_name=recognition.config.MODEL_NAME,
+            detector_backend="skip",
+            enforce_detection=False,
+            normalization="base"
+        )
+
+
+def best_ms_per_crop(func, crops, *args):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func(crops, *args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000 / len(crops)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--crops", type=int, default=64)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 32, 64])
+    args = parser.parse_args()
+
+    crops = make_crops(args.crops)
+
+    # Build the model and trace both paths once so the timings exclude warm-up
+    recognition.embed_crops(crops[:1], batch_size=1)
+    per_crop(crops[:1])
+
+    baseline = best_ms_per_crop(per_crop, crops)
+    print(f"{'path':>10} {'ms/crop':>9} {'speedup':>8}   ({args.crops} crops, {recognition.config.MODEL_NAME})")
+    print(f"{'per-crop':>10} {baseline:>9.2f} {1.0:>7.1f}x")
+    for batch_size in args.batch_sizes:
+        recognition.embed_crops(crops[:batch_size], batch_size=batch_size)
+        batched = best_ms_per_crop(recognition.embed_crops, crops, batch_size)
+        print(f"{'batch=' + str(batch_size):>10} {batched:>9.2f} {baseline / batched:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Benchmark the two-stage detector cascade against the backend's detector on classroom-style photos
+
+Usage (from the backend directory, with the backend's detector installed):
+    python benchmarks/bench_detector_cascade.py
+    python benchmarks/bench_detector_cascade.py --images path/to/class_photos --fast haar yunet --sizes 640 960
+
+With --images, recall is measured against what the backend's detector finds on the full
+photo. Otherwise classroom photos are composed from the student photos (--compose-from):
+--faces portraits per 1920x1080 image at random sizes, and recall is measured against
+where they were placed. Reports ms per image, recall, extra detections and how often the
+cascade took the fast path, re-checked a region or fell back to the full photo.
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recognition import backends, config, faces, loader  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def list_photos(directory):
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(faces.PHOTO_EXTENSIONS)
+    )
+
+
+def compose(portraits, count, faces_per_image, rng):
+    """Classroom-like images: portraits pasted on a grid with jitter, smaller towards the back rows"""
+    cv2 = loader.cv2()
+    images = []
+    for _ in range(count):
+        canvas = np.full((1080, 1920, 3), rng.integers(60, 200), dtype=np.uint8)
+        rows = max(1, int(np.sqrt(faces_per_image * 1080 / 1920)))
+        columns = -(-faces_per_image // rows)
+        cell_h, cell_w = 1080 // rows, 1920 // columns
+        truth = []
+        for i in range(faces_per_image):
+            row, column = divmod(i, columns)
+            # Back rows (top of the image) are further away
+            size = int(cell_h * (0.45 + 0.45 * (row + 1) / rows) * rng.uniform(0.8, 1.0))
+            size = max(24, min(size, cell_w - 2, cell_h - 2))
+            portrait = cv2.imread(portraits[rng.integers(len(portraits))])
+            scale = size / max(portrait.shape[:2])
+            tile = cv2.resize(portrait, (max(1, int(portrait.shape[1] * scale)), max(1, int(portrait.shape[0] * scale))))
+            top = row * cell_h + rng.integers(0, max(1, cell_h - tile.shape[0]))
+            left = column * cell_w + rng.integers(0, max(1, cell_w - tile.shape[1]))
+            canvas[top:top + tile.shape[0], left:left + tile.shape[1]] = tile
+            truth.append((left, top, left + tile.shape[1], top + tile.shape[0]))
+        images.append((canvas, truth))
+    return images
+
+
+def centers(found):
+    return [(f["facial_area"]["x"] + f["facial_area"]["w"] / 2, f["facial_area"]["y"] + f["facial_area"]["h"] / 2) for f in found]
+
+
+def score(found, truth):
+    """(faces recovered, detections matching no face): a face is recovered when a detection is centred inside it"""
+    unused = list(centers(found))
+    recovered = 0
+    for x1, y1, x2, y2 in truth:
+        for i, (x, y) in enumerate(unused):
+            if x1 <= x <= x2 and y1 <= y <= y2:
+                recovered += 1
+                del unused[i]
+                break
+    return recovered, len(unused)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", default=config.BACKEND)
+    parser.add_argument("--images", help="directory of real classroom photos")
+    parser.add_argument("--compose-from", default=os.path.join(BACKEND_DIR, "data", "student_images"))
+    parser.add_argument("--count", type=int, default=8, help="composed images")
+    parser.add_argument("--faces", type=int, default=30, help="faces per composed image")
+    parser.add_argument("--fast", nargs="+", default=["haar", "yunet"], choices=sorted(backends.FAST_DETECTORS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[640, 960])
+    parser.add_argument("--confidences", type=float, nargs="+", default=[config.CASCADE_CONFIDENCE])
+    args = parser.parse_args()
+
+    accurate = backends.BACKENDS[args.backend]().detector
+    rng = np.random.default_rng(0)
+    if args.images:
+        photos = list_photos(args.images)
+        images = [(loader.cv2().imread(path), None) for path in photos]
+    else:
+        portraits = list_photos(args.compose_from) if os.path.isdir(args.compose_from) else []
+        if not portraits:
+            print(f"No photos in {args.compose_from}; pass --images or --compose-from")
+            sys.exit(1)
+        images = compose(portraits, args.count, args.faces, rng)
+    expected = None if args.images else args.faces
+
+    # The backend's detector alone; also the reference for real photos
+    accurate.detect(images[0][0])
+    reference, elapsed = [], 0.0
+    for img, truth in images:
+        start = time.perf_counter()
+        found = accurate.detect(img, expected)
+        elapsed += time.perf_counter() - start
+        reference.append(found)
+    if args.images:
+        images = [(img, [
+            (f["facial_area"]["x"], f["facial_area"]["y"],
+             f["facial_area"]["x"] + f["facial_area"]["w"], f["facial_area"]["y"] + f["facial_area"]["h"])
+            for f in found if f.get("confidence")
+        ]) for (img, _), found in zip(images, reference)]
+
+    total = sum(len(truth) for _, truth in images)
+    print(f"{len(images)} images, {total} faces, backend {args.backend}")
+    print(f"{'configuration':<24} {'ms/image':>9} {'recall':>7} {'extra':>6} {'fast':>6} {'regions':>8} {'full':>5}")
+    recovered, extra = map(sum, zip(*(score(found, truth) for found, (_, truth) in zip(reference, images))))
+    print(f"{'backend only':<24} {elapsed * 1000 / len(images):>9.1f} {recovered / max(1, total):>7.3f} {extra:>6}")
+
+    for name in args.fast:
+        try:
+            fast = backends.FAST_DETECTORS[name]()
+            fast.load()
+        except Exception as e:
+            print(f"{name:<24} skipped: {e}")
+            continue
+        for size in args.sizes:
+            for confidence in args.confidences:
+                cascade = backends.CascadeDetector(fast, accurate, size, confidence)
+                elapsed, recovered, extra = 0.0, 0, 0
+                for img, truth in images:
+                    start = time.perf_counter()
+                    found = cascade.detect(img, expected)
+                    elapsed += time.perf_counter() - start
+                    hits, misses = score(found, truth)
+                    recovered += hits
+                    extra += misses
+                label = f"{name} {size}px >={confidence:g}"
+                print(f"{label:<24} {elapsed * 1000 / len(images):>9.1f} {recovered / max(1, total):>7.3f} {extra:>6} "
+                      f"{cascade.stats['fast']:>6} {cascade.stats['regions']:>8} {cascade.stats['full']:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Compare early-exit matching with matching every face against every student
+
+Usage (from the backend directory):
+    python benchmarks/bench_early_exit.py
+    python benchmarks/bench_early_exit.py --students 120 --present 1.0 --strangers 10 --confident 70
+
+Synthetic sessions: --present of --students are in the photos (seen in --views faces each,
+noisy views of their identity), plus --strangers faces of people not enrolled, in random
+order. Faces arrive in batches of config.BATCH_SIZE. Reports faces embedded, face-student
+comparisons and students marked present for both, and the mean confidence lost by
+early-exit matches. Exits with status 1 when early exit marks different students present.
+"""
+import os
+import sys
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recognition import config, embeddings, matching, quantization  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, default=60)
+    parser.add_argument("--dimension", type=int, default=512)
+    parser.add_argument("--present", type=float, default=0.9, help="share of the students in the photos")
+    parser.add_argument("--views", type=int, default=2, help="faces per present student (several photos)")
+    parser.add_argument("--strangers", type=int, default=5)
+    parser.add_argument("--noise", type=float, default=0.04, help="per-component noise of every view")
+    parser.add_argument("--confident", type=float, default=config.EARLY_EXIT_THRESHOLD)
+    parser.add_argument("--trials", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    totals = {"faces": 0, "full_embedded": 0, "early_embedded": 0, "full_comparisons": 0, "early_comparisons": 0}
+    disagreements, lost = 0, []
+    for _ in range(args.trials):
+        identities = embeddings.normalize(rng.normal(size=(args.students + args.strangers, args.dimension)).astype(np.float32))
+        present = rng.permutation(args.students)[:int(round(args.present * args.students))]
+        people = np.concatenate([np.repeat(present, args.views), args.students + np.arange(args.strangers)])
+        people = rng.permutation(people)
+        faces = embeddings.normalize(
+            (identities[people] + rng.normal(scale=args.noise, size=(len(people), args.dimension))).astype(np.float32)
+        )
+        references = quantization.QuantizedMatrix.from_vectors(identities[:args.students], config.GALLERY_DTYPE)
+
+        full = matching.best_matches(faces, references)
+        matcher = matching.EarlyExitMatcher(references, confident=args.confident)
+        for start in range(0, len(faces), config.BATCH_SIZE):
+            if matcher.done:
+                break
+            matcher.add(faces[start:start + config.BATCH_SIZE])
+        early = matcher.matches()
+
+        totals["faces"] += len(faces)
+        totals["full_embedded"] += len(faces)
+        totals["early_embedded"] += len(matcher.probes)
+        totals["full_comparisons"] += len(faces) * args.students
+        totals["early_comparisons"] += matcher.comparisons
+        if {student for _, student, _ in full} != {student for _, student, _ in early}:
+            disagreements += 1
+        best = {student: score for _, student, score in full}
+        lost.extend(best[student] - score for _, student, score in early if student in best)
+
+    print(f"{args.students} students, {args.present:.0%} present, {args.views} views each, {args.strangers} strangers, "
+          f"batches of {config.BATCH_SIZE}, confident at {args.confident}, {args.trials} trials")
+    print(f"{'':>12} {'embedded':>9} {'comparisons':>12}")
+    print(f"{'every face':>12} {totals['full_embedded'] / totals['faces']:>8.1%} {1.0:>12.2f}")
+    print(f"{'early exit':>12} {totals['early_embedded'] / totals['faces']:>8.1%} "
+          f"{totals['early_comparisons'] / max(1, totals['full_comparisons']):>12.2f}")
+    print(f"mean confidence lost per match: {np.mean(lost) if lost else 0.0:.2f} points")
+
+    if disagreements:
+        print(f"FAIL: early exit marked different students present in {disagreements} of {args.trials} trials")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
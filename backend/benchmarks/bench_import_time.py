@@ -0,0 +1,90 @@
+"""
+Measure API cold start with python -X importtime and check it against a budget
+
+Usage (from the backend directory):
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --module app --budget-ms 1500 --top 15
+
+Imports the module in a fresh interpreter (best of --repeats runs) and reports the
+cumulative import time and the heaviest packages. Exits with status 1 when the import
+fails, exceeds the budget, or pulls in a module that must stay lazy (the face
+recognition stack and pandas are loaded on first use, not at startup), so it can gate CI.
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import budget for the API module, in milliseconds
+DEFAULT_BUDGET_MS = 1500
+
+# Top-level packages that must not be imported while the app is being loaded
+LAZY_MODULES = ("tensorflow", "keras", "deepface", "retinaface", "torch", "cv2", "PIL", "pandas")
+
+LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)$")
+
+
+def measure(module):
+    """Import a module with -X importtime; returns (entries, error) with entries as (depth, name, cumulative_us)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    entries = []
+    errors = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            entries.append(((len(match.group(3)) - 1) // 2, match.group(4), int(match.group(2))))
+        elif not line.startswith("import time:"):
+            errors.append(line)
+    return entries, ("\n".join(errors) if result.returncode != 0 else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    best = None
+    for _ in range(args.repeats):
+        entries, error = measure(args.module)
+        if error:
+            print(f"import {args.module} failed:\n{error}")
+            sys.exit(1)
+        total_us = sum(cumulative for depth, _, cumulative in entries if depth == 0)
+        if best is None or total_us < best[0]:
+            best = (total_us, entries)
+
+    total_us, entries = best
+    imported = {name.split(".")[0] for _, name, _ in entries}
+    eager = [name for name in LAZY_MODULES if name in imported]
+
+    print(f"import {args.module}: {total_us / 1000:.1f} ms (budget {args.budget_ms:.0f} ms, best of {args.repeats})")
+    print(f"\n{'cumulative ms':>14}  package")
+    top_level = sorted((e for e in entries if e[0] == 0), key=lambda e: e[2], reverse=True)
+    for _, name, cumulative in top_level[:args.top]:
+        print(f"{cumulative / 1000:>14.1f}  {name}")
+
+    failed = False
+    if eager:
+        print(f"\nFAIL: imported at startup but must stay lazy: {', '.join(eager)}")
+        failed = True
+    if total_us / 1000 > args.budget_ms:
+        print(f"\nFAIL: {total_us / 1000:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if not failed:
+        print("\nOK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
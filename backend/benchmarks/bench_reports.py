@@ -0,0 +1,132 @@
+"""
+Benchmark the report engine against the previous per-record read_csv/concat reports
+
+Usage (from the backend directory):
+    python benchmarks/bench_reports.py --sessions 1000 10000 100000
+
+Synthetic session CSVs are written to a temporary directory. The legacy
+implementation opens one CSV per session, so it is skipped above --legacy-max.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import report_engine  # noqa: E402
+
+SUBJECTS = ["DC", "M&M", "CN", "ESD", "Mini Project"]
+CLASS_SIZE = 60
+
+
+def make_history(sessions, directory):
+    """Write one CSV per session and return the matching history records"""
+    random.seed(42)
+    students = [(f"EC{3000 + i}", f"Student {i}") for i in range(CLASS_SIZE)]
+    history = []
+
+    for n in range(sessions):
+        day = n // len(SUBJECTS)
+        date = pd.Timestamp("2025-01-01") + pd.Timedelta(days=day % 365)
+        filename = f"attendance_{n}.csv"
+        rows = [f"{sid},{name},{int(random.random() < 0.8)}" for sid, name in students]
+        with open(os.path.join(directory, filename), 'w') as f:
+            f.write("Student ID,Name,Present\n")
+            f.write("\n".join(rows))
+
+        history.append({
+            "id": str(n),
+            "date": date.strftime("%Y-%m-%d"),
+            "department": "EXTC",
+            "year": "TY",
+            "division": "B",
+            "subject": SUBJECTS[n % len(SUBJECTS)],
+            "teacher_name": "Teacher",
+            "attendance_file": filename
+        })
+
+    return history
+
+
+def legacy_frame(records, directory, student_id=None):
+    """Previous implementation: one read_csv per record, then concat"""
+    all_data = []
+    for record in records:
+        df = pd.read_csv(os.path.join(directory, record["attendance_file"]))
+        if student_id is not None:
+            df = df[df["Student ID"] == student_id].copy()
+        df["Date"] = record.get("date")
+        df["Subject"] = record.get("subject")
+        df["Teacher"] = record.get("teacher_name")
+        all_data.append(df)
+    return pd.concat(all_data, ignore_index=True)
+
+
+def legacy_reports(history, directory):
+    combined = legacy_frame(history, directory)
+    combined.groupby(["Student ID", "Name"]).agg(
+        total_classes=("Present", "count"),
+        present_count=("Present", "sum")
+    ).reset_index()
+
+    student = legacy_frame(history, directory, student_id="EC3000")
+    student.groupby("Subject").agg(
+        total_classes=("Present", "count"),
+        present_count=("Present", "sum")
+    ).reset_index()
+
+    pivot = pd.pivot_table(
+        combined,
+        values="Present",
+        index=["Student ID", "Name"],
+        columns=["Date", "Subject"],
+        aggfunc="first",
+        fill_value="A"
+    )
+    # DataFrame.applymap was renamed to DataFrame.map in newer pandas
+    cell_map = pivot.map if hasattr(pivot, "map") else pivot.applymap
+    cell_map(lambda x: "P" if x == 1 else "A")
+
+
+def engine_reports(history):
+    combined = report_engine.load_frame(history)
+    report_engine.monthly_report(combined)
+    report_engine.student_report(report_engine.load_frame(history, student_id="EC3000"))
+    for _ in report_engine.iter_pivot_csv(report_engine.build_pivot_marks(history)):
+        pass
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--legacy-max", type=int, default=10000,
+                        help="Skip the legacy implementation above this many sessions")
+    args = parser.parse_args()
+
+    print(f"{'sessions':>10} {'legacy (s)':>12} {'engine (s)':>12} {'speedup':>9}")
+    for sessions in args.sessions:
+        with tempfile.TemporaryDirectory() as directory:
+            report_engine.ATTENDANCE_DIR = directory
+            history = make_history(sessions, directory)
+
+            engine_time = timed(engine_reports, history)
+            if sessions <= args.legacy_max:
+                legacy_time = timed(legacy_reports, history, directory)
+                print(f"{sessions:>10} {legacy_time:>12.2f} {engine_time:>12.2f} {legacy_time / engine_time:>8.1f}x")
+            else:
+                print(f"{sessions:>10} {'skipped':>12} {engine_time:>12.2f} {'-':>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark response serialization: response_model validation and jsonable_encoder vs the fast path
+
+Usage (from the backend directory):
+    python benchmarks/bench_serialization.py --items 1000 10000
+
+Reports the cost per 1k items of:
+    response_model  List[User] validation + jsonable_encoder + JSONResponse (auth_api.read_users before)
+    encoder         jsonable_encoder + JSONResponse on plain dicts (get_attendance_stats before)
+    fast            RecordType shaping / plain dicts + FastJSONResponse (orjson when installed)
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import BaseModel
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serialization  # noqa: E402
+
+try:
+    from models import User
+except Exception:
+    # Same fields as models.User, for trees where models.py cannot be imported;
+    # plain str fields validate faster than EmailStr/enums, so "before" is understated
+    class User(BaseModel):
+        email: str
+        name: str
+        role: str
+        id: str
+        department: Optional[str] = None
+        year: Optional[str] = None
+        division: Optional[str] = None
+        roll_number: Optional[str] = None
+        profile_image: Optional[str] = None
+        created_at: datetime
+        last_login: Optional[datetime] = None
+
+REPEATS = 5
+
+
+def make_users(count):
+    return [{
+        "id": f"00000000-0000-0000-0000-{n:012d}",
+        "email": f"student{n}@dietms.org",
+        "name": f"Student {n}",
+        "role": "student",
+        "department": "EXTC",
+        "year": "TY",
+        "division": "B",
+        "roll_number": f"EC{n % 10000:04d}",
+        "profile_image": None,
+        "created_at": "2025-01-01T09:00:00",
+        "last_login": None
+    } for n in range(count)]
+
+
+def make_stats(count):
+    return {
+        "total_sessions": count,
+        "student_stats": [{
+            "student_id": f"EC{n:04d}",
+            "student_name": f"Student {n}",
+            "present": 40,
+            "absent": 10,
+            "total": 50,
+            "attendance_percentage": 80.0
+        } for n in range(count)],
+        "session_stats": [{
+            "date": "2025-01-01",
+            "time": "09:00:00",
+            "subject": "DC",
+            "time_slot": "09:00-10:00",
+            "present": 48,
+            "total": 60,
+            "attendance_percentage": 80.0
+        } for _ in range(count)]
+    }
+
+
+def response_model_path(users, field, loop):
+    content = loop.run_until_complete(serialize_response(field=field, response_content=users))
+    return JSONResponse(content).body
+
+
+def encoder_path(content):
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def fast_users_path(users, record):
+    return serialization.fast_response(record.shape_all(users)).body
+
+
+def fast_path(content):
+    return serialization.fast_response(content).body
+
+
+def per_thousand(func, items, *args):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000 / items * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, nargs="+", default=[1000, 10000])
+    args = parser.parse_args()
+
+    field = create_response_field(name="Response_read_users", type_=List[User])
+    record = serialization.RecordType.from_model(User)
+    loop = asyncio.new_event_loop()
+
+    print(f"encoder: {'orjson' if serialization.orjson is not None else 'json (orjson not installed)'}")
+    print(f"{'payload':>8} {'items':>7} {'response_model':>15} {'encoder':>9} {'fast':>9} {'speedup':>9}   (ms per 1k items)")
+    for items in args.items:
+        users = make_users(items)
+        model_ms = per_thousand(response_model_path, items, users, field, loop)
+        encoder_ms = per_thousand(encoder_path, items, users)
+        fast_ms = per_thousand(fast_users_path, items, users, record)
+        print(f"{'users':>8} {items:>7} {model_ms:>15.2f} {encoder_ms:>9.2f} {fast_ms:>9.2f} {model_ms / fast_ms:>8.1f}x")
+
+        stats = make_stats(items)
+        encoder_ms = per_thousand(encoder_path, items, stats)
+        fast_ms = per_thousand(fast_path, items, stats)
+        print(f"{'stats':>8} {items:>7} {'-':>15} {encoder_ms:>9.2f} {fast_ms:>9.2f} {encoder_ms / fast_ms:>8.1f}x")
+
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
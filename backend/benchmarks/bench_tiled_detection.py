@@ -0,0 +1,153 @@
+"""
+Benchmark tiled detection of high-resolution class photos against whole and downscaled detection
+
+Usage (from the backend directory, with the backend's detector installed):
+    python benchmarks/bench_tiled_detection.py
+    python benchmarks/bench_tiled_detection.py --images path/to/class_photos --tile-sizes 1024 1280
+
+With --images, recall is measured against what the backend's detector finds on the full
+photo. Otherwise --count lecture-hall JPEGs of --megapixels are composed from the student
+photos (--compose-from), --rows rows of portraits shrinking towards the back, and recall
+is measured against where they were placed. Reports ms per photo, peak traced memory,
+recall and how many tiles were searched and faces cropped again per photo.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recognition import backends, config, faces, loader  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def list_photos(directory):
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(faces.PHOTO_EXTENSIONS)
+    )
+
+
+def compose(portraits, directory, count, megapixels, rows, rng):
+    """Lecture-hall JPEGs: rows of portraits, the back rows (top) smallest; returns (path, boxes) pairs"""
+    cv2 = loader.cv2()
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = width * 3 // 4
+    photos = []
+    for n in range(count):
+        canvas = np.full((height, width, 3), rng.integers(60, 200), dtype=np.uint8)
+        truth = []
+        top = 0
+        for row in range(rows):
+            # Faces grow about 3x from the back row to the front row
+            size = int(height / rows * (0.25 + 0.5 * row / max(1, rows - 1)))
+            for left in range(int(size * 0.2), width - size, int(size * 1.4)):
+                portrait = cv2.imread(portraits[rng.integers(len(portraits))])
+                scale = size / max(portrait.shape[:2])
+                tile = cv2.resize(portrait, (max(1, int(portrait.shape[1] * scale)), max(1, int(portrait.shape[0] * scale))),
+                                  interpolation=cv2.INTER_AREA)
+                canvas[top:top + tile.shape[0], left:left + tile.shape[1]] = tile
+                truth.append((left, top, left + tile.shape[1], top + tile.shape[0]))
+            top += int(size * 1.15)
+            if top >= height:
+                break
+        path = os.path.join(directory, f"hall_{n}.jpg")
+        cv2.imwrite(path, canvas, [cv2.IMWRITE_JPEG_QUALITY, 92])
+        photos.append((path, truth))
+    return photos
+
+
+def score(found, truth):
+    """Faces recovered: a face is recovered when a detection is centred inside it"""
+    centers = [(f["facial_area"]["x"] + f["facial_area"]["w"] / 2, f["facial_area"]["y"] + f["facial_area"]["h"] / 2)
+               for f in found if f.get("confidence")]
+    recovered = 0
+    for x1, y1, x2, y2 in truth:
+        for i, (x, y) in enumerate(centers):
+            if x1 <= x <= x2 and y1 <= y <= y2:
+                recovered += 1
+                del centers[i]
+                break
+    return recovered
+
+
+def measure(detect, photos):
+    """(ms per photo, peak traced MB, detections per photo)"""
+    elapsed, peak, found = 0.0, 0, []
+    for path, _ in photos:
+        tracemalloc.start()
+        start = time.perf_counter()
+        found.append(detect(path))
+        elapsed += time.perf_counter() - start
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return elapsed * 1000 / len(photos), peak / 1e6, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", default=config.BACKEND)
+    parser.add_argument("--images", help="directory of real class photos")
+    parser.add_argument("--compose-from", default=os.path.join(BACKEND_DIR, "data", "student_images"))
+    parser.add_argument("--count", type=int, default=3, help="composed photos")
+    parser.add_argument("--megapixels", type=float, default=24)
+    parser.add_argument("--rows", type=int, default=8)
+    parser.add_argument("--tile-sizes", type=int, nargs="+", default=[config.TILE_SIZE])
+    parser.add_argument("--max-pixels", type=int, default=config.TILE_MAX_PIXELS)
+    args = parser.parse_args()
+
+    cv2 = loader.cv2()
+    accurate = backends.BACKENDS[args.backend]().detector
+    with tempfile.TemporaryDirectory() as directory:
+        if args.images:
+            photos = [(path, None) for path in list_photos(args.images)]
+        else:
+            portraits = list_photos(args.compose_from) if os.path.isdir(args.compose_from) else []
+            if not portraits:
+                print(f"No photos in {args.compose_from}; pass --images or --compose-from")
+                sys.exit(1)
+            photos = compose(portraits, directory, args.count, args.megapixels, args.rows, np.random.default_rng(0))
+
+        # The backend's detector on the full decode; also the reference for real photos
+        accurate.detect(cv2.imread(photos[0][0]))
+        full_ms, full_mb, reference = measure(lambda path: accurate.detect(cv2.imread(path)), photos)
+        if args.images:
+            photos = [(path, [
+                (f["facial_area"]["x"], f["facial_area"]["y"],
+                 f["facial_area"]["x"] + f["facial_area"]["w"], f["facial_area"]["y"] + f["facial_area"]["h"])
+                for f in found if f.get("confidence")
+            ]) for (path, _), found in zip(photos, reference)]
+
+        total = sum(len(truth) for _, truth in photos)
+        print(f"{len(photos)} photos, {total} faces, backend {args.backend}")
+        print(f"{'configuration':<22} {'ms/photo':>9} {'peak MB':>8} {'recall':>7} {'tiles':>6} {'recropped':>10}")
+
+        def report(label, ms, mb, found, tiles="", recropped=""):
+            recall = sum(score(f, truth) for f, (_, truth) in zip(found, photos)) / max(1, total)
+            print(f"{label:<22} {ms:>9.1f} {mb:>8.1f} {recall:>7.3f} {tiles:>6} {recropped:>10}")
+
+        report("full resolution", full_ms, full_mb, reference)
+        for size in args.tile_sizes:
+            def downscaled(path):
+                img = cv2.imread(path)
+                scale = size / max(img.shape[:2])
+                found = accurate.detect(cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA))
+                for face in found:
+                    face["facial_area"] = {key: int(face["facial_area"][key] / scale) for key in ("x", "y", "w", "h")}
+                return found
+
+            report(f"downscaled {size}px", *measure(downscaled, photos))
+            tiled = backends.TiledDetector(accurate, size, args.max_pixels)
+            ms, mb, found = measure(tiled.detect, photos)
+            report(f"tiled {size}px", ms, mb, found,
+                   f"{tiled.stats['tiles'] / len(photos):.1f}", f"{tiled.stats['recropped'] / len(photos):.1f}")
+
+
+if __name__ == "__main__":
+    main()
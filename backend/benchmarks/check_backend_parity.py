@@ -0,0 +1,98 @@
+"""
+Check a recognition backend against the DeepFace outputs on the student photos
+
+Usage (from the backend directory, with deepface and the backend's runtime installed):
+    python benchmarks/check_backend_parity.py --backend onnx
+    python benchmarks/check_backend_parity.py --backend onnx --images data/student_images --min-cosine 0.99
+
+Two checks per photo:
+    recognizer   the same DeepFace-detected crop embedded by both recognizers (cosine between the embeddings)
+    end-to-end   each backend's own detector and recognizer on the reference photo
+Also reports how often the two backends agree on match / no match between every pair of photos.
+The photos default to data/student_images, which a fresh checkout does not have.
+Exits with status 1 when a recognizer cosine is below --min-cosine or a photo fails in either backend.
+"""
+import os
+import sys
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recognition import backends, config, embeddings, faces  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def list_photos(directory):
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(faces.PHOTO_EXTENSIONS)
+    )
+
+
+def recognizer_cosines(photo, reference, candidate):
+    """Cosine between both recognizers' embeddings of every face DeepFace finds in a photo"""
+    crops = [backends.face_to_bgr(face["face"]) for face in reference.detector.detect(photo)]
+    if not crops:
+        return []
+    expected = embeddings.normalize(embeddings.forward_batches(reference.recognizer, crops, len(crops)))
+    actual = embeddings.normalize(embeddings.forward_batches(candidate.recognizer, crops, len(crops)))
+    return list(np.sum(expected * actual, axis=1))
+
+
+def decisions(matrix):
+    similarity = matrix @ matrix.T * 100
+    return similarity >= config.MATCH_THRESHOLD
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", default="onnx")
+    parser.add_argument("--images", default=os.path.join(BACKEND_DIR, "data", "student_images"))
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    args = parser.parse_args()
+
+    photos = list_photos(args.images) if os.path.isdir(args.images) else []
+    if not photos:
+        print(f"No photos in {args.images}; the student photos are not in the repository, so pass --images")
+        sys.exit(1)
+
+    reference = backends.get_backend("deepface")
+    candidate = backends.get_backend(args.backend)
+
+    failed = False
+    worst = 1.0
+    expected_rows, actual_rows = [], []
+    print(f"{'photo':<32} {'recognizer':>10} {'end-to-end':>10}")
+    for photo in photos:
+        cosines = recognizer_cosines(photo, reference, candidate)
+        expected = embeddings.embed_image(photo, reference)
+        actual = embeddings.embed_image(photo, candidate)
+
+        if not cosines or expected is None or actual is None:
+            print(f"{os.path.basename(photo):<32} {'no face':>10} {'-':>10}")
+            failed = True
+            continue
+
+        worst = min(worst, min(cosines))
+        expected_rows.append(expected)
+        actual_rows.append(actual)
+        print(f"{os.path.basename(photo):<32} {min(cosines):>10.4f} {float(expected @ actual):>10.4f}")
+
+    if expected_rows:
+        agree = decisions(np.stack(expected_rows)) == decisions(np.stack(actual_rows))
+        print(f"\nworst recognizer cosine: {worst:.4f} (minimum {args.min_cosine})")
+        print(f"match decisions agreeing with deepface: {agree.mean() * 100:.1f}% of {agree.size} photo pairs")
+
+    if worst < args.min_cosine:
+        print(f"FAIL: recognizer cosine {worst:.4f} is below {args.min_cosine}")
+        failed = True
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Check that a quantized gallery finds the same students as the float32 one
+
+Usage (from the backend directory):
+    python benchmarks/check_gallery_recall.py
+    python benchmarks/check_gallery_recall.py --gallery 5000 --probes 2000 --min-recall 0.99
+
+Uses the cached embeddings of the student photos in --images when they are available
+(a backend must be installed); otherwise a synthetic gallery of clustered identities
+with noisy probes. For each dtype reports memory, the largest similarity error against
+float32, recall@k of the float32 top-k and how often the match decision agrees.
+Exits with status 1 when a recall@1 is below --min-recall.
+"""
+import os
+import sys
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recognition import config, embeddings, faces, loader, quantization  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def student_gallery(directory):
+    """Reference embeddings of the student photos, or None when they cannot be computed"""
+    if not os.path.isdir(directory):
+        return None
+    photos = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(faces.PHOTO_EXTENSIONS)
+    )
+    if len(photos) < 2:
+        return None
+
+    from recognition import gallery
+    try:
+        matrix = gallery.reference_embeddings(photos, dtype="float32").dequantize()
+    except loader.RecognitionUnavailable as e:
+        print(f"Student photos skipped: {e}")
+        return None
+    return matrix[np.linalg.norm(matrix, axis=1) > 0]
+
+
+def synthetic_gallery(size, dimension, rng):
+    return embeddings.normalize(rng.normal(size=(size, dimension)).astype(np.float32))
+
+
+def noisy_probes(gallery, count, noise, rng):
+    """Probes near random gallery rows, like a new photo of an enrolled student"""
+    picked = rng.integers(0, len(gallery), count)
+    probes = gallery[picked] + rng.normal(scale=noise, size=(count, gallery.shape[1])).astype(np.float32)
+    return embeddings.normalize(probes)
+
+
+def top_k(scores, k):
+    k = min(k, scores.shape[1])
+    return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", default=os.path.join(BACKEND_DIR, "data", "student_images"))
+    parser.add_argument("--gallery", type=int, default=2000, help="synthetic gallery size")
+    parser.add_argument("--dimension", type=int, default=512, help="synthetic embedding size")
+    parser.add_argument("--probes", type=int, default=1000)
+    parser.add_argument("--noise", type=float, default=0.03, help="per-component noise of synthetic probes")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--min-recall", type=float, default=0.99)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    gallery = student_gallery(args.images)
+    source = "student photos"
+    if gallery is None or len(gallery) < 2:
+        gallery = synthetic_gallery(args.gallery, args.dimension, rng)
+        source = "synthetic"
+    probes = noisy_probes(gallery, args.probes, args.noise, rng)
+
+    exact = probes @ gallery.T * 100
+    exact_top1 = exact.argmax(axis=1)
+    exact_topk = top_k(exact, args.k)
+    exact_match = exact.max(axis=1) >= config.MATCH_THRESHOLD
+
+    print(f"{source}: {len(gallery)} x {gallery.shape[1]} gallery, {len(probes)} probes, threshold {config.MATCH_THRESHOLD}")
+    print(f"{'dtype':>8} {'bytes':>10} {'max err':>8} {'recall@1':>9} {f'recall@{args.k}':>9} {'decisions':>10}")
+    failed = False
+    for dtype in quantization.DTYPES:
+        matrix = quantization.QuantizedMatrix.from_vectors(gallery, dtype)
+        scores = matrix.similarity(probes)
+        recall_1 = np.mean(scores.argmax(axis=1) == exact_top1)
+        found = top_k(scores, args.k)
+        recall_k = np.mean([len(set(a) & set(b)) / len(a) for a, b in zip(exact_topk, found)])
+        agree = np.mean((scores.max(axis=1) >= config.MATCH_THRESHOLD) == exact_match)
+        print(f"{dtype:>8} {matrix.nbytes:>10} {np.abs(scores - exact).max():>8.4f} "
+              f"{recall_1:>9.4f} {recall_k:>9.4f} {agree * 100:>9.2f}%")
+        if recall_1 < args.min_recall:
+            print(f"FAIL: {dtype} recall@1 {recall_1:.4f} is below {args.min_recall}")
+            failed = True
+
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Check the face quality gate on good faces and on degraded copies of them
+
+Usage (from the backend directory, with the backend's detector installed):
+    python benchmarks/check_quality_gate.py
+    python benchmarks/check_quality_gate.py --images path/to/photos --blur 3 7 --scales 0.5 0.25
+
+Detects the faces in the photos (the student photos by default), then runs the gate on
+them as found, blurred with each --blur Gaussian sigma and shrunk to each --scales share
+of their size. Reports the share kept, the most common rejection reason and the cost per
+face. Exits with status 1 when the gate drops more of the original faces than of any
+degraded set.
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recognition import config, faces, loader, quality  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def blurred(face, sigma):
+    cv2 = loader.cv2()
+    return dict(face, face=cv2.GaussianBlur(face["face"], (0, 0), sigma))
+
+
+def shrunk(face, scale):
+    """The face as it would look further away: fewer pixels, upsampled back to the crop size"""
+    cv2 = loader.cv2()
+    crop = face["face"]
+    small = cv2.resize(crop, (max(1, int(crop.shape[1] * scale)), max(1, int(crop.shape[0] * scale))),
+                       interpolation=cv2.INTER_AREA)
+    area = dict(face["facial_area"], w=int(face["facial_area"]["w"] * scale), h=int(face["facial_area"]["h"] * scale))
+    return dict(face, face=cv2.resize(small, (crop.shape[1], crop.shape[0])), facial_area=area)
+
+
+def run(label, found):
+    start = time.perf_counter()
+    kept, rejected = quality.gate(found)
+    elapsed = time.perf_counter() - start
+    reason = rejected.most_common(1)[0][0] if rejected else "-"
+    share = len(kept) / max(1, len(found))
+    print(f"{label:<16} {share * 100:>6.1f}% {reason:>15} {elapsed * 1000 / max(1, len(found)):>8.2f}")
+    return share
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", default=os.path.join(BACKEND_DIR, "data", "student_images"))
+    parser.add_argument("--blur", type=float, nargs="+", default=[2.0, 4.0])
+    parser.add_argument("--scales", type=float, nargs="+", default=[0.5, 0.25])
+    args = parser.parse_args()
+
+    config.QUALITY_GATE = True
+    photos = sorted(
+        os.path.join(args.images, name) for name in os.listdir(args.images)
+        if name.lower().endswith(faces.PHOTO_EXTENSIONS)
+    ) if os.path.isdir(args.images) else []
+    found = [face for path in photos for face in faces.extract_faces(path) if face.get("confidence")]
+    if not found:
+        print(f"No faces found in {args.images}; pass --images")
+        sys.exit(1)
+
+    print(f"{len(found)} faces from {len(photos)} photos, min size {config.QUALITY_MIN_FACE_SIZE}px, "
+          f"min sharpness {config.QUALITY_MIN_SHARPNESS}, max yaw {config.QUALITY_MAX_YAW}")
+    print(f"{'faces':<16} {'kept':>7} {'top reason':>15} {'ms/face':>8}")
+    original = run("as detected", found)
+    degraded = [run(f"blur {sigma:g}", [blurred(face, sigma) for face in found]) for sigma in args.blur]
+    degraded += [run(f"scale {scale:g}", [shrunk(face, scale) for face in found]) for scale in args.scales]
+
+    if degraded and original < max(degraded):
+        print("FAIL: the gate drops more of the original faces than of degraded ones")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Compare single-photo matching with multi-template (centroid first) matching
+
+Usage (from the backend directory):
+    python benchmarks/check_template_accuracy.py
+    python benchmarks/check_template_accuracy.py --students 60 --templates 5 --noise 0.045
+
+Synthetic class: each student has --templates enrollment embeddings (one of them a photo
+of someone else when --outliers is set) and is seen in --faces-per-student session faces,
+all noisy views of the student's identity. Reports the share of faces matched to the
+right student, wrong matches and face-template comparisons per face and student.
+Exits with status 1 when templates are less accurate than the single photo.
+"""
+import os
+import sys
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recognition import config, embeddings, matching, quantization, templates  # noqa: E402
+
+
+def evaluate(probes, truth, references):
+    matches = matching.best_matches(probes, references)
+    correct = sum(1 for face, student, _ in matches if truth[face] == student)
+    return correct / len(probes), (len(matches) - correct) / len(probes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, default=60)
+    parser.add_argument("--dimension", type=int, default=512)
+    parser.add_argument("--templates", type=int, default=5)
+    parser.add_argument("--faces-per-student", type=int, default=1)
+    parser.add_argument("--noise", type=float, default=0.045, help="per-component noise of every view")
+    parser.add_argument("--outliers", action="store_true", help="replace one extra template per student with another identity")
+    parser.add_argument("--trials", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    single_acc, single_wrong, multi_acc, multi_wrong, comparisons = [], [], [], [], []
+    for _ in range(args.trials):
+        identities = embeddings.normalize(rng.normal(size=(args.students, args.dimension)).astype(np.float32))
+
+        def views(rows):
+            noisy = identities[rows] + rng.normal(scale=args.noise, size=(len(rows), args.dimension))
+            return embeddings.normalize(noisy.astype(np.float32))
+
+        enrolled = [views(np.full(args.templates, student)) for student in range(args.students)]
+        if args.outliers and args.templates > 1:
+            for student, vectors in enumerate(enrolled):
+                vectors[-1] = views(np.array([(student + 1) % args.students]))[0]
+        truth = np.repeat(np.arange(args.students), args.faces_per_student)
+        probes = views(truth)
+
+        primary = quantization.QuantizedMatrix.from_vectors(np.stack([vectors[0] for vectors in enrolled]), config.GALLERY_DTYPE)
+        accuracy, wrong = evaluate(probes, truth, primary)
+        single_acc.append(accuracy)
+        single_wrong.append(wrong)
+
+        kept = [templates.prune_outliers(vectors) for vectors in enrolled]
+        gallery = templates.TemplateGallery(
+            quantization.QuantizedMatrix.from_vectors(
+                embeddings.normalize(np.stack([vectors.mean(axis=0) for vectors in kept])), config.GALLERY_DTYPE
+            ),
+            quantization.QuantizedMatrix.from_vectors(np.concatenate(kept), config.GALLERY_DTYPE),
+            np.concatenate([np.full(len(vectors), student) for student, vectors in enumerate(kept)])
+        )
+        accuracy, wrong = evaluate(probes, truth, gallery)
+        multi_acc.append(accuracy)
+        multi_wrong.append(wrong)
+        comparisons.append(gallery.comparisons / (len(probes) * args.students))
+
+    print(f"{args.students} students, {args.templates} templates each, noise {args.noise}, "
+          f"threshold {config.MATCH_THRESHOLD}, margin {config.TEMPLATE_MARGIN}, {args.trials} trials")
+    print(f"{'':>16} {'correct':>8} {'wrong':>8} {'comparisons':>12}")
+    print(f"{'single photo':>16} {np.mean(single_acc) * 100:>7.1f}% {np.mean(single_wrong) * 100:>7.2f}% {1.0:>12.2f}")
+    print(f"{'templates':>16} {np.mean(multi_acc) * 100:>7.1f}% {np.mean(multi_wrong) * 100:>7.2f}% "
+          f"{np.mean(comparisons):>12.2f}")
+
+    if np.mean(multi_acc) < np.mean(single_acc):
+        print("FAIL: templates match fewer faces than the single photo")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
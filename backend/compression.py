@@ -0,0 +1,172 @@
+import zlib
+from typing import Optional, Sequence
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    # Without brotli only gzip is offered
+    brotli = None
+
+# Responses smaller than this are sent uncompressed
+MINIMUM_SIZE = 1024
+
+# Media types that are already compressed or must not be buffered (prefix match)
+EXCLUDED_MEDIA_TYPES = (
+    "image/",
+    "video/",
+    "audio/",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/pdf",
+    "application/vnd.openxmlformats-officedocument.",
+    "text/event-stream",
+)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, honouring q-values"""
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip()] = weight
+
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best = None
+    for name in candidates:
+        weight = weights.get(name, weights.get("*", 0.0))
+        if weight > 0 and (best is None or weight > best[1]):
+            best = (name, weight)
+    return best[0] if best else None
+
+
+class _Compressor:
+    """Incremental gzip or brotli compressor"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with brotli or gzip
+    Small responses, excluded media types and responses that already carry a
+    Content-Encoding are passed through untouched. Streaming responses are
+    compressed chunk by chunk, so nothing is buffered beyond the first chunk
+    """
+
+    def __init__(self, app, minimum_size: int = MINIMUM_SIZE, gzip_level: int = 6, brotli_quality: int = 4,
+                 excluded_media_types: Sequence[str] = EXCLUDED_MEDIA_TYPES):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.excluded_media_types = tuple(excluded_media_types)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.start_message = None
+        self.compressor = None
+        self.passthrough = False
+
+    def _should_skip(self, headers: MutableHeaders) -> bool:
+        if "content-encoding" in headers:
+            return True
+        media_type = headers.get("content-type", "").lower()
+        return media_type.startswith(self.middleware.excluded_media_types)
+
+    async def send(self, message):
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            # Hold the headers until the first body chunk shows whether to compress
+            self.start_message = message
+            self.passthrough = self._should_skip(MutableHeaders(raw=message["headers"]))
+            return
+
+        if message_type != "http.response.body":
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+
+            if self.passthrough or (not more_body and len(body) < self.middleware.minimum_size):
+                self.passthrough = True
+                await self.downstream(start)
+                await self.downstream(message)
+                return
+
+            self.compressor = _Compressor(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+
+            # The encoded body is a different representation, so a strong ETag becomes weak
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+
+            if more_body:
+                del headers["content-length"]
+                await self.downstream(start)
+                await self.downstream({"type": "http.response.body", "body": self.compressor.compress(body),
+                                       "more_body": True})
+            else:
+                compressed = self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(compressed))
+                await self.downstream(start)
+                await self.downstream({"type": "http.response.body", "body": compressed})
+            return
+
+        if self.passthrough:
+            await self.downstream(message)
+            return
+
+        data = self.compressor.compress(body)
+        if not more_body:
+            data += self.compressor.finish()
+        await self.downstream({"type": "http.response.body", "body": data, "more_body": more_body})
@@ -1,9 +1,10 @@
 import streamlit as st
-import requests
 import pandas as pd
 import plotly.express as px
 from datetime import datetime, timedelta
 
+import api_client
+
 # Constants
 API_BASE_URL = "http://localhost:8000"
 
@@ -13,6 +14,51 @@ ROLE_TEACHER = "teacher"
 ROLE_STUDENT = "student"
 ROLE_CLASS_TEACHER = "class_teacher"
 
+# Seconds each GET stays cached across reruns, per user token (first matching pattern wins)
+CACHE_TTLS = {
+    "/api/dashboard/bootstrap": 30,
+    "/api/admin/dashboard": 30,
+    "/api/teachers/*/dashboard": 30,
+    "/api/teachers/*/class-dashboard": 30,
+    "/api/students/*/dashboard": 60,
+    "/api/students/*/attendance": 60,
+    "/api/reports/*": 120,
+    "/api/admin/users/*": 120,
+    "/api/admin/classes": 300,
+    "/api/admin/schedules": 300,
+    "/api/schedule": 300,
+    "/api/teachers/*/classes": 300,
+    "/api/classes/*/students": 300,
+    "/api/users/*/profile": 300,
+    "/api/admin/settings": 600,
+}
+
+# Cached paths made stale by each kind of change; changes matching no rule clear the cache
+CACHE_INVALIDATIONS = {
+    "/api/auth/*": [],
+    "/api/admin/users/*": ["/api/admin/users/*", "/api/admin/dashboard", "/api/classes/*/students",
+                           "/api/dashboard/bootstrap"],
+    "/api/admin/classes*": ["/api/admin/classes", "/api/admin/dashboard", "/api/teachers/*", "/api/classes/*",
+                            "/api/schedule", "/api/dashboard/bootstrap"],
+    "/api/admin/schedules*": ["/api/admin/schedules", "/api/schedule"],
+    "/api/attendance*": ["/api/*/dashboard", "/api/*/class-dashboard", "/api/students/*/attendance",
+                         "/api/reports/*", "/api/dashboard/bootstrap"],
+    "/api/admin/settings/*": ["/api/admin/settings"],
+    "/api/admin/maintenance/backup": [],
+    "/api/users/*": ["/api/users/*", "/api/admin/users/*"],
+}
+
+@st.cache_resource
+def get_api_client():
+    """Pooled API client shared by every session and rerun"""
+    return api_client.APIClient(
+        API_BASE_URL,
+        cache=api_client.ResponseCache(CACHE_TTLS, CACHE_INVALIDATIONS)
+    )
+
+# The script re-executes on every rerun, so each rerun gets a fresh request scope
+api = api_client.RequestScope(get_api_client())
+
 def get_token():
     return st.session_state.get('token')
 
@@ -30,8 +76,8 @@ def login():
         
         if submitted:
             try:
-                response = requests.post(
-                    f"{API_BASE_URL}/api/auth/login",
+                response = api.post(
+                    "/api/auth/login",
                     json={"email": email, "password": password}
                 )
                 if response.status_code == 200:
@@ -49,6 +95,7 @@ def login():
                 st.error(f"An error occurred: {str(e)}")
 
 def logout():
+    api.client.cache.clear_user({"Authorization": f"Bearer {get_token()}"})
     for key in list(st.session_state.keys()):
         del st.session_state[key]
     st.experimental_rerun()
@@ -59,7 +106,7 @@ def student_dashboard():
     
     try:
         headers = {"Authorization": f"Bearer {get_token()}"}
-        response = requests.get(f"{API_BASE_URL}/api/students/{user['id']}/dashboard", headers=headers)
+        response = api.get(f"/api/students/{user['id']}/dashboard", headers=headers)
         
         if response.status_code == 200:
             data = response.json()
@@ -122,7 +169,7 @@ def class_teacher_dashboard():
     
     try:
         headers = {"Authorization": f"Bearer {get_token()}"}
-        response = requests.get(f"{API_BASE_URL}/api/teachers/{user['id']}/class-dashboard", headers=headers)
+        response = api.get(f"/api/teachers/{user['id']}/class-dashboard", headers=headers)
         
         if response.status_code == 200:
             data = response.json()
@@ -182,7 +229,7 @@ def teacher_dashboard():
     
     try:
         headers = {"Authorization": f"Bearer {get_token()}"}
-        response = requests.get(f"{API_BASE_URL}/api/teachers/{user['id']}/dashboard", headers=headers)
+        response = api.get(f"/api/teachers/{user['id']}/dashboard", headers=headers)
         
         if response.status_code == 200:
             data = response.json()
@@ -242,7 +289,7 @@ def admin_dashboard():
     st.title("Admin Dashboard")
     try:
         headers = {"Authorization": f"Bearer {get_token()}"}
-        response = requests.get(f"{API_BASE_URL}/api/admin/dashboard", headers=headers)
+        response = api.get("/api/admin/dashboard", headers=headers)
         
         if response.status_code == 200:
             data = response.json()
@@ -305,12 +352,20 @@ def user_management():
     try:
         headers = {"Authorization": f"Bearer {get_token()}"}
         
+        # Every tab renders on each rerun, so fetch the three lists concurrently;
+        # the GETs in the tabs below reuse these responses
+        api.batch([
+            "/api/admin/users/teachers",
+            "/api/admin/users/students",
+            "/api/admin/users/admins"
+        ], headers=headers)
+        
         # Tabs for different user types
         tab1, tab2, tab3 = st.tabs(["Teachers", "Students", "Admins"])
         
         with tab1:
             st.subheader("Teachers Management")
-            response = requests.get(f"{API_BASE_URL}/api/admin/users/teachers", headers=headers)
+            response = api.get("/api/admin/users/teachers", headers=headers)
             if response.status_code == 200:
                 teachers = response.json()
                 if teachers:
@@ -342,8 +397,8 @@ def user_management():
                                         
                                         if st.form_submit_button("Update Teacher"):
                                             try:
-                                                response = requests.put(
-                                                    f"{API_BASE_URL}/api/admin/users/teachers/{teacher['ID']}",
+                                                response = api.put(
+                                                    f"/api/admin/users/teachers/{teacher['ID']}",
                                                     json={
                                                         "name": name,
                                                         "email": email,
@@ -364,8 +419,8 @@ def user_management():
                                 if st.button("Delete", key=f"delete_teacher_{teacher['ID']}", type="primary"):
                                     if st.confirm(f"Are you sure you want to delete teacher {teacher['Name']}?"):
                                         try:
-                                            response = requests.delete(
-                                                f"{API_BASE_URL}/api/admin/users/teachers/{teacher['ID']}",
+                                            response = api.delete(
+                                                f"/api/admin/users/teachers/{teacher['ID']}",
                                                 headers=headers
                                             )
                                             if response.status_code == 200:
@@ -388,8 +443,8 @@ def user_management():
                             
                             if st.form_submit_button("Create Teacher"):
                                 try:
-                                    response = requests.post(
-                                        f"{API_BASE_URL}/api/admin/users/teachers",
+                                    response = api.post(
+                                        "/api/admin/users/teachers",
                                         json={
                                             "full_name": name,
                                             "email": email,
@@ -417,7 +472,7 @@ def user_management():
 
         with tab2:
             st.subheader("Students Management")
-            response = requests.get(f"{API_BASE_URL}/api/admin/users/students", headers=headers)
+            response = api.get("/api/admin/users/students", headers=headers)
             if response.status_code == 200:
                 students = response.json()
                 if students:
@@ -452,8 +507,8 @@ def user_management():
                                         
                                         if st.form_submit_button("Update Student"):
                                             try:
-                                                response = requests.put(
-                                                    f"{API_BASE_URL}/api/admin/users/students/{student['ID']}",
+                                                response = api.put(
+                                                    f"/api/admin/users/students/{student['ID']}",
                                                     json={
                                                         "name": name,
                                                         "email": email,
@@ -475,8 +530,8 @@ def user_management():
                                 if st.button("Delete", key=f"delete_student_{student['ID']}", type="primary"):
                                     if st.confirm(f"Are you sure you want to delete student {student['Name']}?"):
                                         try:
-                                            response = requests.delete(
-                                                f"{API_BASE_URL}/api/admin/users/students/{student['ID']}",
+                                            response = api.delete(
+                                                f"/api/admin/users/students/{student['ID']}",
                                                 headers=headers
                                             )
                                             if response.status_code == 200:
@@ -499,8 +554,8 @@ def user_management():
                             
                             if st.form_submit_button("Create Student"):
                                 try:
-                                    response = requests.post(
-                                        f"{API_BASE_URL}/api/admin/users/students",
+                                    response = api.post(
+                                        "/api/admin/users/students",
                                         json={
                                             "name": name,
                                             "email": email,
@@ -524,7 +579,7 @@ def user_management():
 
         with tab3:
             st.subheader("Admins Management")
-            response = requests.get(f"{API_BASE_URL}/api/admin/users/admins", headers=headers)
+            response = api.get("/api/admin/users/admins", headers=headers)
             if response.status_code == 200:
                 admins = response.json()
                 if admins:
@@ -548,8 +603,8 @@ def user_management():
                                         
                                         if st.form_submit_button("Update Admin"):
                                             try:
-                                                response = requests.put(
-                                                    f"{API_BASE_URL}/api/admin/users/admins/{admin['ID']}",
+                                                response = api.put(
+                                                    f"/api/admin/users/admins/{admin['ID']}",
                                                     json={
                                                         "name": name,
                                                         "email": email
@@ -567,8 +622,8 @@ def user_management():
                                 if st.button("Delete", key=f"delete_admin_{admin['ID']}", type="primary"):
                                     if st.confirm(f"Are you sure you want to delete admin {admin['Name']}?"):
                                         try:
-                                            response = requests.delete(
-                                                f"{API_BASE_URL}/api/admin/users/admins/{admin['ID']}",
+                                            response = api.delete(
+                                                f"/api/admin/users/admins/{admin['ID']}",
                                                 headers=headers
                                             )
                                             if response.status_code == 200:
@@ -587,8 +642,8 @@ def user_management():
                             
                             if st.form_submit_button("Create Admin"):
                                 try:
-                                    response = requests.post(
-                                        f"{API_BASE_URL}/api/admin/users/admins",
+                                    response = api.post(
+                                        "/api/admin/users/admins",
                                         json={
                                             "name": name,
                                             "email": email,
@@ -615,7 +670,7 @@ def student_attendance():
     
     try:
         headers = {"Authorization": f"Bearer {get_token()}"}
-        response = requests.get(f"{API_BASE_URL}/api/students/{user['id']}/attendance", headers=headers)
+        response = api.get(f"/api/students/{user['id']}/attendance", headers=headers)
         
         if response.status_code == 200:
             data = response.json()
@@ -678,7 +733,7 @@ def view_schedule():
     
     try:
         headers = {"Authorization": f"Bearer {get_token()}"}
-        response = requests.get(f"{API_BASE_URL}/api/schedule", headers=headers)
+        response = api.get("/api/schedule", headers=headers)
         
         if response.status_code == 200:
             schedule_data = response.json()
@@ -713,10 +768,13 @@ def class_management():
     
     try:
         headers = {"Authorization": f"Bearer {get_token()}"}
-        response = requests.get(f"{API_BASE_URL}/api/admin/classes", headers=headers)
+        # Classes and the teacher list used by the class forms below come in one request
+        response = api.get("/api/dashboard/bootstrap", params={"view": "class_management"}, headers=headers)
         
         if response.status_code == 200:
-            classes = response.json()
+            data = response.json()
+            classes = data["classes"]
+            teachers = data["teachers"]
             
             # Create new class
             if st.button("Create New Class"):
@@ -727,9 +785,7 @@ def class_management():
                     division = st.text_input("Division")
                     subjects = st.text_area("Subjects (one per line)")
                     
-                    # Get teachers for class teacher assignment
-                    teachers_response = requests.get(f"{API_BASE_URL}/api/admin/users/teachers", headers=headers)
-                    teachers = teachers_response.json() if teachers_response.status_code == 200 else []
+                    # Teachers for class teacher assignment
                     teacher_names = [f"{t['name']} ({t['email']})" for t in teachers]
                     selected_teacher = st.selectbox("Class Teacher", options=["None"] + teacher_names)
                     
@@ -739,8 +795,8 @@ def class_management():
                             if selected_teacher != "None":
                                 teacher_id = next(t["id"] for t in teachers if f"{t['name']} ({t['email']})" == selected_teacher)
                             
-                            response = requests.post(
-                                f"{API_BASE_URL}/api/admin/classes",
+                            response = api.post(
+                                "/api/admin/classes",
                                 json={
                                     "name": name,
                                     "department": department,
@@ -784,8 +840,6 @@ def class_management():
                                                       value="\n".join(class_.get('subjects', [])))
                                 
                                 # Teacher selection for editing
-                                teachers_response = requests.get(f"{API_BASE_URL}/api/admin/users/teachers", headers=headers)
-                                teachers = teachers_response.json() if teachers_response.status_code == 200 else []
                                 teacher_names = [f"{t['name']} ({t['email']})" for t in teachers]
                                 current_teacher = next((f"{t['name']} ({t['email']})" for t in teachers 
                                                       if t['id'] == class_.get('class_teacher_id')), "None")
@@ -801,8 +855,8 @@ def class_management():
                                             teacher_id = next(t["id"] for t in teachers 
                                                            if f"{t['name']} ({t['email']})" == selected_teacher)
                                         
-                                        response = requests.put(
-                                            f"{API_BASE_URL}/api/admin/classes/{class_['id']}",
+                                        response = api.put(
+                                            f"/api/admin/classes/{class_['id']}",
                                             json={
                                                 "name": name,
                                                 "department": department,
@@ -824,8 +878,8 @@ def class_management():
                         if st.button("Delete", key=f"delete_class_{class_['id']}", type="primary"):
                             if st.confirm(f"Are you sure you want to delete class {class_['name']}?"):
                                 try:
-                                    response = requests.delete(
-                                        f"{API_BASE_URL}/api/admin/classes/{class_['id']}",
+                                    response = api.delete(
+                                        f"/api/admin/classes/{class_['id']}",
                                         headers=headers
                                     )
                                     if response.status_code == 200:
@@ -845,8 +899,8 @@ def manage_schedule():
     try:
         headers = {"Authorization": f"Bearer {get_token()}"}
         
-        # Get all schedules
-        response = requests.get(f"{API_BASE_URL}/api/admin/schedules", headers=headers)
+        # Get all schedules, and the classes used by the schedule form
+        response, _ = api.batch(["/api/admin/schedules", "/api/admin/classes"], headers=headers)
         if response.status_code == 200:
             schedules = response.json()
             
@@ -854,7 +908,7 @@ def manage_schedule():
             if st.button("Create New Schedule"):
                 with st.form("new_schedule"):
                     # Class selection
-                    classes_response = requests.get(f"{API_BASE_URL}/api/admin/classes", headers=headers)
+                    classes_response = api.get("/api/admin/classes", headers=headers)
                     classes = classes_response.json() if classes_response.status_code == 200 else []
                     class_names = [f"{c['name']} - {c['department']} {c['year']} {c['division']}" for c in classes]
                     selected_class = st.selectbox("Select Class", options=class_names)
@@ -873,8 +927,8 @@ def manage_schedule():
                     if st.form_submit_button("Create Schedule"):
                         try:
                             end_time = (datetime.combine(datetime.today(), start_time) + timedelta(hours=duration)).time()
-                            response = requests.post(
-                                f"{API_BASE_URL}/api/admin/schedules",
+                            response = api.post(
+                                "/api/admin/schedules",
                                 json={
                                     "class_id": class_id,
                                     "day": day,
@@ -927,8 +981,8 @@ def manage_schedule():
                                             if st.form_submit_button("Update"):
                                                 try:
                                                     end_time = (datetime.combine(datetime.today(), start_time) + timedelta(hours=duration)).time()
-                                                    response = requests.put(
-                                                        f"{API_BASE_URL}/api/admin/schedules/{schedule['id']}",
+                                                    response = api.put(
+                                                        f"/api/admin/schedules/{schedule['id']}",
                                                         json={
                                                             "start_time": start_time.strftime("%H:%M"),
                                                             "end_time": end_time.strftime("%H:%M"),
@@ -948,10 +1002,10 @@ def manage_schedule():
                                                     st.error(f"Error: {str(e)}")
                                     
                                     if st.button("Delete", key=f"delete_{schedule['id']}", type="primary"):
-                                        if st.confirm(f"Are you sure you want to delete this schedule?"):
+                                        if st.confirm("Are you sure you want to delete this schedule?"):
                                             try:
-                                                response = requests.delete(
-                                                    f"{API_BASE_URL}/api/admin/schedules/{schedule['id']}",
+                                                response = api.delete(
+                                                    f"/api/admin/schedules/{schedule['id']}",
                                                     headers=headers
                                                 )
                                                 if response.status_code == 200:
@@ -974,7 +1028,7 @@ def take_attendance():
         headers = {"Authorization": f"Bearer {get_token()}"}
         
         # Get user's classes
-        response = requests.get(f"{API_BASE_URL}/api/teachers/{user['id']}/classes", headers=headers)
+        response = api.get(f"/api/teachers/{user['id']}/classes", headers=headers)
         
         if response.status_code == 200:
             classes = response.json()
@@ -990,8 +1044,8 @@ def take_attendance():
                 class_id = next(c['id'] for c in classes if f"{c['name']} - {c['subject']}" == selected_class)
                 
                 # Get class students
-                students_response = requests.get(
-                    f"{API_BASE_URL}/api/classes/{class_id}/students",
+                students_response = api.get(
+                    f"/api/classes/{class_id}/students",
                     headers=headers
                 )
                 
@@ -1014,8 +1068,8 @@ def take_attendance():
                         note = st.text_area("Notes (optional)")
                         
                         if st.form_submit_button("Submit Attendance"):
-                            submit_response = requests.post(
-                                f"{API_BASE_URL}/api/attendance",
+                            submit_response = api.post(
+                                "/api/attendance",
                                 json={
                                     "class_id": class_id,
                                     "date": date.strftime("%Y-%m-%d"),
@@ -1042,7 +1096,7 @@ def view_reports():
         headers = {"Authorization": f"Bearer {get_token()}"}
         
         # Get user's classes
-        response = requests.get(f"{API_BASE_URL}/api/teachers/{user['id']}/classes", headers=headers)
+        response = api.get(f"/api/teachers/{user['id']}/classes", headers=headers)
         
         if response.status_code == 200:
             classes = response.json()
@@ -1065,8 +1119,8 @@ def view_reports():
                     end_date = st.date_input("To Date", datetime.now())
                 
                 # Get attendance reports
-                report_response = requests.get(
-                    f"{API_BASE_URL}/api/reports/{class_id}",
+                report_response = api.get(
+                    f"/api/reports/{class_id}",
                     params={
                         "start_date": start_date.strftime("%Y-%m-%d"),
                         "end_date": end_date.strftime("%Y-%m-%d")
@@ -1128,8 +1182,8 @@ def system_reports():
             end_date = st.date_input("To Date", datetime.now())
         
         if st.button("Generate Report"):
-            response = requests.get(
-                f"{API_BASE_URL}/api/reports/system",
+            response = api.get(
+                "/api/reports/system",
                 params={
                     "type": report_type.lower(),
                     "start_date": start_date.strftime("%Y-%m-%d"),
@@ -1204,7 +1258,7 @@ def system_settings():
         headers = {"Authorization": f"Bearer {get_token()}"}
         
         # Get current settings
-        response = requests.get(f"{API_BASE_URL}/api/admin/settings", headers=headers)
+        response = api.get("/api/admin/settings", headers=headers)
         
         if response.status_code == 200:
             settings = response.json()
@@ -1237,8 +1291,8 @@ def system_settings():
                     )
                 
                 if st.form_submit_button("Save General Settings"):
-                    update_response = requests.put(
-                        f"{API_BASE_URL}/api/admin/settings/general",
+                    update_response = api.put(
+                        "/api/admin/settings/general",
                         json={
                             "min_attendance": min_attendance,
                             "session_timeout": session_timeout,
@@ -1269,8 +1323,8 @@ def system_settings():
                 )
                 
                 if st.form_submit_button("Save Notification Settings"):
-                    update_response = requests.put(
-                        f"{API_BASE_URL}/api/admin/settings/notifications",
+                    update_response = api.put(
+                        "/api/admin/settings/notifications",
                         json={
                             "email_notifications": email_notifications,
                             "notify_low_attendance": notify_low_attendance,
@@ -1304,8 +1358,8 @@ def system_settings():
                 )
                 
                 if st.form_submit_button("Save Backup Settings"):
-                    update_response = requests.put(
-                        f"{API_BASE_URL}/api/admin/settings/backup",
+                    update_response = api.put(
+                        "/api/admin/settings/backup",
                         json={
                             "auto_backup": auto_backup,
                             "backup_frequency": backup_frequency,
@@ -1323,8 +1377,8 @@ def system_settings():
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("Backup Now"):
-                    backup_response = requests.post(
-                        f"{API_BASE_URL}/api/admin/maintenance/backup",
+                    backup_response = api.post(
+                        "/api/admin/maintenance/backup",
                         headers=headers
                     )
                     if backup_response.status_code == 200:
@@ -1334,8 +1388,8 @@ def system_settings():
             
             with col2:
                 if st.button("Clear Cache"):
-                    cache_response = requests.post(
-                        f"{API_BASE_URL}/api/admin/maintenance/clear-cache",
+                    cache_response = api.post(
+                        "/api/admin/maintenance/clear-cache",
                         headers=headers
                     )
                     if cache_response.status_code == 200:
@@ -1352,7 +1406,7 @@ def user_profile():
     
     try:
         headers = {"Authorization": f"Bearer {get_token()}"}
-        response = requests.get(f"{API_BASE_URL}/api/users/{user['id']}/profile", headers=headers)
+        response = api.get(f"/api/users/{user['id']}/profile", headers=headers)
         
         if response.status_code == 200:
             profile = response.json()
@@ -1395,8 +1449,8 @@ def user_profile():
                     if new_password != confirm_password:
                         st.error("New passwords do not match")
                     else:
-                        response = requests.post(
-                            f"{API_BASE_URL}/api/users/{user['id']}/change-password",
+                        response = api.post(
+                            f"/api/users/{user['id']}/change-password",
                             json={
                                 "current_password": current_password,
                                 "new_password": new_password
@@ -1417,8 +1471,8 @@ def user_profile():
                 email = st.text_input("Email", value=profile['email'])
                 
                 if st.form_submit_button("Update Profile"):
-                    response = requests.put(
-                        f"{API_BASE_URL}/api/users/{user['id']}/profile",
+                    response = api.put(
+                        f"/api/users/{user['id']}/profile",
                         json={
                             "full_name": full_name,
                             "email": email
@@ -1505,7 +1559,8 @@ def main():
     
     elif user['role'] == ROLE_CLASS_TEACHER:
         if page == "Dashboard":
-            class_teacher_dashboard()        elif page == "Class Management":
+            class_teacher_dashboard()
+        elif page == "Class Management":
             class_management()
         elif page == "Take Attendance":
             take_attendance()
@@ -20,6 +20,10 @@ def initialize_db():
     if not os.path.exists(data_dir):
         os.makedirs(data_dir)
     
+    # Create the image, attendance and scratch directories
+    for dir_name in ['student_images', 'attendance', 'temp']:
+        os.makedirs(os.path.join(data_dir, dir_name), exist_ok=True)
+    
     # Create users file if it doesn't exist
     if not os.path.exists(USERS_FILE):
         with open(USERS_FILE, 'w') as f:
@@ -184,7 +188,7 @@ def update_teacher_info(user_id: str, info: TeacherInfo) -> Optional[Dict[str, A
     return update_user(user_id, {"teacher_info": info.dict()})
 
 
-def get_all_users(role: Optional[UserRole] = None) -> List[Dict[str, Any]]:
+def get_all_users(role: Optional[Role] = None) -> List[Dict[str, Any]]:
     """Get all users, optionally filtered by role"""
     users = load_users()
     
@@ -245,7 +249,3 @@ def save_json_data(file_path: str, data: Any):
     with open(file_path, 'w') as f:
         json.dump(data, f, indent=4)
 
-
-# Initialize database on import
-initialize_db()
-create_admin_if_not_exists()
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Set
+
+import rollups
+
+# Per-subscriber queue bound; the oldest event is dropped when a slow client falls behind
+MAX_QUEUE_SIZE = 100
+
+# Topic that every staff subscriber receives attendance events on
+ATTENDANCE_TOPIC = "attendance:all"
+
+
+class Subscription:
+    """One connected client: the topics it listens to and its event queue"""
+
+    def __init__(self, keys: Iterable[str], loop: asyncio.AbstractEventLoop, max_queue: int = MAX_QUEUE_SIZE):
+        self.keys = set(keys)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_queue)
+
+    def _deliver(self, event: Dict[str, Any]):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Wait for the next event, returning None if timeout expires first"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBroker:
+    """
+    In-process publish/subscribe broker
+    Subscriptions are indexed by topic key, so publishing touches only the
+    subscribers of the event's targets. No external service is required.
+    """
+
+    def __init__(self):
+        self._topics = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, keys: Iterable[str]) -> Subscription:
+        subscription = Subscription(keys, asyncio.get_event_loop())
+        with self._lock:
+            for key in subscription.keys:
+                self._topics.setdefault(key, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            for key in subscription.keys:
+                subscribers = self._topics.get(key)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._topics[key]
+
+    def publish(self, keys: Iterable[str], event_type: str, data: Any) -> int:
+        """Deliver an event to every subscriber of any of the keys; returns the number reached"""
+        event = {
+            "type": event_type,
+            "data": data,
+            "published_at": datetime.now().isoformat()
+        }
+
+        recipients: Set[Subscription] = set()
+        with self._lock:
+            for key in keys:
+                recipients.update(self._topics.get(key, ()))
+
+        for subscription in recipients:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, event)
+            except RuntimeError:
+                # The subscriber's event loop has already been closed
+                self.unsubscribe(subscription)
+
+        return len(recipients)
+
+
+broker = EventBroker()
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Format an event as a server-sent events message"""
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+def publish_notification(notification: Dict[str, Any], target_key: str):
+    """Push a newly created notification to the users it targets"""
+    try:
+        broker.publish([target_key], "notification", notification)
+    except Exception as e:
+        print(f"Error publishing notification event: {e}")
+
+
+def class_topic(department: Optional[str], year: Optional[str], division: Optional[str]) -> str:
+    """Topic that a class's students receive the class's attendance events on"""
+    return f"attendance:{department}_{year}_{division}"
+
+
+def publish_attendance_session(record: Dict[str, Any]):
+    """Push an attendance-session completion event to staff, the teacher who took it and the class"""
+    present_count, total_count = rollups.session_counts(record)
+    department = record.get("department")
+    year = record.get("year")
+    division = record.get("division")
+    taken_by = record.get("teacher_id") or record.get("taken_by")
+
+    summary = {
+        "id": record.get("id"),
+        "date": record.get("date"),
+        "time": record.get("time"),
+        "department": department,
+        "year": year,
+        "division": division,
+        "subject": record.get("subject"),
+        "taken_by": taken_by,
+        "present_count": present_count,
+        "total_count": total_count
+    }
+
+    try:
+        broker.publish(
+            [ATTENDANCE_TOPIC, class_topic(department, year, division), f"user:{taken_by}"],
+            "attendance_session",
+            summary
+        )
+    except Exception as e:
+        print(f"Error publishing attendance event: {e}")
@@ -0,0 +1,102 @@
+import os
+import json
+import threading
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+import pagination
+
+# Define file paths
+current_dir = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.join(current_dir, 'data')
+ATTENDANCE_HISTORY_FILE = os.path.join(data_dir, 'attendance_history.json')
+
+# Record fields with an equality index (field -> value -> ascending record positions)
+INDEXED_FIELDS = ("department", "year", "division", "subject", "date")
+
+_lock = threading.Lock()
+_state = {'mtime': None, 'history': [], 'postings': {}}
+
+
+def _load() -> Tuple[List[Dict[str, Any]], Dict[str, Dict[Any, List[int]]]]:
+    """Reload attendance_history.json and rebuild the postings only when the file has changed"""
+    with _lock:
+        if not os.path.exists(ATTENDANCE_HISTORY_FILE):
+            _state.update({'mtime': None, 'history': [], 'postings': {}})
+            return _state['history'], _state['postings']
+
+        mtime = os.path.getmtime(ATTENDANCE_HISTORY_FILE)
+        if _state['mtime'] != mtime:
+            try:
+                with open(ATTENDANCE_HISTORY_FILE, 'r') as f:
+                    history = json.load(f)
+            except Exception as e:
+                print(f"Error loading attendance history: {e}")
+                return _state['history'], _state['postings']
+
+            postings = {field: {} for field in INDEXED_FIELDS}
+            for position, record in enumerate(history):
+                for field in INDEXED_FIELDS:
+                    postings[field].setdefault(record.get(field), []).append(position)
+
+            _state.update({'mtime': mtime, 'history': history, 'postings': postings})
+        return _state['history'], _state['postings']
+
+
+def get_history() -> List[Dict[str, Any]]:
+    """Get all attendance records (shared in-process copy, do not modify)"""
+    history, _ = _load()
+    return history
+
+
+def page_history(
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    **filters: Optional[str]
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Get one page of attendance records matching the filters, in file order
+    Equality filters (see INDEXED_FIELDS) pick the shortest postings list to walk,
+    starting just after the cursor, so a page visits only the candidates it needs.
+    Raises ValueError for an invalid cursor
+    """
+    start = -1
+    if cursor:
+        start = pagination.decode_cursor(cursor)
+        if not isinstance(start, int):
+            raise ValueError("Invalid cursor")
+
+    history, postings = _load()
+    filters = {field: value for field, value in filters.items() if value}
+
+    candidates = None
+    for field, value in filters.items():
+        if field not in postings:
+            raise ValueError(f"Unsupported filter: {field}")
+        positions = postings[field].get(value, [])
+        if candidates is None or len(positions) < len(candidates):
+            candidates = positions
+
+    if candidates is None:
+        positions = range(start + 1, len(history))
+    else:
+        positions = (candidates[i] for i in range(bisect_right(candidates, start), len(candidates)))
+
+    page = []
+    last_position = None
+    for position in positions:
+        record = history[position]
+        if any(record.get(field) != value for field, value in filters.items()):
+            continue
+        date = record.get("date") or ""
+        if (start_date and date < start_date) or (end_date and date > end_date):
+            continue
+
+        if limit is not None and len(page) == limit:
+            return page, pagination.encode_cursor(last_position)
+        page.append(record)
+        last_position = position
+
+    return page, None
@@ -1,11 +1,14 @@
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from compression import CompressionMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
 import uvicorn
 
 # Import API routers
-from routers import auth, students, teachers, attendance, admin, dashboard, reports, notifications
+from routers import auth, students, teachers, attendance, admin, dashboard, reports, notifications, events
+import database
+import recognition
 
 # Create FastAPI app
 app = FastAPI(
@@ -23,13 +26,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create necessary directories
+# Compress report, history and dashboard payloads (small and binary responses are skipped)
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+# Define file paths
 current_dir = os.path.dirname(os.path.abspath(__file__))
 data_dir = os.path.join(current_dir, 'data')
-for dir_name in ['student_images', 'attendance', 'temp']:
-    dir_path = os.path.join(data_dir, dir_name)
-    if not os.path.exists(dir_path):
-        os.makedirs(dir_path)
+
+
+@app.on_event("startup")
+def prepare_storage():
+    """Create the data files, directories and default admin before serving requests"""
+    database.initialize_db()
+    database.create_admin_if_not_exists()
+
+
+@app.on_event("startup")
+def preload_recognition():
+    """Load the face recognition models up front when RECOGNITION_PRELOAD is set"""
+    if recognition.preload_requested():
+        recognition.preload()
+
 
 # Include API routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
@@ -40,9 +57,14 @@ app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard"])
 app.include_router(reports.router, prefix="/api/reports", tags=["Reports"])
 app.include_router(notifications.router, prefix="/api/notifications", tags=["Notifications"])
+app.include_router(events.router, prefix="/api/events", tags=["Events"])
 
-# Mount static files for student images
-app.mount("/images/students", StaticFiles(directory=os.path.join(data_dir, "student_images")), name="student_images")
+# Mount static files for student images (the directory is created on startup)
+app.mount(
+    "/images/students",
+    StaticFiles(directory=os.path.join(data_dir, "student_images"), check_dir=False),
+    name="student_images"
+)
 
 # Health check endpoint
 @app.get("/health", tags=["Health"])
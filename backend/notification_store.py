@@ -0,0 +1,226 @@
+import os
+import json
+import heapq
+import threading
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pagination
+
+# Define file paths
+current_dir = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.join(current_dir, 'data')
+NOTIFICATIONS_FILE = os.path.join(data_dir, 'notifications.json')
+
+_lock = threading.RLock()
+_state = {'mtime': None, 'notifications': [], 'by_id': {}, 'by_seq': {}, 'targets': {}, 'target_seqs': {}, 'last_seq': 0}
+
+
+def target_key(target_type: str, target_value: Optional[str] = None) -> str:
+    """Get the index key for a notification target"""
+    if target_type == "all":
+        return "all"
+    return f"{target_type}:{target_value}"
+
+
+def user_target_keys(user: Dict[str, Any]) -> List[str]:
+    """Get the index keys of every target that reaches a user"""
+    keys = ["all", target_key("role", user.get("role")), target_key("user", user.get("id"))]
+
+    # Class notifications are only delivered to students
+    if user.get("role") == "student":
+        student_info = user.get("student_info", {})
+        class_key = f"{student_info.get('department')}_{student_info.get('year')}_{student_info.get('division')}"
+        keys.append(target_key("class", class_key))
+
+    return keys
+
+
+def _sort_key(notification: Dict[str, Any]) -> Tuple[str, str]:
+    return notification.get("created_at", ""), notification.get("id", "")
+
+
+def _index(notification: Dict[str, Any]):
+    """Add a notification to the id/seq indexes and its target's created_at- and seq-ordered lists"""
+    _state['by_id'][notification.get("id")] = notification
+    _state['by_seq'][notification["seq"]] = notification
+    _state['last_seq'] = max(_state['last_seq'], notification["seq"])
+    key = target_key(notification.get("target_type"), notification.get("target_value"))
+    keys, items = _state['targets'].setdefault(key, ([], []))
+    position = bisect_left(keys, _sort_key(notification))
+    keys.insert(position, _sort_key(notification))
+    items.insert(position, notification)
+    insort(_state['target_seqs'].setdefault(key, []), notification["seq"])
+
+
+def _load():
+    """Reload notifications.json and rebuild the indexes only when the file has changed"""
+    with _lock:
+        if not os.path.exists(NOTIFICATIONS_FILE):
+            with open(NOTIFICATIONS_FILE, 'w') as f:
+                json.dump({'last_seq': 0, 'notifications': []}, f)
+
+        mtime = os.path.getmtime(NOTIFICATIONS_FILE)
+        if _state['mtime'] != mtime:
+            with open(NOTIFICATIONS_FILE, 'r') as f:
+                stored = json.load(f)
+
+            # The file used to be a plain list, without the sequence counter
+            upgrade = isinstance(stored, list)
+            notifications = stored if upgrade else stored.get('notifications', [])
+            stored_seq = 0 if upgrade else stored.get('last_seq', 0)
+
+            # Notifications created before sequence numbers existed are numbered in file order
+            last_seq = max([stored_seq] + [n.get("seq", 0) for n in notifications])
+            unnumbered = [n for n in notifications if "seq" not in n]
+            for notification in unnumbered:
+                last_seq += 1
+                notification["seq"] = last_seq
+
+            _state.update({'notifications': notifications, 'by_id': {}, 'by_seq': {},
+                           'targets': {}, 'target_seqs': {}, 'last_seq': last_seq})
+            for notification in notifications:
+                _index(notification)
+            _state['mtime'] = mtime
+
+            if unnumbered or upgrade:
+                _save()
+
+
+def _save():
+    # last_seq is kept even when the newest notifications are deleted, so a sequence number is never reused
+    with open(NOTIFICATIONS_FILE, 'w') as f:
+        json.dump({'last_seq': _state['last_seq'], 'notifications': _state['notifications']}, f, indent=4)
+    _state['mtime'] = os.path.getmtime(NOTIFICATIONS_FILE)
+
+
+def get_notifications() -> List[Dict[str, Any]]:
+    """Get all notifications (shared in-process copy, do not modify)"""
+    with _lock:
+        _load()
+        return _state['notifications']
+
+
+def get_notification(notification_id: str) -> Optional[Dict[str, Any]]:
+    """Get a notification by ID"""
+    with _lock:
+        _load()
+        return _state['by_id'].get(notification_id)
+
+
+def add_notification(notification: Dict[str, Any]):
+    """Assign the next sequence number, persist a new notification and insert it into the indexes"""
+    with _lock:
+        _load()
+        notification["seq"] = _state['last_seq'] + 1
+        _state['notifications'].append(notification)
+        _index(notification)
+        _save()
+
+
+def remove_notification(notification_id: str) -> bool:
+    """Delete a notification and drop it from the indexes"""
+    with _lock:
+        _load()
+        notification = _state['by_id'].pop(notification_id, None)
+        if notification is None:
+            return False
+        _state['by_seq'].pop(notification["seq"], None)
+
+        _state['notifications'] = [n for n in _state['notifications'] if n.get("id") != notification_id]
+
+        key = target_key(notification.get("target_type"), notification.get("target_value"))
+        keys, items = _state['targets'].get(key, ([], []))
+        position = bisect_left(keys, _sort_key(notification))
+        while position < len(items) and items[position] is not notification:
+            position += 1
+        if position < len(items):
+            del keys[position]
+            del items[position]
+
+        seqs = _state['target_seqs'].get(key, [])
+        position = bisect_left(seqs, notification["seq"])
+        if position < len(seqs) and seqs[position] == notification["seq"]:
+            del seqs[position]
+
+        _save()
+        return True
+
+
+def latest_seq() -> int:
+    """Get the highest sequence number assigned so far"""
+    with _lock:
+        _load()
+        return _state['last_seq']
+
+
+def is_visible(seq: int, keys: List[str]) -> bool:
+    """Check whether the notification with a sequence number exists and targets one of the keys"""
+    with _lock:
+        _load()
+        notification = _state['by_seq'].get(seq)
+        if notification is None:
+            return False
+        return target_key(notification.get("target_type"), notification.get("target_value")) in keys
+
+
+def count_visible(keys: List[str], up_to_seq: Optional[int] = None) -> int:
+    """Count the notifications targeting any of the keys, optionally only those with seq <= up_to_seq"""
+    with _lock:
+        _load()
+        count = 0
+        for key in keys:
+            seqs = _state['target_seqs'].get(key)
+            if seqs:
+                count += len(seqs) if up_to_seq is None else bisect_right(seqs, up_to_seq)
+        return count
+
+
+def encode_cursor(notification: Dict[str, Any]) -> str:
+    """Encode an opaque cursor pointing just past a notification"""
+    return pagination.encode_cursor(list(_sort_key(notification)))
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Decode a cursor produced by encode_cursor (raises ValueError if invalid)"""
+    try:
+        created_at, notification_id = pagination.decode_cursor(cursor)
+        return str(created_at), str(notification_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _newest_first(keys: List[Tuple[str, str]], items: List[Dict[str, Any]],
+                  before: Optional[Tuple[str, str]]) -> Iterator[Dict[str, Any]]:
+    end = bisect_left(keys, before) if before is not None else len(items)
+    for position in range(end - 1, -1, -1):
+        yield items[position]
+
+
+def get_feed(user: Dict[str, Any], limit: Optional[int] = None,
+             cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Get one page of a user's notifications, newest first, and the cursor for the next page
+    The feed is a k-way merge of the pre-sorted lists of the user's few targets,
+    so only the returned page is materialized. The cursor is None when the feed is exhausted
+    """
+    before = decode_cursor(cursor) if cursor else None
+
+    with _lock:
+        _load()
+        streams = []
+        for key in user_target_keys(user):
+            if key in _state['targets']:
+                keys, items = _state['targets'][key]
+                streams.append(_newest_first(keys, items, before))
+
+        feed = heapq.merge(*streams, key=_sort_key, reverse=True)
+        if limit is None:
+            return list(feed), None
+        page = list(islice(feed, limit + 1))
+
+    if len(page) > limit and limit > 0:
+        page = page[:limit]
+        return page, encode_cursor(page[-1])
+    return page[:max(limit, 0)], None
@@ -0,0 +1,58 @@
+import json
+import base64
+from typing import Any, Dict, Iterable, List, Optional
+
+# Largest page size accepted by the list endpoints
+MAX_LIMIT = 500
+
+# Fields never returned by list endpoints
+PRIVATE_FIELDS = ("hashed_password",)
+
+
+def encode_cursor(value: Any) -> str:
+    """Encode a JSON-serializable position as an opaque cursor"""
+    raw = json.dumps(value, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Any:
+    """Decode a cursor produced by encode_cursor (raises ValueError if invalid)"""
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated fields parameter; None means all fields"""
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    return names or None
+
+
+def project(item: Dict[str, Any], fields: Optional[List[str]], exclude: Iterable[str] = PRIVATE_FIELDS) -> Dict[str, Any]:
+    """Copy the requested top-level fields of an item, always dropping the excluded ones"""
+    if fields is None:
+        return {key: value for key, value in item.items() if key not in exclude}
+    return {key: item[key] for key in fields if key in item and key not in exclude}
+
+
+def page_response(items: List[Dict[str, Any]], limit: Optional[int], next_cursor: Optional[str],
+                  fields: Optional[str] = None, exclude: Iterable[str] = PRIVATE_FIELDS):
+    """
+    Shape a list endpoint response
+    Without limit the items are returned as a plain list, as before; with limit
+    they are wrapped with the cursor of the next page (None on the last page)
+    """
+    names = parse_fields(fields)
+    exclude = tuple(exclude)
+    items = [
+        project(item, names, exclude)
+        if names is not None or any(key in item for key in exclude) else item
+        for item in items
+    ]
+
+    if limit is None:
+        return items
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,124 @@
+import os
+import json
+import threading
+from typing import Any, Dict, Iterable, List
+
+import notification_store
+
+# Define file paths
+current_dir = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.join(current_dir, 'data')
+READS_DIR = os.path.join(data_dir, 'notification_reads')
+
+_lock = threading.Lock()
+_cache = {}
+
+
+def _path(user_id: str) -> str:
+    return os.path.join(READS_DIR, f"{user_id}.json")
+
+
+def _load(user_id: str) -> Dict[str, int]:
+    """
+    Load a user's read state: every notification with seq <= hwm is read, and bit i
+    of bits marks seq hwm + 1 + i as read. Reuses the cached copy while the file is unchanged
+    """
+    path = _path(user_id)
+    if not os.path.exists(path):
+        return {'hwm': 0, 'bits': 0}
+
+    mtime = os.path.getmtime(path)
+    cached = _cache.get(user_id)
+    if cached is None or cached[0] != mtime:
+        try:
+            with open(path, 'r') as f:
+                stored = json.load(f)
+            cached = (mtime, {'hwm': stored.get('hwm', 0), 'bits': int(stored.get('bits', '0'), 16)})
+        except Exception as e:
+            print(f"Error loading read state: {e}")
+            return {'hwm': 0, 'bits': 0}
+        _cache[user_id] = cached
+    return dict(cached[1])
+
+
+def _save(user_id: str, state: Dict[str, int]):
+    """Write one user's read state (a few bytes) atomically"""
+    if not os.path.exists(READS_DIR):
+        os.makedirs(READS_DIR)
+
+    path = _path(user_id)
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'w') as f:
+        json.dump({'hwm': state['hwm'], 'bits': format(state['bits'], 'x')}, f)
+    os.replace(temp_file, path)
+    _cache[user_id] = (os.path.getmtime(path), dict(state))
+
+
+def _compact(state: Dict[str, int], keys: List[str]):
+    """
+    Advance the high-water mark over read notifications and over sequence numbers the
+    user can never see (other targets, deleted), keeping the bitset short
+    """
+    last_seq = notification_store.latest_seq()
+    while state['hwm'] < last_seq:
+        seq = state['hwm'] + 1
+        if not state['bits'] & 1 and notification_store.is_visible(seq, keys):
+            break
+        state['hwm'] = seq
+        state['bits'] >>= 1
+
+
+def _set_bits(state: Dict[str, int]) -> Iterable[int]:
+    """Yield the sequence numbers marked read above the high-water mark"""
+    bits, seq = state['bits'], state['hwm'] + 1
+    while bits:
+        if bits & 1:
+            yield seq
+        bits >>= 1
+        seq += 1
+
+
+def is_read(state: Dict[str, int], seq: int) -> bool:
+    """Check a sequence number against a read state returned by get_state"""
+    if seq <= state['hwm']:
+        return True
+    return bool(state['bits'] >> (seq - state['hwm'] - 1) & 1)
+
+
+def get_state(user: Dict[str, Any]) -> Dict[str, int]:
+    """Get a user's read state"""
+    with _lock:
+        return _load(user.get("id"))
+
+
+def mark_read(user: Dict[str, Any], seq: int):
+    """Mark one notification as read for a user"""
+    user_id = user.get("id")
+    with _lock:
+        state = _load(user_id)
+        if is_read(state, seq):
+            return
+        state['bits'] |= 1 << (seq - state['hwm'] - 1)
+        _compact(state, notification_store.user_target_keys(user))
+        _save(user_id, state)
+
+
+def mark_all_read(user: Dict[str, Any]):
+    """Mark every current notification as read with a single small write"""
+    with _lock:
+        _save(user.get("id"), {'hwm': notification_store.latest_seq(), 'bits': 0})
+
+
+def unread_count(user: Dict[str, Any]) -> int:
+    """
+    Count a user's unread notifications
+    Visible counts come from the per-target sequence lists (one bisect per target),
+    and only the few read bits above the high-water mark are inspected
+    """
+    keys = notification_store.user_target_keys(user)
+    state = get_state(user)
+
+    total = notification_store.count_visible(keys)
+    read = notification_store.count_visible(keys, state['hwm'])
+    read += sum(1 for seq in _set_bits(state) if notification_store.is_visible(seq, keys))
+    return max(total - read, 0)
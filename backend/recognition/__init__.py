@@ -0,0 +1,14 @@
+# Face detection and recognition subsystem
+# DeepFace (and with it TensorFlow), OpenCV, Pillow and NumPy are imported on first
+# use, so importing this package, and the routers that use it, stays cheap
+from recognition import config
+from recognition.backends import get_backend
+from recognition.loader import RecognitionUnavailable, preload, preload_requested
+from recognition.faces import process_face, extract_faces, verify_face, match_class_photo
+from recognition.embeddings import embed_crops, embed_image
+from recognition.gallery import reference_embeddings
+from recognition.quantization import QuantizedMatrix
+from recognition.matching import similarity, best_matches, EarlyExitMatcher
+from recognition.index import IVFIndex, campus_index, photo_changed
+from recognition.templates import TemplateGallery, student_templates, add_captures, forget_student
+from recognition.quality import gate as quality_gate
@@ -0,0 +1,38 @@
+# Pluggable inference backends; RECOGNITION_BACKEND picks the one used by the app
+import threading
+from typing import Optional
+
+from recognition import config
+from recognition.backends.base import Backend, Detector, Recognizer, face_to_bgr, read_image
+from recognition.backends.deepface_backend import DeepFaceBackend
+from recognition.backends.onnx_backend import OnnxBackend
+from recognition.backends.cascade import FAST_DETECTORS, CascadeDetector
+from recognition.backends.tiling import TiledDetector
+
+BACKENDS = {
+    "deepface": DeepFaceBackend,
+    "onnx": OnnxBackend,
+}
+
+_lock = threading.Lock()
+_instances = {}
+
+
+def get_backend(name: Optional[str] = None) -> Backend:
+    """The process-wide instance of a backend (config.BACKEND by default)"""
+    name = (name or config.BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown recognition backend: {name}. Must be one of: {', '.join(BACKENDS)}")
+
+    with _lock:
+        backend = _instances.get(name)
+        if backend is None:
+            backend = BACKENDS[name]()
+            if config.DETECTOR_CASCADE in FAST_DETECTORS:
+                backend.detector = CascadeDetector(FAST_DETECTORS[config.DETECTOR_CASCADE](), backend.detector)
+            elif config.DETECTOR_CASCADE != "off":
+                print(f"Error reading RECOGNITION_DETECTOR_CASCADE ({config.DETECTOR_CASCADE}), using off")
+            if config.TILED_DETECTION:
+                backend.detector = TiledDetector(backend.detector)
+            _instances[name] = backend
+        return backend
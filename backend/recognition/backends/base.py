@@ -0,0 +1,82 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from recognition import loader
+
+
+class Detector:
+    """
+    Finds and aligns the faces in an image file
+    detect returns DeepFace extract_faces style dicts: 'face' is the aligned crop as
+    RGB floats in [0, 1], plus 'facial_area' ({x, y, w, h}), 'confidence' and, when the
+    detector has them, 'landmarks' (five (x, y) points, image-left eye first)
+    img_path may also be a BGR uint8 array; expected_faces is a hint of how many faces
+    the image should hold, which detectors are free to ignore
+    """
+
+    def load(self):
+        """Load the model now instead of on the first call"""
+
+    def detect(self, img_path, expected_faces: Optional[int] = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+
+class Recognizer:
+    """Embeds batches of aligned face crops"""
+
+    def load(self):
+        """Load the model now instead of on the first call"""
+
+    def input_size(self) -> Tuple[int, int]:
+        """(height, width) the crops are fitted into"""
+        raise NotImplementedError
+
+    def embed(self, batch):
+        """Raw embeddings for a (n, height, width, 3) float32 batch of BGR crops in [0, 1]"""
+        raise NotImplementedError
+
+
+def read_image(img_path):
+    """A BGR uint8 image from a file path (or the array itself)"""
+    np = loader.numpy()
+    if isinstance(img_path, np.ndarray):
+        return img_path
+    img = loader.cv2().imread(img_path)
+    if img is None:
+        raise ValueError(f"Could not load image: {img_path}")
+    return img
+
+
+def face_to_bgr(face):
+    """Convert a detector 'face' (RGB floats in [0, 1]) to a BGR uint8 crop"""
+    np = loader.numpy()
+    return (np.clip(face[:, :, ::-1], 0, 1) * 255).astype(np.uint8)
+
+
+class Backend:
+    """
+    A detector and a recognizer that are used together
+    name identifies the embedding space, so reference embeddings are cached per backend
+    """
+
+    name = None
+
+    def __init__(self, detector: Detector, recognizer: Recognizer):
+        self.detector = detector
+        self.recognizer = recognizer
+
+    def load(self):
+        self.detector.load()
+        self.recognizer.load()
+
+    def embed_image(self, img_path: str) -> Optional[Any]:
+        """
+        Raw embedding of the most confident face in an image file (used for reference photos)
+        Returns None when no face is found
+        """
+        from recognition import embeddings
+
+        faces = self.detector.detect(img_path)
+        if not faces:
+            return None
+        face = max(faces, key=lambda f: f.get("confidence") or 0)
+        return embeddings.forward_batches(self.recognizer, [face_to_bgr(face["face"])], 1)[0]
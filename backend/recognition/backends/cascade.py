@@ -0,0 +1,189 @@
+import os
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from recognition import config, loader
+from recognition.backends.base import Detector, read_image
+from recognition.backends.onnx_backend import align_face, nms
+
+# Each side of a face box is widened by this share of the box when the region is re-checked
+REGION_PADDING = 0.5
+
+
+class FastDetector:
+    """A cheap OpenCV face detector; detect_faces returns (x1, y1, x2, y2) boxes, scores in [0, 1] and landmarks or None"""
+
+    def load(self):
+        """Load the model now instead of on the first call"""
+
+    def detect_faces(self, img) -> Tuple[Any, Any, Optional[Any]]:
+        raise NotImplementedError
+
+
+class YuNetDetector(FastDetector):
+    """OpenCV's YuNet (cv2.FaceDetectorYN), with five landmarks per face"""
+
+    def __init__(self, model_path: str, score_threshold: float = config.DETECTION_THRESHOLD,
+                 nms_threshold: float = config.NMS_THRESHOLD):
+        self.model_path = model_path
+        self.score_threshold = score_threshold
+        self.nms_threshold = nms_threshold
+        self._model = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self._model is None:
+                if not os.path.exists(self.model_path):
+                    raise FileNotFoundError(f"YuNet model not found: {self.model_path}")
+                self._model = loader.cv2().FaceDetectorYN.create(
+                    self.model_path, "", (320, 320), self.score_threshold, self.nms_threshold
+                )
+        return self._model
+
+    def detect_faces(self, img):
+        np = loader.numpy()
+        model = self.load()
+        # The model object keeps its input size, so one image at a time
+        with self._lock:
+            model.setInputSize((img.shape[1], img.shape[0]))
+            _, rows = model.detect(img)
+        if rows is None:
+            return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32), np.zeros((0, 5, 2), dtype=np.float32)
+        boxes = np.concatenate([rows[:, :2], rows[:, :2] + rows[:, 2:4]], axis=1)
+        # Landmarks come image-left eye first, the order of the ArcFace template
+        return boxes, rows[:, 14], rows[:, 4:14].reshape(-1, 5, 2)
+
+
+class HaarDetector(FastDetector):
+    """OpenCV's frontal face Haar cascade; its stage weights are squashed into a 0-1 score"""
+
+    def __init__(self, cascade_file: str = "haarcascade_frontalface_default.xml"):
+        self.cascade_file = cascade_file
+        self._model = None
+
+    def load(self):
+        if self._model is None:
+            cv2 = loader.cv2()
+            self._model = cv2.CascadeClassifier(os.path.join(cv2.data.haarcascades, self.cascade_file))
+        return self._model
+
+    def detect_faces(self, img):
+        np = loader.numpy()
+        cv2 = loader.cv2()
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        rects, _, weights = self.load().detectMultiScale3(
+            gray, scaleFactor=1.1, minNeighbors=5, minSize=(16, 16), outputRejectLevels=True
+        )
+        if len(rects) == 0:
+            return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32), None
+        rects = np.asarray(rects, dtype=np.float32)
+        boxes = np.concatenate([rects[:, :2], rects[:, :2] + rects[:, 2:]], axis=1)
+        scores = 1 / (1 + np.exp(-np.asarray(weights, dtype=np.float32).reshape(-1)))
+        return boxes, scores, None
+
+
+def crop_face(img, box, points):
+    """A face crop without the accurate detector: aligned to the ArcFace template with landmarks, else the box itself"""
+    if points is not None:
+        return align_face(img, points)
+    x1, y1, x2, y2 = (int(round(v)) for v in box)
+    return img[max(0, y1):max(0, y2), max(0, x1):max(0, x2)]
+
+
+FAST_DETECTORS = {
+    "yunet": lambda: YuNetDetector(os.path.join(config.MODEL_DIR, config.YUNET_MODEL)),
+    "haar": HaarDetector,
+}
+
+
+class CascadeDetector(Detector):
+    """
+    A fast detector on a downscaled copy first, the accurate (backend) detector only where needed:
+    on padded regions around faces the fast detector is unsure of, and on the whole image
+    when the fast detector finds nothing or clearly too few of the expected faces
+    """
+
+    def __init__(self, fast: FastDetector, accurate: Detector, size: int = config.CASCADE_SIZE,
+                 confidence: float = config.CASCADE_CONFIDENCE, min_face_ratio: float = config.CASCADE_MIN_FACE_RATIO):
+        self.fast = fast
+        self.accurate = accurate
+        self.size = size
+        self.confidence = confidence
+        self.min_face_ratio = min_face_ratio
+        # How often each path was taken: 'fast' faces, re-checked 'regions' and 'full' images
+        self.stats = Counter()
+
+    def load(self):
+        self.fast.load()
+        self.accurate.load()
+
+    def _fast_faces(self, img):
+        """Fast detections on the downscaled image, mapped back to full-resolution coordinates"""
+        cv2 = loader.cv2()
+        scale = min(1.0, self.size / max(img.shape[:2]))
+        small = img if scale == 1.0 else cv2.resize(
+            img, (max(1, int(img.shape[1] * scale)), max(1, int(img.shape[0] * scale))), interpolation=cv2.INTER_AREA
+        )
+        boxes, scores, landmarks = self.fast.detect_faces(small)
+        return boxes / scale, scores, None if landmarks is None else landmarks / scale
+
+    def detect(self, img_path, expected_faces: Optional[int] = None) -> List[Dict[str, Any]]:
+        np = loader.numpy()
+        img = read_image(img_path)
+        boxes, scores, landmarks = self._fast_faces(img)
+
+        if len(boxes) == 0 or (expected_faces and len(boxes) < self.min_face_ratio * expected_faces):
+            self.stats['full'] += 1
+            return self.accurate.detect(img, expected_faces)
+
+        faces = []
+        height, width = img.shape[:2]
+        for i, (box, score) in enumerate(zip(boxes, scores)):
+            if score >= self.confidence:
+                self.stats['fast'] += 1
+                crop = crop_face(img, box, None if landmarks is None else landmarks[i])
+                if crop.size == 0:
+                    continue
+                x1, y1, x2, y2 = (int(round(v)) for v in box)
+                face = {
+                    "face": crop[:, :, ::-1].astype(np.float32) / 255.0,
+                    "facial_area": {"x": x1, "y": y1, "w": x2 - x1, "h": y2 - y1},
+                    "confidence": float(score)
+                }
+                if landmarks is not None:
+                    face["landmarks"] = landmarks[i]
+                faces.append(face)
+                continue
+
+            # Unsure: let the accurate detector look at the region around it
+            self.stats['regions'] += 1
+            pad_x = (box[2] - box[0]) * REGION_PADDING
+            pad_y = (box[3] - box[1]) * REGION_PADDING
+            left, top = int(max(0, box[0] - pad_x)), int(max(0, box[1] - pad_y))
+            right, bottom = int(min(width, box[2] + pad_x)), int(min(height, box[3] + pad_y))
+            if right <= left or bottom <= top:
+                continue
+            for face in self.accurate.detect(np.ascontiguousarray(img[top:bottom, left:right])):
+                # DeepFace returns the whole input with confidence 0 when it finds no face
+                if not face.get("confidence"):
+                    continue
+                area = dict(face["facial_area"])
+                area["x"] += left
+                area["y"] += top
+                face = dict(face, facial_area=area)
+                if face.get("landmarks") is not None:
+                    face["landmarks"] = face["landmarks"] + np.array([left, top], dtype=np.float32)
+                faces.append(face)
+
+        # Overlapping regions can find the same face twice
+        if len(faces) > 1:
+            areas = np.array([
+                [f["facial_area"]["x"], f["facial_area"]["y"],
+                 f["facial_area"]["x"] + f["facial_area"]["w"], f["facial_area"]["y"] + f["facial_area"]["h"]]
+                for f in faces
+            ], dtype=np.float32)
+            confidences = np.array([f.get("confidence") or 0 for f in faces], dtype=np.float32)
+            faces = [faces[i] for i in sorted(nms(areas, confidences, config.NMS_THRESHOLD))]
+        return faces
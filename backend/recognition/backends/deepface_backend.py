@@ -0,0 +1,66 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from recognition import config, loader
+from recognition.backends.base import Backend, Detector, Recognizer
+
+
+class DeepFaceDetector(Detector):
+    """DeepFace's detector (RetinaFace by default) with alignment"""
+
+    def __init__(self, detector_backend: str = config.DETECTOR_BACKEND):
+        self.detector_backend = detector_backend
+
+    def load(self):
+        loader.deepface()
+
+    def detect(self, img_path, expected_faces: Optional[int] = None) -> List[Dict[str, Any]]:
+        return loader.deepface().extract_faces(
+            img_path=img_path,
+            enforce_detection=False,
+            detector_backend=self.detector_backend,
+            align=True
+        )
+
+
+class DeepFaceRecognizer(Recognizer):
+    """A DeepFace recognition model running on TensorFlow/Keras"""
+
+    def __init__(self, model_name: str = config.MODEL_NAME):
+        self.model_name = model_name
+        self._model = None
+
+    def load(self):
+        if self._model is None:
+            model = loader.deepface().build_model(self.model_name)
+            self._model = getattr(model, "model", model)
+        return self._model
+
+    def input_size(self) -> Tuple[int, int]:
+        _, height, width, _ = self.load().input_shape
+        return height, width
+
+    def embed(self, batch):
+        return self.load().predict_on_batch(batch)
+
+
+class DeepFaceBackend(Backend):
+    name = config.MODEL_NAME
+
+    def __init__(self):
+        super().__init__(DeepFaceDetector(), DeepFaceRecognizer())
+        # get_backend may wrap the detector (cascade, tiling), so keep DeepFace's own name for it
+        self.detector_backend = self.detector.detector_backend
+
+    def embed_image(self, img_path: str) -> Optional[Any]:
+        """Embed a reference photo with DeepFace's own pipeline, as DeepFace.verify does"""
+        representations = loader.deepface().represent(
+            img_path=img_path,
+            model_name=self.recognizer.model_name,
+            detector_backend=self.detector_backend,
+            enforce_detection=False,
+            align=True,
+            normalization='base'
+        )
+        if not representations:
+            return None
+        return representations[0]["embedding"]
@@ -0,0 +1,206 @@
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from recognition import config, loader
+from recognition.backends.base import Backend, Detector, Recognizer, read_image
+
+# Five-point landmark positions of the standard 112x112 ArcFace crop
+# (left eye, right eye, nose, left mouth corner, right mouth corner)
+ARCFACE_TEMPLATE = (
+    (38.2946, 51.6963),
+    (73.5318, 51.5014),
+    (56.0252, 71.7366),
+    (41.5493, 92.3655),
+    (70.7299, 92.2041),
+)
+ALIGNED_SIZE = 112
+
+
+def _session(model_path: str, threads: int = config.ONNX_THREADS):
+    """Open an ONNX Runtime CPU session for an exported model file"""
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"ONNX model not found: {model_path}")
+
+    ort = loader.onnxruntime()
+    options = ort.SessionOptions()
+    if threads > 0:
+        options.intra_op_num_threads = threads
+    return ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+def nms(boxes, scores, threshold: float) -> List[int]:
+    """Greedy non-maximum suppression on (x1, y1, x2, y2) boxes; returns kept indices, best first"""
+    np = loader.numpy()
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1 + 1) * (y2 - y1 + 1)
+    order = scores.argsort()[::-1]
+
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(int(i))
+        rest = order[1:]
+        width = np.maximum(0.0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]) + 1)
+        height = np.maximum(0.0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]) + 1)
+        overlap = width * height / (areas[i] + areas[rest] - width * height)
+        order = rest[overlap <= threshold]
+    return keep
+
+
+def align_face(img, landmarks, size: int = ALIGNED_SIZE):
+    """Warp a face to the ArcFace template using its five landmarks (BGR uint8 in, size x size out)"""
+    np = loader.numpy()
+    cv2 = loader.cv2()
+    template = np.array(ARCFACE_TEMPLATE, dtype=np.float32) * (size / ALIGNED_SIZE)
+    matrix, _ = cv2.estimateAffinePartial2D(landmarks.astype(np.float32), template, method=cv2.LMEDS)
+    return cv2.warpAffine(img, matrix, (size, size), borderValue=0.0)
+
+
+class OnnxDetector(Detector):
+    """
+    SCRFD face detector (InsightFace export with landmarks) on ONNX Runtime
+    Faces are aligned from the five landmarks to the ArcFace template
+    """
+
+    def __init__(self, model_path: str, input_size: int = config.ONNX_DETECTOR_SIZE,
+                 score_threshold: float = config.DETECTION_THRESHOLD, nms_threshold: float = config.NMS_THRESHOLD):
+        self.model_path = model_path
+        self.input_size = input_size
+        self.score_threshold = score_threshold
+        self.nms_threshold = nms_threshold
+        self._session = None
+        self._centers = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self._session is None:
+                session = _session(self.model_path)
+                outputs = len(session.get_outputs())
+                if outputs not in (9, 15):
+                    raise ValueError(f"Expected an SCRFD model with landmarks (9 or 15 outputs), got {outputs}")
+                self.strides = (8, 16, 32) if outputs == 9 else (8, 16, 32, 64, 128)
+                self.input_name = session.get_inputs()[0].name
+                self._session = session
+        return self._session
+
+    def _anchor_centers(self, stride: int, anchors: int):
+        np = loader.numpy()
+        key = (stride, anchors)
+        centers = self._centers.get(key)
+        if centers is None:
+            cells = self.input_size // stride
+            grid = np.stack(np.mgrid[:cells, :cells][::-1], axis=-1).astype(np.float32)
+            centers = np.repeat(grid.reshape(-1, 2) * stride, anchors, axis=0)
+            self._centers[key] = centers
+        return centers
+
+    def detect_faces(self, img) -> Tuple[Any, Any, Any]:
+        """Boxes (x1, y1, x2, y2), scores and (5, 2) landmarks of the faces in a BGR image, best first"""
+        np = loader.numpy()
+        cv2 = loader.cv2()
+        session = self.load()
+
+        # Fit the image into the square input, anchored top-left
+        size = self.input_size
+        scale = min(size / img.shape[0], size / img.shape[1])
+        resized = cv2.resize(img, (max(1, int(img.shape[1] * scale)), max(1, int(img.shape[0] * scale))))
+        canvas = np.zeros((size, size, 3), dtype=np.uint8)
+        canvas[:resized.shape[0], :resized.shape[1]] = resized
+        blob = cv2.dnn.blobFromImage(canvas, 1.0 / 128, (size, size), (127.5, 127.5, 127.5), swapRB=True)
+
+        outputs = session.run(None, {self.input_name: blob})
+        levels = len(self.strides)
+        all_boxes, all_scores, all_landmarks = [], [], []
+        for level, stride in enumerate(self.strides):
+            scores = outputs[level].reshape(-1)
+            distances = outputs[level + levels].reshape(-1, 4) * stride
+            offsets = outputs[level + 2 * levels].reshape(-1, 5, 2) * stride
+
+            cells = (size // stride) ** 2
+            centers = self._anchor_centers(stride, len(scores) // cells)
+            keep = scores >= self.score_threshold
+
+            centers = centers[keep]
+            distances = distances[keep]
+            all_scores.append(scores[keep])
+            all_boxes.append(np.concatenate([centers - distances[:, :2], centers + distances[:, 2:]], axis=1))
+            all_landmarks.append(centers[:, None, :] + offsets[keep])
+
+        scores = np.concatenate(all_scores)
+        boxes = np.concatenate(all_boxes) / scale
+        landmarks = np.concatenate(all_landmarks) / scale
+        keep = nms(boxes, scores, self.nms_threshold) if len(scores) else []
+        return boxes[keep], scores[keep], landmarks[keep]
+
+    def detect(self, img_path, expected_faces: Optional[int] = None) -> List[Dict[str, Any]]:
+        np = loader.numpy()
+        img = read_image(img_path)
+
+        faces = []
+        boxes, scores, landmarks = self.detect_faces(img)
+        for box, score, points in zip(boxes, scores, landmarks):
+            crop = align_face(img, points)
+            x1, y1, x2, y2 = (int(round(v)) for v in box)
+            faces.append({
+                "face": crop[:, :, ::-1].astype(np.float32) / 255.0,
+                "facial_area": {"x": x1, "y": y1, "w": x2 - x1, "h": y2 - y1},
+                "confidence": float(score),
+                "landmarks": points
+            })
+        return faces
+
+
+class OnnxRecognizer(Recognizer):
+    """
+    ArcFace exported to ONNX, on ONNX Runtime
+    Takes the same BGR [0, 1] crops as the DeepFace model; NCHW exports are fed transposed
+    and exports with a fixed batch size are fed in slices of that size
+    """
+
+    def __init__(self, model_path: str):
+        self.model_path = model_path
+        self._session = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self._session is None:
+                session = _session(self.model_path)
+                model_input = session.get_inputs()[0]
+                shape = model_input.shape
+                self.input_name = model_input.name
+                self.channels_first = shape[1] == 3
+                self._input_size = tuple(shape[2:4]) if self.channels_first else tuple(shape[1:3])
+                self.max_batch = shape[0] if isinstance(shape[0], int) else None
+                self._session = session
+        return self._session
+
+    def input_size(self) -> Tuple[int, int]:
+        self.load()
+        return self._input_size
+
+    def embed(self, batch):
+        np = loader.numpy()
+        session = self.load()
+        if self.channels_first:
+            batch = batch.transpose(0, 3, 1, 2)
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+
+        step = self.max_batch or len(batch)
+        return np.concatenate([
+            session.run(None, {self.input_name: batch[start:start + step]})[0]
+            for start in range(0, len(batch), step)
+        ])
+
+
+class OnnxBackend(Backend):
+    name = f"onnx-{config.MODEL_NAME}"
+
+    def __init__(self, model_dir: Optional[str] = None):
+        model_dir = model_dir or config.MODEL_DIR
+        super().__init__(
+            OnnxDetector(os.path.join(model_dir, config.ONNX_DETECTOR)),
+            OnnxRecognizer(os.path.join(model_dir, config.ONNX_RECOGNIZER))
+        )
@@ -0,0 +1,197 @@
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from recognition import config, loader
+from recognition.backends.base import Detector, read_image
+from recognition.backends.cascade import crop_face
+from recognition.backends.onnx_backend import ALIGNED_SIZE, nms
+
+# Reductions a JPEG can be decoded at directly (DCT scaling), skipping the detail instead of resizing
+REDUCTIONS = (1, 2, 4, 8)
+
+# Detections this close to a tile edge inside the photo are cut off; the neighbouring tile has them whole
+EDGE_MARGIN = 2
+
+
+def _imread_flag(reduction: int) -> int:
+    cv2 = loader.cv2()
+    return {
+        1: cv2.IMREAD_COLOR,
+        2: cv2.IMREAD_REDUCED_COLOR_2,
+        4: cv2.IMREAD_REDUCED_COLOR_4,
+        8: cv2.IMREAD_REDUCED_COLOR_8,
+    }[reduction]
+
+
+def photo_size(img_path: str) -> Tuple[int, int]:
+    """(width, height) of an image file, read from its header without decoding the pixels"""
+    with loader.pil_image().open(img_path) as img:
+        return img.size
+
+
+def decode(img_path, max_pixels: int, reduction: Optional[int] = None):
+    """
+    A BGR image within max_pixels and its reduction from the full resolution
+    Files are decoded at the smallest of REDUCTIONS that fits (or at reduction); arrays are resized
+    """
+    np = loader.numpy()
+    cv2 = loader.cv2()
+    if not isinstance(img_path, np.ndarray) and reduction is None:
+        try:
+            width, height = photo_size(img_path)
+            reduction = next((r for r in REDUCTIONS if (width / r) * (height / r) <= max_pixels), REDUCTIONS[-1])
+        except Exception:
+            img_path = read_image(img_path)
+
+    if isinstance(img_path, np.ndarray):
+        height, width = img_path.shape[:2]
+        scale = min(1.0, (max_pixels / (width * height)) ** 0.5)
+        if scale == 1.0:
+            return img_path, 1.0
+        small = cv2.resize(img_path, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+        return small, width / small.shape[1]
+
+    img = cv2.imread(img_path, _imread_flag(reduction))
+    if img is None:
+        raise ValueError(f"Could not load image: {img_path}")
+    return img, float(reduction)
+
+
+def _starts(length: int, size: int, step: int) -> List[int]:
+    """Offsets of size-long windows every step along length, the last one flush with the end"""
+    if length <= size:
+        return [0]
+    return list(range(0, length - size, step)) + [length - size]
+
+
+class TiledDetector(Detector):
+    """
+    Detection planner for high-resolution class photos, around another detector
+    The photo is decoded at a reduced scale within max_pixels. When that is still larger than
+    size pixels on its longest side, it is searched whole at size first, then in overlapping
+    size x size tiles over the far rows: above the faces that pass found and down through the
+    ones it found small, or over the whole photo when it found none or clearly too few of the
+    expected faces. Detections are merged with NMS, and faces whose crop came out smaller than
+    the recognition input are cropped again from a decode with just enough resolution, so the
+    detector never sees more than size x size pixels and the full resolution is only decoded
+    when a face needs it
+    """
+
+    def __init__(self, inner: Detector, size: int = config.TILE_SIZE, max_pixels: int = config.TILE_MAX_PIXELS,
+                 overlap: float = config.TILE_OVERLAP, min_face: int = config.TILE_MIN_FACE):
+        self.inner = inner
+        self.size = size
+        self.max_pixels = max_pixels
+        self.overlap = overlap
+        self.min_face = min_face
+        # Work done: photos searched 'whole' at size, 'tiles' searched and faces 'recropped'
+        self.stats = Counter()
+
+    def load(self):
+        self.inner.load()
+
+    def _search(self, img, scale: float, window: Tuple[int, int, int, int], photo: Tuple[int, int],
+                expected_faces: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Faces in a window (left, top, right, bottom) of the working image, searched at scale
+        Each face gets 'box' and 'points' in working image coordinates and the 'scale' its crop was taken at
+        """
+        np = loader.numpy()
+        left, top, right, bottom = window
+        width, height = photo
+        found = []
+        for face in self.inner.detect(np.ascontiguousarray(img), expected_faces):
+            # DeepFace returns the whole input with confidence 0 when it finds no face
+            if not face.get("confidence"):
+                continue
+            area = face["facial_area"]
+            box = np.array([area["x"], area["y"], area["x"] + area["w"], area["y"] + area["h"]], dtype=np.float32)
+            box = box / scale + np.array([left, top, left, top], dtype=np.float32)
+            if ((left > 0 and box[0] <= left + EDGE_MARGIN) or (top > 0 and box[1] <= top + EDGE_MARGIN) or
+                    (right < width and box[2] >= right - EDGE_MARGIN) or (bottom < height and box[3] >= bottom - EDGE_MARGIN)):
+                continue
+            points = face.get("landmarks")
+            if points is not None:
+                points = np.asarray(points, dtype=np.float32) / scale + np.array([left, top], dtype=np.float32)
+            found.append(dict(face, box=box, points=points, scale=scale))
+        return found
+
+    def _far_rows(self, found: List[Dict[str, Any]], scale: float, height: int, expected_faces: Optional[int]) -> int:
+        """
+        How far down the photo to tile: the far rows are above the topmost face found and down to the
+        lowest face too small at scale; everything when faces are missing
+        """
+        if not found or (expected_faces and len(found) < config.CASCADE_MIN_FACE_RATIO * expected_faces):
+            return height
+        reach = max([min(face["box"][1] for face in found)] + [
+            face["box"][3] for face in found if min(face["box"][2:] - face["box"][:2]) * scale < self.min_face
+        ])
+        if reach <= 0:
+            return 0
+        return min(height, int(reach + self.size * self.overlap))
+
+    def detect(self, img_path, expected_faces: Optional[int] = None) -> List[Dict[str, Any]]:
+        np = loader.numpy()
+        cv2 = loader.cv2()
+        img, reduction = decode(img_path, self.max_pixels)
+        height, width = img.shape[:2]
+        if reduction == 1.0 and max(height, width) <= self.size:
+            return self.inner.detect(img, expected_faces)
+
+        photo = (width, height)
+        if max(height, width) <= self.size:
+            found = self._search(img, 1.0, (0, 0, width, height), photo, expected_faces)
+        else:
+            self.stats['whole'] += 1
+            scale = self.size / max(height, width)
+            small = cv2.resize(img, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+            found = self._search(small, scale, (0, 0, width, height), photo, expected_faces)
+            del small
+
+            far_rows = self._far_rows(found, scale, height, expected_faces)
+            step = max(1, int(self.size * (1 - self.overlap)))
+            for top in (_starts(far_rows, self.size, step) if far_rows else []):
+                for left in _starts(width, self.size, step):
+                    self.stats['tiles'] += 1
+                    window = (left, top, min(width, left + self.size), min(height, top + self.size))
+                    found += self._search(img[window[1]:window[3], window[0]:window[2]], 1.0, window, photo)
+
+        if len(found) > 1:
+            boxes = np.stack([face["box"] for face in found])
+            confidences = np.array([face["confidence"] for face in found], dtype=np.float32)
+            found = [found[i] for i in sorted(nms(boxes, confidences, config.NMS_THRESHOLD))]
+
+        # Faces whose crop came from fewer pixels than the recognizer takes are cropped again from
+        # the least reduced decode that still gives the smallest of them its full detail
+        sides = [float(min(face["box"][2:] - face["box"][:2])) * reduction for face in found]
+        blurry = [i for i, (face, side) in enumerate(zip(found, sides))
+                  if side / reduction * face["scale"] < ALIGNED_SIZE and face["scale"] / reduction < 1]
+        if blurry:
+            smallest = min(sides[i] for i in blurry)
+            if isinstance(img_path, np.ndarray):
+                detail, crop_reduction = img_path, 1.0
+            else:
+                crop_reduction = next((r for r in reversed(REDUCTIONS) if r <= reduction and smallest / r >= ALIGNED_SIZE), 1)
+                detail, crop_reduction = (img, reduction) if crop_reduction == reduction else \
+                    decode(img_path, self.max_pixels, crop_reduction)
+            factor = reduction / crop_reduction
+            for i in blurry:
+                face = found[i]
+                if face["scale"] / reduction >= 1 / crop_reduction:
+                    continue
+                crop = crop_face(detail, face["box"] * factor, None if face["points"] is None else face["points"] * factor)
+                if crop.size:
+                    self.stats['recropped'] += 1
+                    found[i] = dict(face, face=crop[:, :, ::-1].astype(np.float32) / 255.0)
+            del detail
+
+        faces = []
+        for face in found:
+            x1, y1, x2, y2 = (int(round(v)) for v in face.pop("box") * reduction)
+            points = face.pop("points")
+            face.pop("scale")
+            face["facial_area"] = {"x": x1, "y": y1, "w": x2 - x1, "h": y2 - y1}
+            if points is not None:
+                face["landmarks"] = points * reduction
+            faces.append(face)
+        return faces
@@ -0,0 +1,103 @@
+import os
+
+# Recognition settings, read from the environment when the package is imported
+
+# Define file paths
+current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+data_dir = os.path.join(current_dir, 'data')
+
+
+def _int_setting(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        print(f"Error reading {name}, using {default}")
+        return default
+
+
+# Inference backend: "deepface" (TensorFlow/Keras) or "onnx" (ONNX Runtime on CPU)
+BACKEND = os.environ.get("RECOGNITION_BACKEND", "deepface").lower()
+
+# Recognition model used for reference photos and session face crops
+MODEL_NAME = "ArcFace"
+
+# DeepFace detector for class and reference photos (deepface backend)
+DETECTOR_BACKEND = "retinaface"
+
+# Two-stage detection: a fast OpenCV detector ("yunet" or "haar") runs on a copy downscaled
+# to CASCADE_SIZE pixels on its longest side; faces it scores below CASCADE_CONFIDENCE are
+# re-checked by the backend's detector, which also takes the whole photo when the fast one
+# finds fewer than CASCADE_MIN_FACE_RATIO of the expected faces ("off": backend detector only)
+DETECTOR_CASCADE = os.environ.get("RECOGNITION_DETECTOR_CASCADE", "off").lower()
+CASCADE_SIZE = _int_setting("RECOGNITION_CASCADE_SIZE", 640)
+CASCADE_CONFIDENCE = 0.85
+CASCADE_MIN_FACE_RATIO = 0.5
+# OpenCV's YuNet model file (face_detection_yunet_2023mar.onnx from opencv_zoo) in MODEL_DIR
+YUNET_MODEL = os.environ.get("RECOGNITION_YUNET_MODEL", "face_detection_yunet_2023mar.onnx")
+
+# High-resolution photos: decoded at a JPEG reduction (1/2, 1/4, 1/8) that fits TILE_MAX_PIXELS,
+# searched whole at TILE_SIZE pixels on the longest side, then in TILE_SIZE tiles overlapping by
+# TILE_OVERLAP over the rows above the faces of that first pass and down through the ones smaller
+# than TILE_MIN_FACE pixels
+TILED_DETECTION = os.environ.get("RECOGNITION_TILED_DETECTION", "1").lower() in ("1", "true", "yes")
+TILE_SIZE = _int_setting("RECOGNITION_TILE_SIZE", 1280)
+TILE_MAX_PIXELS = _int_setting("RECOGNITION_TILE_MAX_PIXELS", 12_000_000)
+TILE_OVERLAP = 0.25
+TILE_MIN_FACE = 40
+
+# Quality gate before enhancement and embedding: faces smaller than QUALITY_MIN_FACE_SIZE
+# pixels, scored below QUALITY_MIN_CONFIDENCE by the detector, blurrier than
+# QUALITY_MIN_SHARPNESS (variance of the Laplacian at 112x112) or turned further than
+# QUALITY_MAX_YAW (nose offset from between the eyes, in eye distances) are skipped
+QUALITY_GATE = os.environ.get("RECOGNITION_QUALITY_GATE", "1").lower() in ("1", "true", "yes")
+QUALITY_MIN_FACE_SIZE = _int_setting("RECOGNITION_QUALITY_MIN_FACE_SIZE", 32)
+QUALITY_MIN_CONFIDENCE = 0.5
+QUALITY_MIN_SHARPNESS = _int_setting("RECOGNITION_QUALITY_MIN_SHARPNESS", 20)
+QUALITY_MAX_YAW = 0.45
+
+# Face crops embedded per forward pass; the last batch is zero-padded to this size
+BATCH_SIZE = _int_setting("RECOGNITION_BATCH_SIZE", 32)
+
+# Cosine similarity (as a percentage) at which a face matches a student
+MATCH_THRESHOLD = 50.0
+
+# Early exit in a session: a student matched at EARLY_EXIT_THRESHOLD or above is no longer
+# compared with later faces, and faces and photos stop being processed once every student
+# is matched
+EARLY_EXIT = os.environ.get("RECOGNITION_EARLY_EXIT", "1").lower() in ("1", "true", "yes")
+EARLY_EXIT_THRESHOLD = 75.0
+
+# Storage type of reference embeddings: float32, float16 or int8 (with a per-vector scale)
+GALLERY_DTYPE = os.environ.get("RECOGNITION_GALLERY_DTYPE", "float16").lower()
+
+# Campus-wide ANN index: inverted lists (0 picks about sqrt(rows)), lists scanned per
+# query, and the size below which every query is an exact scan instead
+INDEX_LISTS = _int_setting("RECOGNITION_INDEX_LISTS", 0)
+INDEX_PROBES = _int_setting("RECOGNITION_INDEX_PROBES", 16)
+INDEX_MIN_ROWS = _int_setting("RECOGNITION_INDEX_MIN_ROWS", 1024)
+
+# Multi-template students: a centroid decides clear cases, and a face within TEMPLATE_MARGIN
+# points below the threshold is compared with the student's individual templates. Templates
+# less similar than TEMPLATE_MIN_SIMILARITY to the student's other templates are pruned
+TEMPLATE_MARGIN = 10.0
+TEMPLATE_MIN_SIMILARITY = 40.0
+
+# Faces matched at or above CAPTURE_THRESHOLD in a session are kept as extra templates
+# (the newest MAX_CAPTURES per student) when RECOGNITION_TEMPLATE_CAPTURES is set
+TEMPLATE_CAPTURES = os.environ.get("RECOGNITION_TEMPLATE_CAPTURES", "").lower() in ("1", "true", "yes")
+CAPTURE_THRESHOLD = 80.0
+MAX_CAPTURES = _int_setting("RECOGNITION_MAX_CAPTURES", 8)
+
+# Exported models for the onnx backend: ArcFace (DeepFace's weights exported with tf2onnx,
+# NHWC or NCHW input) and an SCRFD face detector with five-point landmarks
+MODEL_DIR = os.environ.get("RECOGNITION_MODEL_DIR", os.path.join(data_dir, 'models'))
+ONNX_RECOGNIZER = os.environ.get("RECOGNITION_ONNX_RECOGNIZER", "arcface.onnx")
+ONNX_DETECTOR = os.environ.get("RECOGNITION_ONNX_DETECTOR", "scrfd_500m.onnx")
+
+# Detector input size and thresholds for the onnx backend
+ONNX_DETECTOR_SIZE = _int_setting("RECOGNITION_ONNX_DETECTOR_SIZE", 640)
+DETECTION_THRESHOLD = 0.5
+NMS_THRESHOLD = 0.4
+
+# ONNX Runtime intra-op threads per session (0 lets ONNX Runtime decide)
+ONNX_THREADS = _int_setting("RECOGNITION_ONNX_THREADS", 0)
@@ -0,0 +1,85 @@
+from typing import Optional, Sequence, Tuple
+
+from recognition import backends, config, loader
+
+
+def prepare_crop(face_img, target_size: Tuple[int, int]):
+    """
+    Fit an aligned BGR uint8 face crop into the model input the way DeepFace does:
+    resize keeping the aspect ratio, zero-pad to target_size and scale to [0, 1]
+    """
+    np = loader.numpy()
+    cv2 = loader.cv2()
+
+    height, width = target_size
+    factor = min(height / face_img.shape[0], width / face_img.shape[1])
+    resized = cv2.resize(
+        face_img,
+        (max(1, int(face_img.shape[1] * factor)), max(1, int(face_img.shape[0] * factor)))
+    )
+
+    canvas = np.zeros((height, width, 3), dtype=np.float32)
+    top = (height - resized.shape[0]) // 2
+    left = (width - resized.shape[1]) // 2
+    canvas[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+    return canvas / 255.0
+
+
+def normalize(vectors):
+    """L2-normalize rows so cosine similarity is a dot product (zero rows stay zero)"""
+    np = loader.numpy()
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def forward_batches(recognizer: backends.Recognizer, crops: Sequence, batch_size: int):
+    """
+    Raw embeddings for crops, batch_size crops per forward pass
+    Every batch has the same shape (the last one is zero-padded), so the model
+    never sees a new input shape
+    """
+    np = loader.numpy()
+    target_size = recognizer.input_size()
+
+    batch = np.zeros((batch_size,) + tuple(target_size) + (3,), dtype=np.float32)
+    outputs = []
+    for start in range(0, len(crops), batch_size):
+        chunk = crops[start:start + batch_size]
+        batch[:] = 0
+        for i, crop in enumerate(chunk):
+            batch[i] = prepare_crop(crop, target_size)
+        outputs.append(np.asarray(recognizer.embed(batch), dtype=np.float32)[:len(chunk)])
+    return np.concatenate(outputs)
+
+
+def embed_crops(crops: Sequence, batch_size: Optional[int] = None, backend: Optional[backends.Backend] = None):
+    """
+    Embed aligned BGR uint8 face crops in batches of batch_size (config.BATCH_SIZE by default)
+    Returns normalized embeddings, one row per crop, in order
+    """
+    np = loader.numpy()
+    if not crops:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    backend = backend or backends.get_backend()
+    return normalize(forward_batches(backend.recognizer, crops, max(1, batch_size or config.BATCH_SIZE)))
+
+
+def embed_image(img_path: str, backend: Optional[backends.Backend] = None):
+    """
+    Embed the most confident face in an image file (used for reference photos)
+    Returns a normalized vector, or None when no face could be embedded
+    """
+    np = loader.numpy()
+    backend = backend or backends.get_backend()
+    try:
+        vector = backend.embed_image(img_path)
+    except (loader.RecognitionUnavailable, FileNotFoundError):
+        raise
+    except Exception as e:
+        print(f"Error embedding {img_path}: {e}")
+        return None
+
+    if vector is None:
+        return None
+    return normalize(np.asarray([vector], dtype=np.float32))[0]
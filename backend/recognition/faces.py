@@ -0,0 +1,121 @@
+import io
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from recognition import backends, config, loader
+
+# Student photo extensions compared against a class photo
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def process_face(face_img):
+    """Process face array to ensure correct format"""
+    np = loader.numpy()
+    cv2 = loader.cv2()
+    try:
+        if isinstance(face_img, dict) and 'face' in face_img and isinstance(face_img['face'], np.ndarray):
+            face_img = face_img['face']
+
+        if not isinstance(face_img, np.ndarray):
+            face_img = np.array(face_img)
+
+        if face_img.dtype != np.uint8:
+            if face_img.dtype in [np.float32, np.float64]:
+                face_img = (face_img * 255).astype(np.uint8)
+            else:
+                face_img = face_img.astype(np.uint8)
+
+        if len(face_img.shape) == 3 and face_img.shape[2] == 3:
+            if not hasattr(face_img, 'color_format') or face_img.color_format != 'BGR':
+                face_img = cv2.cvtColor(face_img, cv2.COLOR_RGB2BGR)
+        elif len(face_img.shape) == 2:
+            face_img = cv2.cvtColor(face_img, cv2.COLOR_GRAY2BGR)
+
+        face_img = cv2.fastNlMeansDenoisingColored(face_img, None, 10, 10, 7, 21)
+        face_img = cv2.detailEnhance(face_img, sigma_s=10, sigma_r=0.15)
+
+        return face_img
+    except Exception as e:
+        raise RuntimeError(f"Error processing face: {str(e)}") from e
+
+
+def extract_faces(img_path: str, expected_faces: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Detect and align the faces in an image with the configured backend's detector
+    expected_faces (e.g. the class size) lets a detector cascade notice missed faces
+    """
+    return backends.get_backend().detector.detect(img_path, expected_faces)
+
+
+def verify_face(img1_path: str, img2_path: str) -> dict:
+    """Compare two face images using ArcFace"""
+    cv2 = loader.cv2()
+    try:
+        img1 = cv2.imread(img1_path)
+        img2 = cv2.imread(img2_path)
+
+        if img1 is None or img2 is None:
+            raise ValueError("Could not load images")
+
+        result = loader.deepface().verify(
+            img1_path=img1_path,
+            img2_path=img2_path,
+            model_name=config.MODEL_NAME,
+            detector_backend=config.DETECTOR_BACKEND,
+            enforce_detection=False,
+            distance_metric='cosine',
+            align=True,
+            normalization='base'
+        )
+
+        similarity = (1 - result['distance']) * 100
+        return {
+            'verified': similarity >= config.MATCH_THRESHOLD,
+            'similarity': similarity,
+            'distance': result['distance'],
+            'model': config.MODEL_NAME
+        }
+    except loader.RecognitionUnavailable:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"Face verification error: {str(e)}") from e
+
+
+def match_class_photo(image_bytes: bytes, temp_path: str, gallery_dir: str,
+                      confidence_threshold: float = 0.5) -> List[Tuple[str, float]]:
+    """
+    Compare a class photo with every student photo in gallery_dir using VGG-Face
+    Returns (photo filename, distance) for each verified match
+    """
+    np = loader.numpy()
+    cv2 = loader.cv2()
+    deepface_api = loader.deepface()
+
+    # Load the image
+    image = loader.pil_image().open(io.BytesIO(image_bytes))
+    image_np = np.array(image)
+
+    # Convert to BGR for OpenCV
+    if len(image_np.shape) == 3 and image_np.shape[2] == 3:
+        image_np = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
+
+    # Save temporary image
+    cv2.imwrite(temp_path, image_np)
+
+    matches = []
+    for photo in [f for f in os.listdir(gallery_dir) if f.endswith(PHOTO_EXTENSIONS)]:
+        try:
+            # Compare the images using DeepFace
+            result = deepface_api.verify(
+                img1_path=temp_path,
+                img2_path=os.path.join(gallery_dir, photo),
+                enforce_detection=False,
+                model_name="VGG-Face"
+            )
+
+            if result["verified"] and result.get("distance", 1.0) < confidence_threshold:
+                matches.append((photo, result.get("distance", 0)))
+        except Exception as e:
+            print(f"Error comparing with {photo}: {e}")
+
+    return matches
@@ -0,0 +1,139 @@
+import os
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from recognition import backends, config, embeddings, loader, quantization
+
+# Define file paths
+current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+data_dir = os.path.join(current_dir, 'data')
+EMBEDDINGS_DIR = os.path.join(data_dir, 'embeddings')
+
+_lock = threading.Lock()
+# cache name -> {'mtime': cache file mtime, 'entries': {photo key: ((mtime_ns, size), codes or None, scale)}}
+_state = {}
+
+
+def _cache_name(backend: backends.Backend, dtype: str) -> str:
+    return f"{backend.name}-{dtype}"
+
+
+def _cache_file(cache_name: str) -> str:
+    return os.path.join(EMBEDDINGS_DIR, f"{cache_name}.npz")
+
+
+def _key(path: str) -> str:
+    """Photos under data/ are keyed relative to it, so the cache survives moving the checkout"""
+    path = os.path.abspath(path)
+    if path.startswith(data_dir + os.sep):
+        return os.path.relpath(path, data_dir)
+    return path
+
+
+def _path(key: str) -> str:
+    return key if os.path.isabs(key) else os.path.join(data_dir, key)
+
+
+def _load(cache_name: str) -> Dict[str, Tuple[Tuple[int, int], Any, float]]:
+    """Reload a cache only when its file has changed"""
+    state = _state.setdefault(cache_name, {'mtime': None, 'entries': {}})
+    path = _cache_file(cache_name)
+    if not os.path.exists(path):
+        return state['entries']
+
+    mtime = os.path.getmtime(path)
+    if state['mtime'] != mtime:
+        np = loader.numpy()
+        try:
+            with np.load(path) as stored:
+                entries = {
+                    str(key): ((int(stamp[0]), int(stamp[1])), codes, float(scale))
+                    for key, stamp, codes, scale in zip(stored['keys'], stored['stamps'], stored['codes'], stored['scales'])
+                }
+        except Exception as e:
+            print(f"Error loading reference embeddings: {e}")
+            return state['entries']
+        state.update({'mtime': mtime, 'entries': entries})
+    return state['entries']
+
+
+def _save(cache_name: str, entries: Dict[str, Tuple[Tuple[int, int], Any, float]], dtype: str):
+    """Write the embeddings of photos that still exist and have a face, atomically"""
+    np = loader.numpy()
+    if not os.path.exists(EMBEDDINGS_DIR):
+        os.makedirs(EMBEDDINGS_DIR)
+
+    keys = sorted(key for key, (_, codes, _) in entries.items() if codes is not None and os.path.exists(_path(key)))
+    path = _cache_file(cache_name)
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'wb') as f:
+        np.savez(
+            f,
+            keys=np.array(keys, dtype=str),
+            stamps=np.array([entries[key][0] for key in keys], dtype=np.int64).reshape(-1, 2),
+            codes=np.stack([entries[key][1] for key in keys]) if keys else np.zeros((0, 0), dtype=dtype),
+            scales=np.array([entries[key][2] for key in keys], dtype=np.float32)
+        )
+    os.replace(temp_file, path)
+    _state[cache_name] = {'mtime': os.path.getmtime(path), 'entries': entries}
+
+
+def _stamp(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def reference_embeddings(image_paths: Sequence[str], backend: Optional[backends.Backend] = None,
+                         dtype: Optional[str] = None) -> quantization.QuantizedMatrix:
+    """
+    Normalized embeddings for reference photos, one row per path, stored as dtype
+    (config.GALLERY_DTYPE by default). Each photo is embedded once per file version
+    (mtime and size) and cached per backend and dtype in data/embeddings/. Missing
+    photos and photos without a face get a zero row, which never matches
+    """
+    np = loader.numpy()
+    backend = backend or backends.get_backend()
+    dtype = dtype or config.GALLERY_DTYPE
+    cache_name = _cache_name(backend, dtype)
+    with _lock:
+        entries = dict(_load(cache_name))
+        changed = False
+        rows = []
+        for path in image_paths:
+            stamp = _stamp(path)
+            if stamp is None:
+                rows.append(None)
+                continue
+
+            key = _key(path)
+            entry = entries.get(key)
+            if entry is None or entry[0] != stamp:
+                vector = embeddings.embed_image(path, backend)
+                if vector is None:
+                    entry = (stamp, None, 0.0)
+                else:
+                    codes, scales = quantization.quantize(vector[None], dtype)
+                    entry = (stamp, codes[0], float(scales[0]))
+                entries[key] = entry
+                changed = True
+            rows.append(entry if entry[1] is not None else None)
+
+        if changed:
+            try:
+                _save(cache_name, entries, dtype)
+            except Exception as e:
+                print(f"Error saving reference embeddings: {e}")
+                # Keep the new embeddings for this process at least
+                _state[cache_name]['entries'] = entries
+
+    dimension = next((len(row[1]) for row in rows if row is not None), 0)
+    codes = np.zeros((len(rows), dimension), dtype=dtype)
+    scales = np.zeros(len(rows), dtype=np.float32)
+    for i, row in enumerate(rows):
+        if row is not None:
+            codes[i] = row[1]
+            scales[i] = row[2]
+    return quantization.QuantizedMatrix(codes, scales, dtype)
@@ -0,0 +1,327 @@
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from recognition import backends, config, embeddings, faces, gallery, loader, quantization
+
+# Define file paths
+current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+data_dir = os.path.join(current_dir, 'data')
+STUDENT_IMAGES_DIR = os.path.join(data_dir, 'student_images')
+
+# Retrain the coarse centroids once the index has grown this many times past its last training
+RETRAIN_FACTOR = 4
+KMEANS_ITERATIONS = 10
+
+_lock = threading.Lock()
+# index name -> {'index': IVFIndex or None, 'dir_mtime': gallery directory mtime at the last sync}
+_state = {}
+
+
+class IVFIndex:
+    """
+    Inverted-file index over normalized embeddings, keyed by string (pure NumPy)
+    Rows are assigned to the nearest of a set of k-means centroids and kept list by list,
+    so a query scores a few contiguous slices: those of its nearest lists. Until it holds
+    config.INDEX_MIN_ROWS rows every query is an exact scan. Rows are float32 by default;
+    float16 halves the memory but widening it costs more than the scan on most CPUs
+    """
+
+    def __init__(self, dimension: int, dtype: str = "float32"):
+        np = loader.numpy()
+        self.dimension = dimension
+        self.dtype = dtype
+        self.keys: List[Optional[str]] = []
+        self.rows: Dict[str, int] = {}
+        self.versions: Dict[str, Tuple[int, int]] = {}
+        self.free: List[int] = []
+        self.codes = np.zeros((0, dimension), dtype=self.dtype)
+        self.scales = np.zeros(0, dtype=np.float32)
+        # List of each row, -1 for free rows
+        self.assign = np.zeros(0, dtype=np.int32)
+        self.centroids = np.zeros((0, dimension), dtype=np.float32)
+        self.trained_size = 0
+        # Start of each list's rows (and the end of the last), None until the rows are packed
+        self._offsets = None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.rows
+
+    @property
+    def trained(self) -> bool:
+        return len(self.centroids) > 0
+
+    def _reserve(self, count: int) -> List[int]:
+        """Rows for count new entries, reusing freed rows first"""
+        np = loader.numpy()
+        reused = [self.free.pop() for _ in range(min(count, len(self.free)))]
+        start = len(self.keys)
+        needed = count - len(reused)
+        if start + needed > len(self.codes):
+            capacity = max(start + needed, 2 * len(self.codes), 64)
+            codes = np.zeros((capacity, self.dimension), dtype=self.dtype)
+            codes[:start] = self.codes[:start]
+            scales = np.zeros(capacity, dtype=np.float32)
+            scales[:start] = self.scales[:start]
+            assign = np.full(capacity, -1, dtype=np.int32)
+            assign[:start] = self.assign[:start]
+            self.codes, self.scales, self.assign = codes, scales, assign
+        self.keys.extend([None] * needed)
+        return reused + list(range(start, start + needed))
+
+    def _vectors(self, rows):
+        np = loader.numpy()
+        vectors = self.codes[rows].astype(np.float32)
+        if self.dtype == "int8":
+            vectors *= self.scales[rows, None]
+        return vectors
+
+    def _nearest_lists(self, vectors):
+        """Index of the closest centroid for each vector, scored in blocks"""
+        np = loader.numpy()
+        labels = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), quantization.BLOCK_ROWS):
+            block = vectors[start:start + quantization.BLOCK_ROWS]
+            labels[start:start + len(block)] = (block @ self.centroids.T).argmax(axis=1)
+        return labels
+
+    def add(self, keys: Sequence[str], vectors, versions: Optional[Sequence[Tuple[int, int]]] = None):
+        """Insert or replace entries; versions (e.g. photo mtime and size) are kept per key"""
+        np = loader.numpy()
+        if not len(keys):
+            return
+        self.remove([key for key in keys if key in self.rows])
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        codes, scales = quantization.quantize(vectors, self.dtype)
+        rows = self._reserve(len(keys))
+        self.codes[rows] = codes
+        self.scales[rows] = scales
+        self.assign[rows] = self._nearest_lists(vectors) if self.trained else 0
+        for i, (row, key) in enumerate(zip(rows, keys)):
+            self.keys[row] = key
+            self.rows[key] = row
+            if versions is not None:
+                self.versions[key] = tuple(versions[i])
+        self._offsets = None
+
+        if len(self) >= config.INDEX_MIN_ROWS and (
+            not self.trained or len(self) >= RETRAIN_FACTOR * self.trained_size
+        ):
+            self.train()
+
+    def remove(self, keys: Sequence[str]):
+        for key in keys:
+            row = self.rows.pop(key, None)
+            if row is None:
+                continue
+            self.versions.pop(key, None)
+            self.keys[row] = None
+            self.assign[row] = -1
+            self.free.append(row)
+            self._offsets = None
+
+    def train(self, n_lists: Optional[int] = None, seed: int = 0):
+        """Spherical k-means over the stored rows, then reassign every row to its nearest list"""
+        np = loader.numpy()
+        live = np.flatnonzero(self.assign[:len(self.keys)] >= 0)
+        if not len(live):
+            return
+        vectors = self._vectors(live)
+        n_lists = min(len(live), n_lists or config.INDEX_LISTS or max(1, int(round(np.sqrt(len(live))))))
+
+        rng = np.random.default_rng(seed)
+        self.centroids = vectors[rng.choice(len(live), n_lists, replace=False)]
+        for _ in range(KMEANS_ITERATIONS):
+            labels = self._nearest_lists(vectors)
+            order = np.argsort(labels, kind="stable")
+            counts = np.bincount(labels, minlength=n_lists)
+            filled = np.flatnonzero(counts)
+            sums = np.empty_like(self.centroids)
+            sums[filled] = np.add.reduceat(vectors[order], np.concatenate(([0], np.cumsum(counts[filled])[:-1])))
+            # Empty lists restart from random rows
+            empty = np.flatnonzero(counts == 0)
+            sums[empty] = vectors[rng.choice(len(live), len(empty))]
+            self.centroids = embeddings.normalize(sums)
+
+        self.assign[live] = self._nearest_lists(vectors)
+        self.trained_size = len(live)
+        self._offsets = None
+
+    def _pack(self):
+        """Reorder the rows list by list, dropping freed rows, so each list is one slice"""
+        np = loader.numpy()
+        if self._offsets is None:
+            live = np.flatnonzero(self.assign[:len(self.keys)] >= 0)
+            order = live[np.argsort(self.assign[live], kind="stable")]
+            self.codes = self.codes[order]
+            self.scales = self.scales[order]
+            self.assign = self.assign[order]
+            self.keys = [self.keys[row] for row in order]
+            self.rows = {key: row for row, key in enumerate(self.keys)}
+            self.free = []
+            counts = np.bincount(self.assign, minlength=max(1, len(self.centroids)))
+            self._offsets = np.concatenate(([0], np.cumsum(counts)))
+        return self._offsets
+
+    def search(self, probes, k: int = 5, n_probe: Optional[int] = None) -> List[List[Tuple[str, float]]]:
+        """
+        Top-k entries for each normalized probe as (key, similarity percentage), best first
+        Scans the n_probe lists (config.INDEX_PROBES by default) whose centroids are closest
+        """
+        np = loader.numpy()
+        probes = np.atleast_2d(np.asarray(probes, dtype=np.float32))
+        if not len(self) or probes.shape[1] != self.dimension:
+            return [[] for _ in probes]
+
+        offsets = self._pack()
+        n_lists = len(offsets) - 1
+        n_probe = min(n_lists, n_probe or config.INDEX_PROBES)
+        coarse = probes @ self.centroids.T if self.trained else None
+
+        results = []
+        for i, probe in enumerate(probes):
+            if coarse is None or n_probe >= n_lists:
+                slices = [(0, len(self.keys))]
+            else:
+                nearest = np.argpartition(-coarse[i], n_probe - 1)[:n_probe]
+                slices = [(offsets[l], offsets[l + 1]) for l in nearest if offsets[l + 1] > offsets[l]]
+            if not slices:
+                results.append([])
+                continue
+
+            candidates = np.concatenate([np.arange(start, stop) for start, stop in slices])
+            scores = np.concatenate([self._score(probe, start, stop) for start, stop in slices])
+            top = min(k, len(candidates))
+            best = np.argpartition(-scores, top - 1)[:top] if top < len(candidates) else np.arange(top)
+            best = best[np.argsort(-scores[best])]
+            results.append([(self.keys[candidates[j]], float(scores[j] * 100)) for j in best])
+        return results
+
+    def _score(self, probe, start: int, stop: int):
+        np = loader.numpy()
+        scores = self.codes[start:stop].astype(np.float32, copy=False) @ probe
+        if self.dtype == "int8":
+            scores *= self.scales[start:stop]
+        return scores
+
+    def save(self, path: str):
+        """Write the live entries and the centroids atomically"""
+        np = loader.numpy()
+        live = np.flatnonzero(self.assign[:len(self.keys)] >= 0)
+        keys = [self.keys[row] for row in live]
+        temp_file = f"{path}.tmp"
+        with open(temp_file, 'wb') as f:
+            np.savez(
+                f,
+                keys=np.array(keys, dtype=str),
+                versions=np.array([self.versions.get(key, (0, 0)) for key in keys], dtype=np.int64).reshape(-1, 2),
+                codes=self.codes[live],
+                scales=self.scales[live],
+                assign=self.assign[live],
+                centroids=self.centroids,
+                trained_size=np.array(self.trained_size)
+            )
+        os.replace(temp_file, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        np = loader.numpy()
+        with np.load(path) as stored:
+            codes = stored['codes']
+            index = cls(codes.shape[1], str(codes.dtype))
+            index.codes = codes
+            index.scales = stored['scales']
+            index.assign = stored['assign'].astype(np.int32)
+            index.centroids = stored['centroids']
+            index.trained_size = int(stored['trained_size'])
+            index.keys = [str(key) for key in stored['keys']]
+            index.rows = {key: row for row, key in enumerate(index.keys)}
+            index.versions = {
+                key: (int(version[0]), int(version[1])) for key, version in zip(index.keys, stored['versions'])
+            }
+        return index
+
+
+def _index_file(name: str) -> str:
+    return os.path.join(gallery.EMBEDDINGS_DIR, f"{name}.npz")
+
+
+def _sync(index: Optional[IVFIndex], gallery_dir: str, backend: backends.Backend) -> Tuple[Optional[IVFIndex], bool]:
+    """
+    Bring the index in line with the photos in gallery_dir: embed new and changed photos
+    (through the reference embedding cache) and drop deleted ones or ones without a face
+    Returns the index (created with the first face) and whether anything changed
+    """
+    np = loader.numpy()
+    names = sorted(name for name in os.listdir(gallery_dir) if name.lower().endswith(faces.PHOTO_EXTENSIONS))
+    changed = []
+    for name in names:
+        stamp = gallery._stamp(os.path.join(gallery_dir, name))
+        if stamp is not None and (index is None or index.versions.get(name) != stamp):
+            changed.append((name, stamp))
+    listed = set(names)
+    removed = [key for key in index.rows if key not in listed] if index is not None else []
+
+    if changed:
+        vectors = gallery.reference_embeddings(
+            [os.path.join(gallery_dir, name) for name, _ in changed], backend
+        ).dequantize()
+        has_face = np.linalg.norm(vectors, axis=1) > 0
+        removed.extend(name for (name, _), face in zip(changed, has_face) if not face)
+        if has_face.any():
+            if index is None:
+                index = IVFIndex(vectors.shape[1])
+            kept = [pair for pair, face in zip(changed, has_face) if face]
+            index.add([name for name, _ in kept], vectors[has_face], [stamp for _, stamp in kept])
+
+    if index is not None and removed:
+        index.remove(removed)
+    return index, bool(changed or removed)
+
+
+def campus_index(gallery_dir: str = STUDENT_IMAGES_DIR, backend: Optional[backends.Backend] = None) -> Optional[IVFIndex]:
+    """
+    The ANN index over every student photo in gallery_dir, keyed by photo filename
+    Loaded from data/embeddings/ and updated incrementally whenever the directory changes:
+    only new or changed photos are embedded. None while no photo has a face
+    """
+    backend = backend or backends.get_backend()
+    name = f"index-{backend.name}"
+    with _lock:
+        state = _state.get(name)
+        if state is None:
+            state = _state[name] = {'index': None, 'dir_mtime': None}
+            path = _index_file(name)
+            if os.path.exists(path):
+                try:
+                    state['index'] = IVFIndex.load(path)
+                except Exception as e:
+                    print(f"Error loading face index: {e}")
+
+        dir_mtime = os.stat(gallery_dir).st_mtime_ns if os.path.isdir(gallery_dir) else None
+        if dir_mtime is not None and dir_mtime != state['dir_mtime']:
+            state['index'], changed = _sync(state['index'], gallery_dir, backend)
+            if changed:
+                try:
+                    if not os.path.exists(gallery.EMBEDDINGS_DIR):
+                        os.makedirs(gallery.EMBEDDINGS_DIR)
+                    state['index'].save(_index_file(name))
+                except Exception as e:
+                    print(f"Error saving face index: {e}")
+            state['dir_mtime'] = dir_mtime
+        return state['index']
+
+
+def photo_changed(path: str):
+    """
+    Mark a student photo that was overwritten in place as changed. Touching its directory
+    makes every worker's campus_index() rescan it, as adding or deleting a photo does
+    """
+    try:
+        os.utime(os.path.dirname(os.path.abspath(path)))
+    except OSError as e:
+        print(f"Error marking {path} as changed: {e}")
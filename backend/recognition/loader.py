@@ -0,0 +1,49 @@
+import os
+import importlib
+
+# Set to 1 to load the recognition backend's models while the worker starts
+PRELOAD_ENV = "RECOGNITION_PRELOAD"
+
+
+class RecognitionUnavailable(ImportError):
+    """A face recognition dependency is not installed"""
+
+
+def load(name: str):
+    """Import a heavy dependency on first use (later calls are a sys.modules lookup)"""
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        raise RecognitionUnavailable(f"{name} is not available: {e}") from e
+
+
+def numpy():
+    return load("numpy")
+
+
+def cv2():
+    return load("cv2")
+
+
+def pil_image():
+    return load("PIL.Image")
+
+
+def deepface():
+    """The DeepFace API module (imports TensorFlow)"""
+    return load("deepface.DeepFace")
+
+
+def onnxruntime():
+    return load("onnxruntime")
+
+
+def preload_requested() -> bool:
+    return os.environ.get(PRELOAD_ENV, "").lower() in ("1", "true", "yes")
+
+
+def preload():
+    """Import the recognition stack and load the configured backend's models ahead of the first request"""
+    from recognition import backends
+    cv2()
+    backends.get_backend().load()
@@ -0,0 +1,103 @@
+from typing import List, Optional, Tuple
+
+from recognition import config, loader
+
+
+def similarity(probes, references):
+    """
+    Cosine similarity as a percentage between normalized embeddings, shape (probes, references)
+    references is a float32 array or a QuantizedMatrix, which is scored in its storage type
+    """
+    if hasattr(references, "similarity"):
+        return references.similarity(probes)
+    return probes @ references.T * 100
+
+
+def best_matches(probes, references, threshold: float = config.MATCH_THRESHOLD) -> List[Tuple[int, int, float]]:
+    """
+    For each reference, the probe that matches it best at or above the threshold
+    Returns (probe index, reference index, similarity) sorted by probe, then reference
+    """
+    np = loader.numpy()
+    if len(probes) == 0 or len(references) == 0 or probes.shape[1] != references.shape[1]:
+        return []
+
+    scores = similarity(probes, references)
+    best = scores.argmax(axis=0)
+    best_scores = scores[best, np.arange(scores.shape[1])]
+    return sorted(
+        (int(best[reference]), int(reference), float(best_scores[reference]))
+        for reference in np.flatnonzero(best_scores >= threshold)
+    )
+
+
+def take(references, rows):
+    """The given rows of a gallery: a float32 array, a QuantizedMatrix or a TemplateGallery"""
+    if hasattr(references, "take"):
+        return references.take(rows)
+    return references[rows]
+
+
+class EarlyExitMatcher:
+    """
+    best_matches over faces that arrive batch by batch
+    A student matched at or above `confident` leaves the active gallery, so later faces are
+    compared with fewer students, and done turns True once every student is matched, so the
+    caller can stop detecting and embedding. With confident None every face is compared with
+    every student, exactly as best_matches does
+    """
+
+    def __init__(self, references, threshold: float = config.MATCH_THRESHOLD,
+                 confident: Optional[float] = config.EARLY_EXIT_THRESHOLD):
+        np = loader.numpy()
+        self.references = references
+        self.threshold = threshold
+        self.confident = confident
+        # Students still compared with new faces, and their gallery
+        self.active = np.arange(len(references))
+        self._gallery = references
+        # student -> (probe index, similarity) of the best match so far
+        self._best = {}
+        # Every probe added, in order
+        self.probes = []
+        # Face-template comparisons made so far
+        self.comparisons = 0
+        # Students with a template: a zero row (no usable photo) never matches, so done does not wait for it
+        rows = getattr(references, "centroids", references)
+        rows = getattr(rows, "codes", rows)
+        self.matchable = int(np.count_nonzero(np.any(rows != 0, axis=1))) if len(rows) else 0
+
+    @property
+    def done(self) -> bool:
+        """Every student who can match is matched, so further faces cannot change who is present"""
+        return self.confident is not None and len(self._best) >= self.matchable
+
+    def add(self, probes):
+        """Match a batch of normalized probes with the active students"""
+        np = loader.numpy()
+        start = len(self.probes)
+        self.probes.extend(probes)
+        if len(probes) == 0 or len(self.active) == 0 or probes.shape[1] != self.references.shape[1]:
+            return
+
+        gallery = self._gallery
+        before = getattr(gallery, "comparisons", 0)
+        scores = similarity(probes, gallery)
+        self.comparisons += getattr(gallery, "comparisons", before + scores.size) - before
+
+        best = scores.argmax(axis=0)
+        best_scores = scores[best, np.arange(scores.shape[1])]
+        for column in np.flatnonzero(best_scores >= self.threshold):
+            student = int(self.active[column])
+            if student not in self._best or best_scores[column] > self._best[student][1]:
+                self._best[student] = (start + int(best[column]), float(best_scores[column]))
+
+        if self.confident is not None:
+            leaving = best_scores >= self.confident
+            if leaving.any():
+                self.active = self.active[~leaving]
+                self._gallery = take(self.references, self.active)
+
+    def matches(self) -> List[Tuple[int, int, float]]:
+        """(probe index, reference index, similarity) like best_matches"""
+        return sorted((probe, student, score) for student, (probe, score) in self._best.items())
@@ -0,0 +1,83 @@
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from recognition import config, loader
+
+# Rejection reasons, in the order they are checked (cheapest first)
+REASONS = ("no_face", "too_small", "low_confidence", "profile", "blurry")
+
+# Side of the grayscale crop sharpness is measured on, so it does not depend on face size
+SHARPNESS_SIZE = 112
+
+
+def sharpness(face) -> float:
+    """Variance of the Laplacian of a detector crop (RGB floats in [0, 1]), ignoring black padding"""
+    np = loader.numpy()
+    cv2 = loader.cv2()
+    gray = cv2.cvtColor((np.clip(face, 0, 1) * 255).astype(np.uint8), cv2.COLOR_RGB2GRAY)
+
+    # DeepFace pads its crops to the target size with black
+    rows = np.flatnonzero(gray.max(axis=1))
+    columns = np.flatnonzero(gray.max(axis=0))
+    if len(rows) < 3 or len(columns) < 3:
+        return 0.0
+    gray = gray[rows[0]:rows[-1] + 1, columns[0]:columns[-1] + 1]
+    gray = cv2.resize(gray, (SHARPNESS_SIZE, SHARPNESS_SIZE), interpolation=cv2.INTER_AREA)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def yaw(landmarks) -> Optional[float]:
+    """Horizontal offset of the nose from between the eyes, in eye distances (0 when frontal)"""
+    np = loader.numpy()
+    points = np.asarray(landmarks, dtype=np.float32)
+    eye_distance = float(np.linalg.norm(points[1] - points[0]))
+    if eye_distance == 0:
+        return None
+    return float(points[2][0] - (points[0][0] + points[1][0]) / 2) / eye_distance
+
+
+def assess(face: Dict[str, Any]) -> Optional[str]:
+    """The reason to skip a detected face, or None when it is good enough to embed"""
+    area = face.get("facial_area") or {}
+    if face.get("confidence") == 0:
+        # DeepFace's stand-in for "no face found": the whole image with confidence 0
+        return "no_face"
+    if min(area.get("w", 0), area.get("h", 0)) < config.QUALITY_MIN_FACE_SIZE:
+        return "too_small"
+    if (face.get("confidence") or 0) < config.QUALITY_MIN_CONFIDENCE:
+        return "low_confidence"
+    landmarks = face.get("landmarks")
+    if landmarks is not None:
+        offset = yaw(landmarks)
+        if offset is None or abs(offset) > config.QUALITY_MAX_YAW:
+            return "profile"
+    if sharpness(face["face"]) < config.QUALITY_MIN_SHARPNESS:
+        return "blurry"
+    return None
+
+
+def gate(faces: Sequence[Dict[str, Any]]) -> Tuple[List[Tuple[int, Dict[str, Any]]], Counter]:
+    """
+    Split detected faces into the ones worth embedding, as (index in faces, face) pairs,
+    and a count of the others per reason. Keeps every face when config.QUALITY_GATE is off
+    """
+    if not config.QUALITY_GATE:
+        return list(enumerate(faces)), Counter()
+
+    kept, rejected = [], Counter()
+    for index, face in enumerate(faces):
+        reason = assess(face)
+        if reason is None:
+            kept.append((index, face))
+        else:
+            rejected[reason] += 1
+    return kept, rejected
+
+
+def summary(detected: int, rejected: Counter) -> Dict[str, Any]:
+    """Response/record summary of a quality gate run"""
+    return {
+        "detected": detected,
+        "kept": detected - sum(rejected.values()),
+        "rejected": {reason: rejected[reason] for reason in REASONS if rejected[reason]}
+    }
@@ -0,0 +1,84 @@
+from typing import Tuple
+
+from recognition import loader
+
+# Storage types for gallery embeddings
+DTYPES = ("float32", "float16", "int8")
+
+# Gallery rows scored per block; only one block is ever widened to float32
+BLOCK_ROWS = 4096
+
+
+def quantize(vectors, dtype: str) -> Tuple:
+    """
+    Encode normalized float32 rows as (codes, per-row scales)
+    int8 uses a symmetric per-vector scale (the row's largest magnitude maps to 127);
+    float32 and float16 rows have a scale of 1
+    """
+    np = loader.numpy()
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown gallery dtype: {dtype}. Must be one of: {', '.join(DTYPES)}")
+
+    if dtype != "int8":
+        return vectors.astype(dtype), np.ones(len(vectors), dtype=np.float32)
+
+    peaks = np.abs(vectors).max(axis=1) if vectors.size else np.zeros(len(vectors), dtype=np.float32)
+    scales = (peaks / 127).astype(np.float32)
+    divisors = np.where(scales > 0, scales, 1)[:, None]
+    codes = np.clip(np.rint(vectors / divisors), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+class QuantizedMatrix:
+    """
+    Gallery embeddings kept in their storage type (float32, float16 or int8 + scale)
+    similarity scores probes against the stored codes block by block and folds the
+    per-row scale into the scores, so the whole gallery is never dequantized
+    """
+
+    def __init__(self, codes, scales, dtype: str):
+        self.codes = codes
+        self.scales = scales
+        self.dtype = dtype
+
+    @classmethod
+    def from_vectors(cls, vectors, dtype: str) -> "QuantizedMatrix":
+        codes, scales = quantize(vectors, dtype)
+        return cls(codes, scales, dtype)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.codes.shape
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.dtype == "int8" else 0)
+
+    def take(self, rows) -> "QuantizedMatrix":
+        """A matrix of the given rows only"""
+        return QuantizedMatrix(self.codes[rows], self.scales[rows], self.dtype)
+
+    def dequantize(self):
+        np = loader.numpy()
+        vectors = self.codes.astype(np.float32)
+        if self.dtype == "int8":
+            vectors *= self.scales[:, None]
+        return vectors
+
+    def similarity(self, probes):
+        """Cosine similarity as a percentage between normalized float32 probes and the rows, shape (probes, rows)"""
+        np = loader.numpy()
+        probes = np.asarray(probes, dtype=np.float32)
+        scores = np.empty((len(probes), len(self)), dtype=np.float32)
+        for start in range(0, len(self), BLOCK_ROWS):
+            stop = start + BLOCK_ROWS
+            block = self.codes[start:stop].astype(np.float32, copy=False)
+            block_scores = probes @ block.T
+            if self.dtype == "int8":
+                block_scores *= self.scales[start:stop]
+            scores[:, start:stop] = block_scores
+        return scores * 100
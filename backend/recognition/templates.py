@@ -0,0 +1,209 @@
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from recognition import backends, config, embeddings, gallery, loader, quantization
+
+_lock = threading.Lock()
+# backend name -> {'mtime': captures file mtime, 'captures': {student id: [(codes, scale), ...] oldest first}}
+_state = {}
+
+
+class TemplateGallery:
+    """
+    Several templates per student, scored against one normalized centroid per student
+    Only (face, student) pairs whose centroid score falls within config.TEMPLATE_MARGIN
+    below the threshold are compared with that student's individual templates, so a
+    class costs about one comparison per student
+    """
+
+    def __init__(self, centroids: quantization.QuantizedMatrix, templates: quantization.QuantizedMatrix,
+                 owners, threshold: float = config.MATCH_THRESHOLD):
+        np = loader.numpy()
+        self.centroids = centroids
+        self.templates = templates
+        self.threshold = threshold
+        # Template rows of each student
+        self.rows = [np.flatnonzero(owners == student) for student in range(len(centroids))]
+        # Face-template comparisons made so far (centroids count as one template)
+        self.comparisons = 0
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.centroids.shape
+
+    def __len__(self) -> int:
+        return len(self.centroids)
+
+    @property
+    def nbytes(self) -> int:
+        return self.centroids.nbytes + self.templates.nbytes
+
+    def take(self, students) -> "TemplateGallery":
+        """A gallery of the given students only, in that order"""
+        np = loader.numpy()
+        owners = np.full(len(self.templates), -1, dtype=np.int64)
+        for student, previous in enumerate(students):
+            owners[self.rows[previous]] = student
+        return TemplateGallery(self.centroids.take(students), self.templates, owners, self.threshold)
+
+    def similarity(self, probes):
+        """Centroid similarities, raised to the best template score for borderline pairs"""
+        np = loader.numpy()
+        probes = np.asarray(probes, dtype=np.float32)
+        scores = self.centroids.similarity(probes)
+        self.comparisons += scores.size
+        borderline = (scores >= self.threshold - config.TEMPLATE_MARGIN) & (scores < self.threshold)
+        for student in np.flatnonzero(borderline.any(axis=0)):
+            rows = self.rows[student]
+            if len(rows) < 2:
+                continue
+            faces = np.flatnonzero(borderline[:, student])
+            self.comparisons += len(faces) * len(rows)
+            templates = quantization.QuantizedMatrix(
+                self.templates.codes[rows], self.templates.scales[rows], self.templates.dtype
+            )
+            scores[faces, student] = np.maximum(scores[faces, student], templates.similarity(probes[faces]).max(axis=1))
+        return scores
+
+
+def prune_outliers(vectors):
+    """
+    Drop templates less similar than config.TEMPLATE_MIN_SIMILARITY to the centroid of the
+    student's other templates, the least similar first so one outlier cannot take good
+    templates with it. The first template (the enrollment photo) is always kept
+    """
+    np = loader.numpy()
+    while len(vectors) > 1:
+        others = embeddings.normalize(vectors.sum(axis=0)[None] - vectors)
+        scores = np.sum(vectors * others, axis=1) * 100
+        scores[0] = np.inf
+        worst = int(scores.argmin())
+        if scores[worst] >= config.TEMPLATE_MIN_SIMILARITY:
+            break
+        vectors = np.delete(vectors, worst, axis=0)
+    return vectors
+
+
+def _captures_file(backend: backends.Backend) -> str:
+    return os.path.join(gallery.EMBEDDINGS_DIR, f"captures-{backend.name}.npz")
+
+
+def _load_captures(backend: backends.Backend) -> Dict[str, List[Tuple[Any, float]]]:
+    """Reload the captured templates only when their file has changed"""
+    state = _state.setdefault(backend.name, {'mtime': None, 'captures': {}})
+    path = _captures_file(backend)
+    if not os.path.exists(path):
+        return state['captures']
+
+    mtime = os.path.getmtime(path)
+    if state['mtime'] != mtime:
+        np = loader.numpy()
+        try:
+            with np.load(path) as stored:
+                captures = {}
+                for student_id, codes, scale in zip(stored['student_ids'], stored['codes'], stored['scales']):
+                    captures.setdefault(str(student_id), []).append((codes, float(scale)))
+        except Exception as e:
+            print(f"Error loading captured templates: {e}")
+            return state['captures']
+        state.update({'mtime': mtime, 'captures': captures})
+    return state['captures']
+
+
+def _save_captures(backend: backends.Backend, captures: Dict[str, List[Tuple[Any, float]]]):
+    np = loader.numpy()
+    if not os.path.exists(gallery.EMBEDDINGS_DIR):
+        os.makedirs(gallery.EMBEDDINGS_DIR)
+
+    pairs = [(student_id, capture) for student_id, kept in captures.items() for capture in kept]
+    path = _captures_file(backend)
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'wb') as f:
+        np.savez(
+            f,
+            student_ids=np.array([student_id for student_id, _ in pairs], dtype=str),
+            codes=np.stack([codes for _, (codes, _) in pairs]) if pairs else np.zeros((0, 0), dtype=config.GALLERY_DTYPE),
+            scales=np.array([scale for _, (_, scale) in pairs], dtype=np.float32)
+        )
+    os.replace(temp_file, path)
+    _state[backend.name] = {'mtime': os.path.getmtime(path), 'captures': captures}
+
+
+def add_captures(captures: Sequence[Tuple[str, Any]], backend: Optional[backends.Backend] = None):
+    """
+    Keep normalized session face embeddings as extra templates of the students they matched,
+    the newest config.MAX_CAPTURES per student
+    """
+    if not captures:
+        return
+    backend = backend or backends.get_backend()
+    with _lock:
+        stored = {student_id: list(kept) for student_id, kept in _load_captures(backend).items()}
+        for student_id, vector in captures:
+            codes, scales = quantization.quantize(vector[None], config.GALLERY_DTYPE)
+            kept = stored.setdefault(student_id, [])
+            # Captures from before a change of config.GALLERY_DTYPE are replaced
+            kept[:] = [capture for capture in kept if capture[0].dtype == codes.dtype]
+            kept.append((codes[0], float(scales[0])))
+            del kept[:-config.MAX_CAPTURES]
+        try:
+            _save_captures(backend, stored)
+        except Exception as e:
+            print(f"Error saving captured templates: {e}")
+
+
+def forget_student(student_id: str):
+    """Remove a student's captured templates for every backend"""
+    with _lock:
+        for name in backends.BACKENDS:
+            backend = backends.get_backend(name)
+            captures = dict(_load_captures(backend))
+            if captures.pop(student_id, None) is not None:
+                try:
+                    _save_captures(backend, captures)
+                except Exception as e:
+                    print(f"Error saving captured templates: {e}")
+
+
+def student_templates(students: Sequence[Tuple[str, Sequence[str]]], backend: Optional[backends.Backend] = None,
+                      dtype: Optional[str] = None) -> TemplateGallery:
+    """
+    Templates for (student id, enrollment photo paths) pairs, primary photo first: the
+    photos' cached reference embeddings plus the student's captured templates, with
+    outliers pruned. A student without any template gets a zero centroid, which never matches
+    """
+    np = loader.numpy()
+    backend = backend or backends.get_backend()
+    dtype = dtype or config.GALLERY_DTYPE
+
+    paths = [path for _, photos in students for path in photos]
+    photos = gallery.reference_embeddings(paths, backend, dtype).dequantize() if paths else None
+    with _lock:
+        captured = _load_captures(backend)
+
+    per_student = []
+    start = 0
+    for student_id, student_photos in students:
+        vectors = [] if photos is None else [
+            vector for vector in photos[start:start + len(student_photos)] if np.any(vector)
+        ]
+        start += len(student_photos)
+        vectors.extend(codes.astype(np.float32) * scale for codes, scale in captured.get(student_id, []))
+        per_student.append(prune_outliers(np.array(vectors, dtype=np.float32)) if vectors else None)
+
+    dimension = next((kept.shape[1] for kept in per_student if kept is not None), 0)
+    centroids = np.zeros((len(students), dimension), dtype=np.float32)
+    owners = []
+    for student, kept in enumerate(per_student):
+        if kept is not None:
+            centroids[student] = embeddings.normalize(kept.mean(axis=0)[None])[0]
+            owners.extend([student] * len(kept))
+    templates = np.concatenate([kept for kept in per_student if kept is not None]) if owners else \
+        np.zeros((0, dimension), dtype=np.float32)
+
+    return TemplateGallery(
+        quantization.QuantizedMatrix.from_vectors(centroids, dtype),
+        quantization.QuantizedMatrix.from_vectors(templates, dtype),
+        np.array(owners, dtype=np.int64)
+    )
@@ -0,0 +1,163 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from itertools import product
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+# Define file paths
+current_dir = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.join(current_dir, 'data')
+REPORT_VERSIONS_FILE = os.path.join(data_dir, 'report_versions.json')
+
+# Cache limits
+MAX_ENTRIES = 256
+MAX_BYTES = 64 * 1024 * 1024
+
+WILDCARD = "*"
+
+_lock = threading.RLock()
+_versions_cache = {'mtime': None, 'data': None}
+
+
+def _class_key(department: Optional[str], year: Optional[str], division: Optional[str]) -> str:
+    return "|".join(value or WILDCARD for value in (department, year, division))
+
+
+def load_versions() -> Dict[str, int]:
+    """Load the attendance data versions, reusing the in-process copy while the file is unchanged"""
+    with _lock:
+        if not os.path.exists(REPORT_VERSIONS_FILE):
+            return {}
+
+        mtime = os.path.getmtime(REPORT_VERSIONS_FILE)
+        if _versions_cache['data'] is None or _versions_cache['mtime'] != mtime:
+            with open(REPORT_VERSIONS_FILE, 'r') as f:
+                _versions_cache['data'] = json.load(f)
+            _versions_cache['mtime'] = mtime
+        return _versions_cache['data']
+
+
+def data_version(department: Optional[str] = None, year: Optional[str] = None,
+                 division: Optional[str] = None) -> int:
+    """Get the attendance data version covering the given class filters (missing filters match all)"""
+    return load_versions().get(_class_key(department, year, division), 0)
+
+
+def invalidate_class(department: Optional[str], year: Optional[str], division: Optional[str]):
+    """
+    Bump the data version of a class after a session is added, updated or deleted
+    Every wildcard combination covering the class is bumped, so each report
+    filter maps to exactly one version key
+    """
+    try:
+        with _lock:
+            versions = dict(load_versions())
+            for combo in product((department, None), (year, None), (division, None)):
+                key = _class_key(*combo)
+                versions[key] = versions.get(key, 0) + 1
+
+            directory = os.path.dirname(REPORT_VERSIONS_FILE)
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+
+            temp_file = f"{REPORT_VERSIONS_FILE}.tmp"
+            with open(temp_file, 'w') as f:
+                json.dump(versions, f)
+            os.replace(temp_file, REPORT_VERSIONS_FILE)
+
+            _versions_cache['mtime'] = os.path.getmtime(REPORT_VERSIONS_FILE)
+            _versions_cache['data'] = versions
+    except Exception as e:
+        print(f"Error updating report versions: {e}")
+
+
+class CachedReport:
+    """A serialized report body with its ETag"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+class ReportCache:
+    """In-process LRU cache of serialized reports, bounded by entry count and total bytes"""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[CachedReport]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Tuple, body: bytes) -> CachedReport:
+        entry = CachedReport(body)
+        with self._lock:
+            if key in self._entries:
+                self.size -= len(self._entries.pop(key).body)
+
+            # Reports larger than the whole budget are served but never stored
+            if len(body) > self.max_bytes:
+                return entry
+
+            self._entries[key] = entry
+            self.size += len(body)
+
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted.body)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+report_cache = ReportCache()
+
+
+def make_key(endpoint: str, params: Dict[str, Any], version: int) -> Tuple:
+    """Build a cache key from the endpoint, its normalized parameters and the data version"""
+    normalized = tuple(sorted((name, value) for name, value in params.items() if value is not None))
+    return endpoint, normalized, version
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+def cached_response(request: Request, endpoint: str, params: Dict[str, Any], version: int,
+                    build: Callable[[], Any]) -> Response:
+    """
+    Serve a JSON report from the cache, building and storing it on a miss
+    Clients revalidate with If-None-Match and receive 304 while the data version is unchanged
+    """
+    key = make_key(endpoint, params, version)
+    entry = report_cache.get(key)
+    if entry is None:
+        body = json.dumps(jsonable_encoder(build())).encode("utf-8")
+        entry = report_cache.put(key, body)
+
+    headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=entry.body, media_type="application/json", headers=headers)
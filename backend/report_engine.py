@@ -0,0 +1,263 @@
+import os
+import io
+import csv
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Define file paths
+current_dir = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.join(current_dir, 'data')
+ATTENDANCE_DIR = os.path.join(data_dir, 'attendance')
+
+# Columns of the long attendance frame (one row per student per session)
+COLUMNS = ["Student ID", "Name", "Present", "Date", "Subject", "Teacher", "Department", "Year", "Division"]
+CATEGORY_COLUMNS = ["Name", "Date", "Subject", "Teacher", "Department", "Year", "Division"]
+
+# Number of students written per chunk when streaming exports
+EXPORT_CHUNK_ROWS = 500
+
+
+def filter_records(
+    history: Iterable[Dict[str, Any]],
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    department: Optional[str] = None,
+    year: Optional[str] = None,
+    division: Optional[str] = None,
+    subject: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Select the session records matching the report filters in one pass"""
+    selected = []
+    for record in history:
+        date = record.get("date") or ""
+        if start_date and date < start_date:
+            continue
+        if end_date and date > end_date:
+            continue
+        if department and record.get("department") != department:
+            continue
+        if year and record.get("year") != year:
+            continue
+        if division and record.get("division") != division:
+            continue
+        if subject and record.get("subject") != subject:
+            continue
+        selected.append(record)
+    return selected
+
+
+def _record_rows(record: Dict[str, Any]):
+    """Yield (student_id, name, present) rows for a session record"""
+    if "records" in record:
+        for item in record.get("records", []):
+            yield item.get("student_id"), item.get("student_name"), int(item.get("status") == "Present")
+        return
+
+    attendance_file = os.path.join(ATTENDANCE_DIR, record.get("attendance_file", ""))
+    if not record.get("attendance_file") or not os.path.exists(attendance_file):
+        return
+
+    try:
+        with open(attendance_file, 'r', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                if len(row) >= 3:
+                    yield row[0], row[1], int(row[2] == "1")
+    except Exception as e:
+        print(f"Error reading attendance file: {e}")
+
+
+def load_frame(records: Iterable[Dict[str, Any]], student_id: Optional[str] = None) -> pd.DataFrame:
+    """
+    Build one long attendance frame for the given session records
+    Rows are gathered into column lists and the frame is constructed once,
+    instead of reading and concatenating one DataFrame per session
+    """
+    columns = {name: [] for name in COLUMNS}
+
+    for record in records:
+        date = record.get("date")
+        subject = record.get("subject")
+        teacher = record.get("teacher_name")
+        department = record.get("department")
+        year = record.get("year")
+        division = record.get("division")
+
+        for sid, name, present in _record_rows(record):
+            if student_id is not None and sid != student_id:
+                continue
+            columns["Student ID"].append(sid)
+            columns["Name"].append(name)
+            columns["Present"].append(present)
+            columns["Date"].append(date)
+            columns["Subject"].append(subject)
+            columns["Teacher"].append(teacher)
+            columns["Department"].append(department)
+            columns["Year"].append(year)
+            columns["Division"].append(division)
+
+    frame = pd.DataFrame(columns, columns=COLUMNS)
+    frame["Present"] = frame["Present"].astype(np.int8)
+    for name in CATEGORY_COLUMNS:
+        frame[name] = frame[name].astype("category")
+    return frame
+
+
+def monthly_report(frame: pd.DataFrame) -> pd.DataFrame:
+    """Per-student totals for a monthly report"""
+    student_stats = frame.groupby(["Student ID", "Name"], observed=True, sort=True).agg(
+        total_classes=("Present", "count"),
+        present_count=("Present", "sum")
+    ).reset_index()
+
+    student_stats["Name"] = student_stats["Name"].astype(object)
+    student_stats["present_count"] = student_stats["present_count"].astype(int)
+    student_stats["Attendance Percentage"] = (
+        student_stats["present_count"] / student_stats["total_classes"] * 100
+    ).round(2)
+
+    return student_stats.rename(columns={
+        "total_classes": "Total Classes",
+        "present_count": "Classes Attended"
+    })
+
+
+def student_report(frame: pd.DataFrame) -> Dict[str, Any]:
+    """Overall, per-subject and per-session figures for a single student's frame"""
+    total_classes = len(frame)
+    classes_attended = int(frame["Present"].sum())
+    attendance_percentage = (classes_attended / total_classes * 100) if total_classes > 0 else 0
+
+    subject_stats = frame.groupby("Subject", observed=True, sort=True).agg(
+        total_classes=("Present", "count"),
+        present_count=("Present", "sum")
+    ).reset_index()
+    subject_stats["Subject"] = subject_stats["Subject"].astype(object)
+    subject_stats["present_count"] = subject_stats["present_count"].astype(int)
+    subject_stats["attendance_percentage"] = (
+        subject_stats["present_count"] / subject_stats["total_classes"] * 100
+    ).round(2)
+
+    detailed = pd.DataFrame({
+        "Date": frame["Date"].astype(object),
+        "Subject": frame["Subject"].astype(object),
+        "Status": np.where(frame["Present"].to_numpy() == 1, "Present", "Absent")
+    })
+
+    return {
+        "overall_stats": {
+            "total_classes": total_classes,
+            "classes_attended": classes_attended,
+            "attendance_percentage": round(attendance_percentage, 2)
+        },
+        "subject_stats": subject_stats.to_dict(orient="records"),
+        "detailed_attendance": detailed.to_dict(orient="records")
+    }
+
+
+class PivotMarks:
+    """
+    Compact per-student session marks for the export pivot
+    Each student holds one int8 row over the session columns (-1 = not recorded,
+    0 = absent, 1 = present), so memory is bounded by students x sessions bytes
+    and the full string pivot is never built
+    """
+
+    def __init__(self, columns: List[Tuple[str, str]]):
+        self.columns = columns
+        self.rows = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def header_rows(self) -> List[List[str]]:
+        return [
+            ["Student ID", "Name"] + [date for date, _ in self.columns],
+            ["", ""] + [subject for _, subject in self.columns]
+        ]
+
+    def iter_chunks(self, chunk_rows: int = EXPORT_CHUNK_ROWS):
+        """Yield lists of output rows, ordered by student, chunk_rows at a time"""
+        keys = sorted(self.rows)
+        for start in range(0, len(keys), chunk_rows):
+            chunk_keys = keys[start:start + chunk_rows]
+            marks = np.stack([self.rows[key] for key in chunk_keys])
+            values = np.where(marks == 1, "P", "A")
+            yield [[sid, name] + row for (sid, name), row in zip(chunk_keys, values.tolist())]
+
+
+def build_pivot_marks(records: List[Dict[str, Any]]) -> PivotMarks:
+    """Scan the session records once, recording each student's mark per (date, subject) column"""
+    columns = sorted({(r.get("date") or "", r.get("subject") or "") for r in records})
+    column_index = {column: i for i, column in enumerate(columns)}
+    pivot = PivotMarks(columns)
+
+    for record in records:
+        col = column_index[(record.get("date") or "", record.get("subject") or "")]
+        for sid, name, present in _record_rows(record):
+            key = (sid or "", name or "")
+            row = pivot.rows.get(key)
+            if row is None:
+                row = pivot.rows[key] = np.full(len(columns), -1, dtype=np.int8)
+            # Keep the first mark when a student appears twice in the same column
+            if row[col] < 0:
+                row[col] = present
+
+    return pivot
+
+
+def iter_pivot_csv(pivot: PivotMarks, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """Stream the pivot as CSV text, one chunk of students at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerows(pivot.header_rows())
+    for rows in pivot.iter_chunks(chunk_rows):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_pivot_xlsx(pivot: PivotMarks, chunk_rows: int = EXPORT_CHUNK_ROWS, read_size: int = 64 * 1024):
+    """
+    Stream the pivot as an XLSX workbook
+    Rows are written with xlsxwriter's constant_memory mode to a temporary file,
+    which is then streamed back in read_size blocks and removed
+    """
+    import xlsxwriter
+
+    handle, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(handle)
+
+    try:
+        workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+        worksheet = workbook.add_worksheet("Attendance")
+
+        row_number = 0
+        for row in pivot.header_rows():
+            worksheet.write_row(row_number, 0, row)
+            row_number += 1
+
+        for rows in pivot.iter_chunks(chunk_rows):
+            for row in rows:
+                worksheet.write_row(row_number, 0, row)
+                row_number += 1
+
+        workbook.close()
+
+        with open(path, "rb") as f:
+            while True:
+                block = f.read(read_size)
+                if not block:
+                    break
+                yield block
+    finally:
+        os.remove(path)
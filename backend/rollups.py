@@ -0,0 +1,254 @@
+import os
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Define file paths
+current_dir = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.join(current_dir, 'data')
+ROLLUPS_FILE = os.path.join(data_dir, 'attendance_rollups.json')
+ATTENDANCE_HISTORY_FILE = os.path.join(data_dir, 'attendance_history.json')
+
+# Fields that identify a rollup group
+GROUP_FIELDS = ('department', 'year', 'division', 'subject', 'teacher_id')
+GRANULARITIES = ('daily', 'monthly')
+
+_lock = threading.RLock()
+_cache = {'mtime': None, 'data': None, 'generation': 0}
+_prefix_index = {'generation': None, 'daily': {}, 'monthly': {}}
+
+
+def _group_values(record: Dict[str, Any]) -> Tuple[str, ...]:
+    return (
+        record.get('department'),
+        record.get('year'),
+        record.get('division'),
+        record.get('subject'),
+        record.get('teacher_id') or record.get('taken_by')
+    )
+
+
+def session_counts(record: Dict[str, Any]) -> Tuple[int, int]:
+    """Get (present, total) student counts for a session record"""
+    if 'records' in record:
+        students = record.get('records', [])
+        present = sum(1 for s in students if s.get('status') == 'Present')
+        return present, len(students)
+    return record.get('present_count', 0), record.get('total_count', 0)
+
+
+def _apply(data: Dict[str, Any], record: Dict[str, Any], sign: int):
+    """Add (sign=1) or remove (sign=-1) a session from the daily and monthly sums"""
+    date = record.get('date')
+    if not date:
+        return
+
+    values = _group_values(record)
+    group_key = '|'.join(str(v) for v in values)
+    present, total = session_counts(record)
+
+    group = data['groups'].get(group_key)
+    if group is None:
+        if sign < 0:
+            return
+        group = data['groups'][group_key] = dict(zip(GROUP_FIELDS, values))
+        group['daily'] = {}
+        group['monthly'] = {}
+
+    for granularity, bucket_key in (('daily', date), ('monthly', date[:7])):
+        bucket = group[granularity].setdefault(bucket_key, [0, 0, 0])
+        bucket[0] += sign
+        bucket[1] += sign * present
+        bucket[2] += sign * total
+        if bucket[0] <= 0:
+            del group[granularity][bucket_key]
+
+    if not group['daily']:
+        del data['groups'][group_key]
+
+
+def _write(data: Dict[str, Any]):
+    directory = os.path.dirname(ROLLUPS_FILE)
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    temp_file = f"{ROLLUPS_FILE}.tmp"
+    with open(temp_file, 'w') as f:
+        json.dump(data, f)
+    os.replace(temp_file, ROLLUPS_FILE)
+
+    _cache['mtime'] = os.path.getmtime(ROLLUPS_FILE)
+    _cache['data'] = data
+    _cache['generation'] += 1
+
+
+def rebuild_rollups() -> Dict[str, Any]:
+    """Rebuild all rollups from the attendance history (used once for migration)"""
+    with _lock:
+        data = {'groups': {}}
+
+        history = []
+        if os.path.exists(ATTENDANCE_HISTORY_FILE):
+            with open(ATTENDANCE_HISTORY_FILE, 'r') as f:
+                history = json.load(f)
+
+        for record in history:
+            _apply(data, record, 1)
+
+        _write(data)
+        return data
+
+
+def _load() -> Tuple[Dict[str, Any], bool]:
+    """
+    The rollups and whether they were just rebuilt from the history. Sessions are saved to
+    the history before they are recorded here, so a rebuild already includes the change
+    """
+    with _lock:
+        if not os.path.exists(ROLLUPS_FILE):
+            return rebuild_rollups(), True
+
+        mtime = os.path.getmtime(ROLLUPS_FILE)
+        if _cache['data'] is None or _cache['mtime'] != mtime:
+            with open(ROLLUPS_FILE, 'r') as f:
+                _cache['data'] = json.load(f)
+            _cache['mtime'] = mtime
+            _cache['generation'] += 1
+        return _cache['data'], False
+
+
+def load_rollups() -> Dict[str, Any]:
+    """Load the rollups, reusing the in-process copy while the file is unchanged"""
+    return _load()[0]
+
+
+def record_session(record: Dict[str, Any]):
+    """Add a newly recorded session to the rollups"""
+    try:
+        with _lock:
+            data, rebuilt = _load()
+            if rebuilt:
+                return
+            _apply(data, record, 1)
+            _write(data)
+    except Exception as e:
+        print(f"Error updating attendance rollups: {e}")
+
+
+def retract_session(record: Dict[str, Any]):
+    """Remove a deleted session from the rollups"""
+    try:
+        with _lock:
+            data, rebuilt = _load()
+            if rebuilt:
+                return
+            _apply(data, record, -1)
+            _write(data)
+    except Exception as e:
+        print(f"Error updating attendance rollups: {e}")
+
+
+def correct_session(old_record: Dict[str, Any], new_record: Dict[str, Any]):
+    """Replace a session's old counts with its corrected counts"""
+    try:
+        with _lock:
+            data, rebuilt = _load()
+            if rebuilt:
+                return
+            _apply(data, old_record, -1)
+            _apply(data, new_record, 1)
+            _write(data)
+    except Exception as e:
+        print(f"Error updating attendance rollups: {e}")
+
+
+def _prefix_sums(granularity: str) -> Dict[str, Tuple[List[str], List[Tuple[int, int, int]]]]:
+    """Get sorted bucket keys and cumulative (sessions, present, total) sums per group"""
+    with _lock:
+        data = load_rollups()
+        if _prefix_index['generation'] != _cache['generation']:
+            for name in GRANULARITIES:
+                index = {}
+                for group_key, group in data['groups'].items():
+                    keys = sorted(group[name])
+                    cumulative = [(0, 0, 0)]
+                    for key in keys:
+                        sessions, present, total = group[name][key]
+                        last = cumulative[-1]
+                        cumulative.append((last[0] + sessions, last[1] + present, last[2] + total))
+                    index[group_key] = (keys, cumulative)
+                _prefix_index[name] = index
+            _prefix_index['generation'] = _cache['generation']
+        return _prefix_index[granularity]
+
+
+def _matching_groups(filters: Dict[str, Optional[str]]):
+    for group_key, group in load_rollups()['groups'].items():
+        if all(value is None or group.get(field) == value for field, value in filters.items()):
+            yield group_key, group
+
+
+def _range_sum(keys: List[str], cumulative: List[Tuple[int, int, int]],
+               start: Optional[str], end: Optional[str]) -> Tuple[int, int, int]:
+    i = bisect_left(keys, start) if start else 0
+    j = bisect_right(keys, end) if end else len(keys)
+    if j <= i:
+        return 0, 0, 0
+    high, low = cumulative[j], cumulative[i]
+    return high[0] - low[0], high[1] - low[1], high[2] - low[2]
+
+
+def _totals(sessions: int, present: int, total: int) -> Dict[str, Any]:
+    return {
+        'sessions': sessions,
+        'present': present,
+        'total': total,
+        'average_attendance': (present / total * 100) if total > 0 else 0
+    }
+
+
+def query(granularity: str = 'daily', start: Optional[str] = None, end: Optional[str] = None,
+          group_by: Sequence[str] = (), **filters) -> Dict[Tuple, Dict[str, Any]]:
+    """
+    Sum sessions/present/total over a key range using prefix sums
+    start/end are dates for daily and YYYY-MM months for monthly rollups (both inclusive)
+    Results are keyed by the values of the group_by fields
+    """
+    sums = {}
+
+    with _lock:
+        index = _prefix_sums(granularity)
+        for group_key, group in _matching_groups(filters):
+            keys, cumulative = index[group_key]
+            sessions, present, total = _range_sum(keys, cumulative, start, end)
+            if sessions == 0:
+                continue
+
+            result_key = tuple(group.get(field) for field in group_by)
+            current = sums.get(result_key, (0, 0, 0))
+            sums[result_key] = (current[0] + sessions, current[1] + present, current[2] + total)
+
+    return {key: _totals(*value) for key, value in sums.items()}
+
+
+def range_total(granularity: str = 'daily', start: Optional[str] = None, end: Optional[str] = None,
+                **filters) -> Dict[str, Any]:
+    """Sum sessions/present/total over a key range for all matching groups"""
+    return query(granularity, start, end, **filters).get((), _totals(0, 0, 0))
+
+
+def series(granularity: str = 'monthly', start: Optional[str] = None, end: Optional[str] = None,
+           **filters) -> Dict[str, Dict[str, Any]]:
+    """Get per-bucket sums over a key range, ordered by bucket key"""
+    sums = {}
+
+    with _lock:
+        for _, group in _matching_groups(filters):
+            for key, (sessions, present, total_count) in group[granularity].items():
+                if (start and key < start) or (end and key > end):
+                    continue
+                current = sums.get(key, (0, 0, 0))
+                sums[key] = (current[0] + sessions, current[1] + present, current[2] + total_count)
+
+    return {key: _totals(*sums[key]) for key in sorted(sums)}
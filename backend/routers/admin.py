@@ -1,6 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from security import get_current_active_user, is_admin
 from models import UserRole, UserCreate
+import pagination
+import user_index
+import recognition
 import os
 import json
 import uuid
@@ -13,6 +16,7 @@ router = APIRouter()
 current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 data_dir = os.path.join(current_dir, 'data')
 USERS_FILE = os.path.join(data_dir, 'users.json')
+STUDENT_IMAGES_DIR = os.path.join(data_dir, 'student_images')
 
 
 def get_all_users():
@@ -35,21 +39,27 @@ def save_users(users):
 @router.get("/users")
 async def get_users(
     role: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=pagination.MAX_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     current_user: dict = Depends(get_current_active_user)
 ):
-    """Get all users with optional role filter (admin only)"""
+    """Get all users with optional role filter, paginated with limit/cursor (admin only)"""
     if not is_admin(current_user):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view all users"
         )
     
-    users = get_all_users()
-    
-    if role:
-        users = [user for user in users if user.get("role") == role]
+    try:
+        users, next_cursor = user_index.page_users([role] if role else None, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
-    return users
+    return pagination.page_response(users, limit, next_cursor, fields)
 
 
 @router.get("/users/{user_id}")
@@ -64,10 +74,9 @@ async def get_user(
             detail="Not authorized to view user details"
         )
     
-    users = get_all_users()
-    for user in users:
-        if user.get("id") == user_id:
-            return user
+    user = user_index.get_user(user_id)
+    if user:
+        return pagination.project(user, None)
     
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
@@ -173,6 +182,21 @@ async def activate_user(
     )
 
 
+def remove_student_templates(student):
+    """Remove a deleted student's extra enrollment photos and captured templates"""
+    student_info = student.get("student_info", {})
+    try:
+        for template in student_info.get("templates", []):
+            template_path = os.path.join(STUDENT_IMAGES_DIR, template)
+            if os.path.exists(template_path):
+                os.remove(template_path)
+        # Captured templates are keyed by the student ID that attendance matches on
+        if student_info.get("student_id"):
+            recognition.forget_student(student_info["student_id"])
+    except Exception as e:
+        print(f"Error removing student templates: {e}")
+
+
 @router.delete("/users/{user_id}")
 async def delete_user(
     user_id: str,
@@ -193,6 +217,8 @@ async def delete_user(
         if user.get("id") == user_id:
             del users[i]
             save_users(users)
+            if user.get("role") == UserRole.STUDENT:
+                remove_student_templates(user)
             return {"message": "User deleted successfully"}
     
     raise HTTPException(
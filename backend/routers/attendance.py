@@ -1,25 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
 from fastapi.responses import JSONResponse
 from security import get_current_active_user, is_teacher
 from models import UserRole
+import aggregates
+import rollups
+import report_cache
+import events
+import history_index
+import pagination
+import serialization
+import user_index
+import recognition
+from attendance_api import recognize_photos, merge_recognized
 import os
 import json
+import copy
 import uuid
 import shutil
 from datetime import datetime
-import cv2
-import numpy as np
-import io
-from PIL import Image
 from typing import List, Optional
-import base64
-
-# Import face recognition functions
-try:
-    from deepface import DeepFace
-except ImportError:
-    # If not installed, we'll show appropriate error messages when functions are called
-    pass
 
 router = APIRouter()
 
@@ -32,15 +31,6 @@ STUDENT_IMAGES_DIR = os.path.join(data_dir, 'student_images')
 TEMP_DIR = os.path.join(data_dir, 'temp')
 ATTENDANCE_HISTORY_FILE = os.path.join(data_dir, 'attendance_history.json')
 
-# Ensure directories exist
-for directory in [ATTENDANCE_DIR, STUDENT_IMAGES_DIR, TEMP_DIR]:
-    os.makedirs(directory, exist_ok=True)
-
-# Initialize attendance history file if it doesn't exist
-if not os.path.exists(ATTENDANCE_HISTORY_FILE):
-    with open(ATTENDANCE_HISTORY_FILE, 'w') as f:
-        json.dump([], f)
-
 
 def get_students_by_class(department, year, division):
     """Get students filtered by department, year, and division"""
@@ -79,9 +69,12 @@ def save_attendance_record(record):
         return False
 
 
-def save_attendance_to_csv(attendance_data, department, year, division, date):
-    """Save attendance data to a CSV file"""
+def save_attendance_to_csv(attendance_data, department, year, division, date, record_id=None):
+    """Save attendance data to a CSV file, of its own when the session's record_id is given"""
     filename = f"attendance_{department}_{year}_{division}_{date}.csv"
+    if record_id:
+        # A class has several sessions a day; each keeps its own marks
+        filename = f"attendance_{department}_{year}_{division}_{date}_{record_id}.csv"
     file_path = os.path.join(ATTENDANCE_DIR, filename)
     
     header = "Student ID,Name,Present\n"
@@ -100,70 +93,53 @@ def save_attendance_to_csv(attendance_data, department, year, division, date):
     return filename
 
 
-def recognize_faces(image_bytes, confidence_threshold=0.5):
-    """
-    Recognize faces in an image by comparing with student photos
-    Returns a list of recognized student IDs
-    """
-    try:
-        # Check if DeepFace is available
-        if 'DeepFace' not in globals():
-            raise ImportError("DeepFace module not installed")
-        
-        # Load the image
-        image = Image.open(io.BytesIO(image_bytes))
-        image_np = np.array(image)
-        
-        # Convert to BGR for OpenCV
-        if len(image_np.shape) == 3 and image_np.shape[2] == 3:
-            image_np = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
-        
-        # Save temporary image
-        temp_img_path = os.path.join(TEMP_DIR, "class_photo.jpg")
-        cv2.imwrite(temp_img_path, image_np)
-        
-        # Get all student images for comparison
-        recognized_students = []
-        
-        # Check all student photos in the directory
-        student_photos = [f for f in os.listdir(STUDENT_IMAGES_DIR) if f.endswith(('.jpg', '.jpeg', '.png'))]
-        
-        for photo in student_photos:
-            student_img_path = os.path.join(STUDENT_IMAGES_DIR, photo)
-            
-            try:
-                # Compare the images using DeepFace
-                result = DeepFace.verify(
-                    img1_path=temp_img_path,
-                    img2_path=student_img_path,
-                    enforce_detection=False,
-                    model_name="VGG-Face"
-                )
-                
-                if result["verified"] and result.get("distance", 1.0) < confidence_threshold:
-                    # Get student ID from photo name
-                    student_name = os.path.splitext(photo)[0].replace('_', ' ')
-                    
-                    # Find the student by name in users.json
-                    with open(USERS_FILE, 'r') as f:
-                        users = json.load(f)
-                        
-                    for user in users:
-                        if (user.get("role") == UserRole.STUDENT and 
-                            user.get("full_name", "").lower() == student_name):
-                            recognized_students.append({
-                                "student_id": user.get("student_info", {}).get("student_id"),
-                                "name": user.get("full_name"),
-                                "confidence": 1.0 - result.get("distance", 0)
-                            })
-                            break
-                    
-            except Exception as e:
-                print(f"Error comparing with {photo}: {e}")
-        
-        return recognized_students
+def recognition_students(students):
+    """Class students in the form recognize_photos takes: name, student ID, photo filename and templates"""
+    return [
+        {
+            "name": student.get("full_name"),
+            "student_id": student.get("student_info", {}).get("student_id"),
+            "filename": (student.get("student_info", {}).get("photo_filename") or
+                         f"{student.get('full_name', '').lower().replace(' ', '_')}.jpg"),
+            "templates": student.get("student_info", {}).get("templates", [])
+        }
+        for student in students
+    ]
+
+
+def students_by_photo():
+    """Map student photo filenames to students (uploaded photo, else the name-based filename)"""
+    students = {}
+    for user in user_index.get_users_by_role(UserRole.STUDENT):
+        student_info = user.get("student_info", {})
+        filename = student_info.get("photo_filename") or f"{user.get('full_name', '').lower().replace(' ', '_')}.jpg"
+        students[filename] = user
+    return students
+
+
+@router.post("/identify")
+async def identify_faces(
+    photo: UploadFile = File(...),
+    k: int = Query(5, ge=1, le=50),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Identify the faces in a photo among every enrolled student of the college"""
+    if not is_teacher(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to identify students"
+        )
     
-    except ImportError:
+    temp_path = os.path.join(TEMP_DIR, f"identify_{uuid.uuid4().hex}.jpg")
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(await photo.read())
+        found = recognition.extract_faces(temp_path)
+        detected, rejected = recognition.quality_gate(found)
+        probes = recognition.embed_crops([recognition.process_face(face) for _, face in detected])
+        index = recognition.campus_index(STUDENT_IMAGES_DIR) if detected else None
+        candidates = index.search(probes, k) if index is not None else [[] for _ in detected]
+    except recognition.RecognitionUnavailable:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Face recognition module not available. Please install deepface."
@@ -171,8 +147,37 @@ def recognize_faces(image_bytes, confidence_threshold=0.5):
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error recognizing faces: {str(e)}"
+            detail=f"Error identifying faces: {str(e)}"
         )
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    
+    students = students_by_photo()
+    faces = []
+    for (face_idx, face), matches in zip(detected, candidates):
+        faces.append({
+            "face_number": face_idx,
+            "facial_area": face.get("facial_area"),
+            "candidates": [
+                {
+                    "student_id": students[filename].get("student_info", {}).get("student_id"),
+                    "name": students[filename].get("full_name"),
+                    "department": students[filename].get("student_info", {}).get("department"),
+                    "year": students[filename].get("student_info", {}).get("year"),
+                    "division": students[filename].get("student_info", {}).get("division"),
+                    "similarity": similarity,
+                    "match": similarity >= recognition.config.MATCH_THRESHOLD
+                }
+                for filename, similarity in matches if filename in students
+            ]
+        })
+    
+    return serialization.fast_response({
+        "faces": faces,
+        "face_quality": recognition.quality.summary(len(found), rejected),
+        "model": recognition.config.MODEL_NAME
+    })
 
 
 @router.get("/history")
@@ -182,9 +187,12 @@ async def get_attendance_history(
     division: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=pagination.MAX_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     current_user: dict = Depends(get_current_active_user)
 ):
-    """Get attendance history with optional filters"""
+    """Get attendance history with optional filters, paginated with limit/cursor"""
     if current_user.get("role") not in [UserRole.ADMIN, UserRole.TEACHER, UserRole.CLASS_TEACHER]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -192,34 +200,22 @@ async def get_attendance_history(
         )
     
     try:
-        with open(ATTENDANCE_HISTORY_FILE, 'r') as f:
-            history = json.load(f)
-        
-        # Apply filters
-        filtered_history = history
-        
-        if department:
-            filtered_history = [h for h in filtered_history if h.get("department") == department]
-            
-        if year:
-            filtered_history = [h for h in filtered_history if h.get("year") == year]
-            
-        if division:
-            filtered_history = [h for h in filtered_history if h.get("division") == division]
-            
-        if start_date:
-            filtered_history = [h for h in filtered_history if h.get("date", "") >= start_date]
-            
-        if end_date:
-            filtered_history = [h for h in filtered_history if h.get("date", "") <= end_date]
-        
-        return filtered_history
-    
+        history, next_cursor = history_index.page_history(
+            limit, cursor, start_date, end_date,
+            department=department, year=year, division=division
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error fetching attendance history: {str(e)}"
         )
+    
+    return serialization.fast_response(pagination.page_response(history, limit, next_cursor, fields))
 
 
 @router.post("/take")
@@ -239,15 +235,21 @@ async def take_attendance(
         )
     
     try:
-        # Read the uploaded image
-        image_bytes = await photo.read()
-        
-        # Recognize faces in the image
-        recognized_students = recognize_faces(image_bytes)
-        
         # Get all students in the class
         class_students = get_students_by_class(department, year, division)
         
+        # Recognize faces in the image: quality gate, batched embedding and early exit
+        recognized = await recognize_photos([photo], recognition_students(class_students),
+                                            added_by=current_user.get("id"))
+        recognized_students = [
+            {
+                "student_id": result["student_id"],
+                "name": result["student_name"],
+                "confidence": result["confidence"] / 100
+            }
+            for result in recognized["records"]
+        ]
+        
         # Create attendance data
         today = datetime.now().strftime("%Y-%m-%d")
         attendance_data = []
@@ -265,11 +267,12 @@ async def take_attendance(
             })
         
         # Save attendance to CSV
-        csv_filename = save_attendance_to_csv(attendance_data, department, year, division, today)
+        record_id = str(uuid.uuid4())
+        csv_filename = save_attendance_to_csv(attendance_data, department, year, division, today, record_id)
         
         # Save attendance record to history
         record = {
-            "id": str(uuid.uuid4()),
+            "id": record_id,
             "date": today,
             "department": department,
             "year": year,
@@ -279,21 +282,35 @@ async def take_attendance(
             "teacher_name": current_user.get("full_name"),
             "attendance_file": csv_filename,
             "present_count": sum(1 for student in attendance_data if student["present"]),
-            "total_count": len(attendance_data)
+            "total_count": len(attendance_data),
+            "photos": recognized["photos"],
+            "face_quality": recognized["face_quality"],
+            "matching": recognized["matching"]
         }
         
         save_attendance_record(record)
+        aggregates.record_session(record, attendance_data)
+        rollups.record_session(record)
+        report_cache.invalidate_class(department, year, division)
+        events.publish_attendance_session(record)
         
         return {
             "message": "Attendance taken successfully",
             "date": today,
             "attendance_data": attendance_data,
             "recognized_students": recognized_students,
+            "face_quality": recognized["face_quality"],
+            "matching": recognized["matching"],
             "record_id": record["id"]
         }
         
     except HTTPException as e:
         raise e
+    except recognition.RecognitionUnavailable:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Face recognition module not available. Please install deepface."
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -328,11 +345,12 @@ async def manual_attendance(
         
         # Save attendance to CSV
         today = datetime.now().strftime("%Y-%m-%d")
-        csv_filename = save_attendance_to_csv(attendance_data, department, year, division, today)
+        record_id = str(uuid.uuid4())
+        csv_filename = save_attendance_to_csv(attendance_data, department, year, division, today, record_id)
         
         # Save attendance record to history
         record = {
-            "id": str(uuid.uuid4()),
+            "id": record_id,
             "date": today,
             "department": department,
             "year": year,
@@ -347,6 +365,10 @@ async def manual_attendance(
         }
         
         save_attendance_record(record)
+        aggregates.record_session(record, attendance_data)
+        rollups.record_session(record)
+        report_cache.invalidate_class(department, year, division)
+        events.publish_attendance_session(record)
         
         return {
             "message": "Attendance recorded successfully",
@@ -361,3 +383,116 @@ async def manual_attendance(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error recording attendance: {str(e)}"
         )
+
+
+@router.post("/{record_id}/photos")
+async def add_attendance_photos(
+    record_id: str,
+    photos: List[UploadFile] = File(...),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """
+    Add photos to an attendance session, e.g. a row that was cut off
+    Only the new photos are processed, against the students still marked absent
+    """
+    if not is_teacher(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to take attendance"
+        )
+    
+    record = next((r for r in history_index.get_history() if r.get("id") == record_id), None)
+    if record is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Attendance record not found"
+        )
+    if record.get("is_manual"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot add photos to manually recorded attendance"
+        )
+    
+    try:
+        marks = aggregates.session_marks(record)
+        # Older sessions of a class on the same day shared one file, which the last of them overwrote
+        if (sum(1 for _, _, present in marks if present), len(marks)) != rollups.session_counts(record):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="The session's attendance file is missing or was overwritten by a later session"
+            )
+        absent_ids = {student_id for student_id, _, present in marks if not present}
+        absent_students = [
+            student for student in get_students_by_class(record.get("department"), record.get("year"),
+                                                         record.get("division"))
+            if student.get("student_info", {}).get("student_id") in absent_ids
+        ]
+        # Sessions from before photo provenance were taken from a single photo
+        first_photo_number = 1 + max((p["photo_number"] for p in record.get("photos", [])), default=1)
+        recognized = await recognize_photos(photos, recognition_students(absent_students),
+                                            first_photo_number, current_user.get("id"))
+        recognized_students = [
+            {
+                "student_id": result["student_id"],
+                "name": result["student_name"],
+                "confidence": result["confidence"] / 100
+            }
+            for result in recognized["records"]
+        ]
+        recognized_ids = {student["student_id"] for student in recognized_students}
+        
+        # Recognition may take a while: merge into the session as it is now, not as it was read above
+        with open(ATTENDANCE_HISTORY_FILE, 'r') as f:
+            history = json.load(f)
+        record = next((r for r in history if r.get("id") == record_id), None)
+        if record is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Attendance record not found"
+            )
+        old_record = copy.deepcopy(record)
+        old_data = [
+            {"student_id": student_id, "name": name, "present": present}
+            for student_id, name, present in aggregates.session_marks(record)
+        ]
+        attendance_data = [
+            dict(item, present=item["present"] or item["student_id"] in recognized_ids)
+            for item in old_data
+        ]
+        
+        record["attendance_file"] = save_attendance_to_csv(
+            attendance_data, record.get("department"), record.get("year"), record.get("division"),
+            record.get("date"), record_id
+        )
+        record["present_count"] = sum(1 for student in attendance_data if student["present"])
+        merge_recognized(record, recognized)
+        
+        with open(ATTENDANCE_HISTORY_FILE, 'w') as f:
+            json.dump(history, f, indent=4)
+        aggregates.correct_session(old_record, record, old_data, attendance_data)
+        rollups.correct_session(old_record, record)
+        report_cache.invalidate_class(record.get("department"), record.get("year"), record.get("division"))
+        events.publish_attendance_session(record)
+        
+        return {
+            "message": "Photos added successfully",
+            "date": record.get("date"),
+            "attendance_data": attendance_data,
+            "recognized_students": recognized_students,
+            "face_quality": recognized["face_quality"],
+            "matching": recognized["matching"],
+            "record_id": record_id
+        }
+        
+    except HTTPException as e:
+        raise e
+    except recognition.RecognitionUnavailable:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Face recognition module not available. Please install deepface."
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error adding photos: {str(e)}"
+        )
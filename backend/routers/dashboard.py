@@ -1,128 +1,82 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from security import get_current_active_user, is_admin, is_teacher
 from models import UserRole
+import aggregates
+import rollups
+import history_index
+import notification_store
+import pagination
+import read_state
+import serialization
+import user_index
 import os
 import json
+from collections import Counter
 from datetime import datetime, timedelta
 from typing import List, Optional
-import pandas as pd
 import calendar
+import heapq
 
 router = APIRouter()
 
 # Define file paths
 current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 data_dir = os.path.join(current_dir, 'data')
-USERS_FILE = os.path.join(data_dir, 'users.json')
-ATTENDANCE_HISTORY_FILE = os.path.join(data_dir, 'attendance_history.json')
-ATTENDANCE_DIR = os.path.join(data_dir, 'attendance')
+STORAGE_FILE = os.path.join(data_dir, 'storage.json')
 
+# Roles allowed to request each bootstrap view
+BOOTSTRAP_VIEWS = {
+    "student": [UserRole.STUDENT],
+    "teacher": [UserRole.TEACHER, UserRole.CLASS_TEACHER],
+    "admin": [UserRole.ADMIN],
+    "class_management": [UserRole.ADMIN, UserRole.CLASS_TEACHER]
+}
 
-def load_attendance_history():
-    """Load attendance history from file"""
-    if os.path.exists(ATTENDANCE_HISTORY_FILE):
-        with open(ATTENDANCE_HISTORY_FILE, 'r') as f:
-            return json.load(f)
+# Teacher fields returned for class teacher selection, plus "name" (the dashboard's label) from full_name
+TEACHER_FIELDS = ["id", "full_name", "email", "role", "teacher_info"]
+
+
+def load_classes():
+    """Load the class list from the storage file"""
+    try:
+        if os.path.exists(STORAGE_FILE):
+            with open(STORAGE_FILE, 'r') as f:
+                return json.load(f).get("classes", [])
+    except Exception as e:
+        print(f"Error loading classes: {e}")
     return []
 
 
-def get_student_attendance(student_id: str):
-    """Get attendance records for a specific student"""
-    attendance_history = load_attendance_history()
-    student_attendance = []
-    
-    for record in attendance_history:
-        # Get the attendance file for this record
-        attendance_file = os.path.join(ATTENDANCE_DIR, record.get("attendance_file", ""))
-        if os.path.exists(attendance_file):
-            try:
-                # Read the CSV file
-                df = pd.read_csv(attendance_file)
-                
-                # Find the student in this attendance record
-                student_row = df[df["Student ID"] == student_id]
-                if not student_row.empty:
-                    present = student_row["Present"].values[0] == 1
-                    
-                    student_attendance.append({
-                        "date": record.get("date"),
-                        "subject": record.get("subject"),
-                        "teacher_name": record.get("teacher_name"),
-                        "present": present
-                    })
-            except Exception as e:
-                print(f"Error reading attendance file: {e}")
-    
-    return student_attendance
+def find_user(user_id: str, roles: List[str]):
+    """Get a user by ID from the user index if it has one of the roles"""
+    user = user_index.get_user(user_id)
+    if user is None or user.get("role") not in roles:
+        return None
+    return user
 
 
-@router.get("/student/{student_id}")
-async def get_student_dashboard(
-    student_id: str,
-    current_user: dict = Depends(get_current_active_user)
-):
-    """Get dashboard data for a specific student"""
-    # Check if the user is the student or an admin/teacher
-    if (current_user.get("role") == UserRole.STUDENT and 
-        current_user.get("id") != student_id and
-        not is_admin(current_user) and 
-        not is_teacher(current_user)):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to view this student's dashboard"
-        )
-    
-    # Get student details
-    with open(USERS_FILE, 'r') as f:
-        users = json.load(f)
-    
-    student = None
-    for user in users:
-        if user.get("id") == student_id and user.get("role") == UserRole.STUDENT:
-            student = user
-            break
-    
-    if not student:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Student not found"
-        )
-    
-    # Get student attendance
+def build_student_dashboard(student: dict):
+    """Student dashboard data from the materialized attendance counters"""
     student_info = student.get("student_info", {})
-    attendance_records = get_student_attendance(student_info.get("student_id"))
+    counters = aggregates.get_student_aggregate(student_info.get("student_id")) or {}
     
     # Calculate attendance statistics
-    today = datetime.now().date()
-    this_month_records = [r for r in attendance_records 
-                         if datetime.strptime(r.get("date"), "%Y-%m-%d").date().month == today.month]
+    this_month = datetime.now().strftime("%Y-%m")
+    month_summary = aggregates.summarize(counters, start_month=this_month, end_month=this_month)
     
-    total_classes = len(this_month_records)
-    attended_classes = sum(1 for r in this_month_records if r.get("present"))
+    total_classes = month_summary["total"]
+    attended_classes = month_summary["present"]
     
     attendance_percentage = (attended_classes / total_classes * 100) if total_classes > 0 else 0
     
-    # Get last 10 attendance records
-    recent_attendance = sorted(attendance_records, 
-                              key=lambda x: x.get("date"), 
-                              reverse=True)[:10]
+    # Last 10 attendance records are kept newest first
+    recent_attendance = [
+        {key: value for key, value in r.items() if key != "session"}
+        for r in counters.get("recent", [])
+    ]
     
     # Group attendance by subject
-    subject_attendance = {}
-    for record in attendance_records:
-        subject = record.get("subject")
-        if subject not in subject_attendance:
-            subject_attendance[subject] = {"total": 0, "present": 0}
-        
-        subject_attendance[subject]["total"] += 1
-        if record.get("present"):
-            subject_attendance[subject]["present"] += 1
-    
-    # Calculate percentage for each subject
-    for subject in subject_attendance:
-        total = subject_attendance[subject]["total"]
-        present = subject_attendance[subject]["present"]
-        subject_attendance[subject]["percentage"] = (present / total * 100) if total > 0 else 0
+    subject_attendance = aggregates.summarize(counters)["by_subject"]
     
     return {
         "student_id": student_info.get("student_id"),
@@ -142,100 +96,49 @@ async def get_student_dashboard(
     }
 
 
-@router.get("/teacher/{teacher_id}")
-async def get_teacher_dashboard(
-    teacher_id: str,
-    current_user: dict = Depends(get_current_active_user)
-):
-    """Get dashboard data for a specific teacher"""
-    # Check if the user is the teacher or an admin
-    if (current_user.get("role") in [UserRole.TEACHER, UserRole.CLASS_TEACHER] and 
-        current_user.get("id") != teacher_id and
-        not is_admin(current_user)):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to view this teacher's dashboard"
-        )
-    
-    # Get teacher details
-    with open(USERS_FILE, 'r') as f:
-        users = json.load(f)
-    
-    teacher = None
-    for user in users:
-        if user.get("id") == teacher_id and user.get("role") in [UserRole.TEACHER, UserRole.CLASS_TEACHER]:
-            teacher = user
-            break
+def build_teacher_dashboard(teacher: dict, history: List[dict]):
+    """Teacher dashboard data from the rollups and one pass over the attendance history"""
+    teacher_id = teacher.get("id")
     
-    if not teacher:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Teacher not found"
-        )
-    
-    # Get attendance records taken by this teacher
-    attendance_history = load_attendance_history()
-    teacher_records = [r for r in attendance_history if r.get("teacher_id") == teacher_id]
-    
-    # Calculate statistics
+    # Calculate statistics from the precomputed rollups
     today = datetime.now().date()
-    this_month = today.month
-    this_year = today.year
+    this_month = today.strftime("%Y-%m")
+    thirty_days_ago = (today - timedelta(days=30)).strftime("%Y-%m-%d")
     
-    # Get records from this month
-    this_month_records = [r for r in teacher_records 
-                         if datetime.strptime(r.get("date"), "%Y-%m-%d").date().month == this_month]
+    overall = rollups.range_total("monthly", teacher_id=teacher_id)
+    this_month_stats = rollups.range_total("monthly", this_month, this_month, teacher_id=teacher_id)
+    last_30_days_stats = rollups.range_total("daily", thirty_days_ago, teacher_id=teacher_id)
     
-    # Get records from last 30 days
-    thirty_days_ago = today - timedelta(days=30)
-    last_30_days_records = [r for r in teacher_records 
-                           if datetime.strptime(r.get("date"), "%Y-%m-%d").date() >= thirty_days_ago]
-    
-    # Group records by subject
+    # Group sessions by subject
     subject_stats = {}
-    for record in teacher_records:
-        subject = record.get("subject")
-        if subject not in subject_stats:
-            subject_stats[subject] = {"total_sessions": 0, "total_students": 0, "present_students": 0}
-        
-        subject_stats[subject]["total_sessions"] += 1
-        subject_stats[subject]["total_students"] += record.get("total_count", 0)
-        subject_stats[subject]["present_students"] += record.get("present_count", 0)
-    
-    # Calculate average attendance for each subject
-    for subject in subject_stats:
-        total = subject_stats[subject]["total_students"]
-        present = subject_stats[subject]["present_students"]
-        subject_stats[subject]["average_attendance"] = (present / total * 100) if total > 0 else 0
+    for (subject,), stats in rollups.query("monthly", group_by=("subject",), teacher_id=teacher_id).items():
+        subject_stats[subject] = {
+            "total_sessions": stats["sessions"],
+            "total_students": stats["total"],
+            "present_students": stats["present"],
+            "average_attendance": stats["average_attendance"]
+        }
     
     # Group by class (department, year, division)
-    class_stats = {}
-    for record in teacher_records:
-        class_key = f"{record.get('department')}_{record.get('year')}_{record.get('division')}"
-        if class_key not in class_stats:
-            class_stats[class_key] = {
-                "department": record.get("department"),
-                "year": record.get("year"),
-                "division": record.get("division"),
-                "total_sessions": 0,
-                "total_students": 0,
-                "present_students": 0
-            }
-        
-        class_stats[class_key]["total_sessions"] += 1
-        class_stats[class_key]["total_students"] += record.get("total_count", 0)
-        class_stats[class_key]["present_students"] += record.get("present_count", 0)
-    
-    # Calculate average attendance for each class
-    for class_key in class_stats:
-        total = class_stats[class_key]["total_students"]
-        present = class_stats[class_key]["present_students"]
-        class_stats[class_key]["average_attendance"] = (present / total * 100) if total > 0 else 0
+    class_stats = []
+    class_rollups = rollups.query("monthly", group_by=("department", "year", "division"), teacher_id=teacher_id)
+    for (department, year, division), stats in class_rollups.items():
+        class_stats.append({
+            "department": department,
+            "year": year,
+            "division": division,
+            "total_sessions": stats["sessions"],
+            "total_students": stats["total"],
+            "present_students": stats["present"],
+            "average_attendance": stats["average_attendance"]
+        })
     
     # Recent attendance sessions
-    recent_sessions = sorted(teacher_records, 
-                            key=lambda x: x.get("date"), 
-                            reverse=True)[:10]
+    recent_sessions = heapq.nlargest(
+        10,
+        (r for r in history if r.get("teacher_id") == teacher_id),
+        key=lambda x: x.get("date")
+    )
     
     return {
         "teacher_id": teacher.get("id"),
@@ -243,99 +146,191 @@ async def get_teacher_dashboard(
         "role": teacher.get("role"),
         "department": teacher.get("teacher_info", {}).get("department"),
         "summary": {
-            "total_sessions": len(teacher_records),
-            "this_month_sessions": len(this_month_records),
-            "last_30_days_sessions": len(last_30_days_records)
+            "total_sessions": overall["sessions"],
+            "this_month_sessions": this_month_stats["sessions"],
+            "last_30_days_sessions": last_30_days_stats["sessions"]
         },
         "subject_stats": subject_stats,
-        "class_stats": list(class_stats.values()),
+        "class_stats": class_stats,
         "recent_sessions": recent_sessions
     }
 
 
-@router.get("/stats")
-async def get_dashboard_stats(
-    current_user: dict = Depends(get_current_active_user)
-):
-    """Get overall system statistics"""
-    if not is_admin(current_user) and not is_teacher(current_user):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to view system statistics"
-        )
-    
-    # Get all users
-    with open(USERS_FILE, 'r') as f:
-        users = json.load(f)
-    
+def build_system_stats(users: List[dict]):
+    """System-wide statistics from one pass over the users and the precomputed rollups"""
     # Count users by role
-    admin_count = sum(1 for user in users if user.get("role") == UserRole.ADMIN)
-    class_teacher_count = sum(1 for user in users if user.get("role") == UserRole.CLASS_TEACHER)
-    teacher_count = sum(1 for user in users if user.get("role") == UserRole.TEACHER)
-    student_count = sum(1 for user in users if user.get("role") == UserRole.STUDENT)
+    role_counts = Counter(user.get("role") for user in users)
     
-    # Get attendance records
-    attendance_history = load_attendance_history()
-    
-    # Calculate statistics
+    # Calculate statistics from the precomputed rollups
     today = datetime.now().date()
-    this_month = today.month
+    this_month = today.strftime("%Y-%m")
     this_year = today.year
     
-    # Get records from this month
-    this_month_records = [r for r in attendance_history 
-                         if datetime.strptime(r.get("date"), "%Y-%m-%d").date().month == this_month]
+    overall = rollups.range_total("monthly")
+    this_month_stats = rollups.range_total("monthly", this_month, this_month)
     
     # Monthly attendance trend (for the current year)
     monthly_trend = {}
-    for month in range(1, 13):
-        month_records = [r for r in attendance_history 
-                        if datetime.strptime(r.get("date"), "%Y-%m-%d").date().month == month
-                        and datetime.strptime(r.get("date"), "%Y-%m-%d").date().year == this_year]
-        
-        if month_records:
-            total_students = sum(r.get("total_count", 0) for r in month_records)
-            present_students = sum(r.get("present_count", 0) for r in month_records)
-            avg_attendance = (present_students / total_students * 100) if total_students > 0 else 0
-            
-            monthly_trend[calendar.month_name[month]] = {
-                "sessions": len(month_records),
-                "average_attendance": avg_attendance
-            }
+    for month_key, stats in rollups.series("monthly", f"{this_year}-01", f"{this_year}-12").items():
+        monthly_trend[calendar.month_name[int(month_key[5:7])]] = {
+            "sessions": stats["sessions"],
+            "average_attendance": stats["average_attendance"]
+        }
     
     # Department-wise statistics
     department_stats = {}
-    for record in attendance_history:
-        dept = record.get("department")
-        if dept not in department_stats:
-            department_stats[dept] = {
-                "total_sessions": 0,
-                "total_students": 0,
-                "present_students": 0
-            }
-        
-        department_stats[dept]["total_sessions"] += 1
-        department_stats[dept]["total_students"] += record.get("total_count", 0)
-        department_stats[dept]["present_students"] += record.get("present_count", 0)
-    
-    # Calculate average attendance for each department
-    for dept in department_stats:
-        total = department_stats[dept]["total_students"]
-        present = department_stats[dept]["present_students"]
-        department_stats[dept]["average_attendance"] = (present / total * 100) if total > 0 else 0
+    for (dept,), stats in rollups.query("monthly", group_by=("department",)).items():
+        department_stats[dept] = {
+            "total_sessions": stats["sessions"],
+            "total_students": stats["total"],
+            "present_students": stats["present"],
+            "average_attendance": stats["average_attendance"]
+        }
     
     return {
         "user_counts": {
-            "admin": admin_count,
-            "class_teacher": class_teacher_count,
-            "teacher": teacher_count,
-            "student": student_count,
+            "admin": role_counts[UserRole.ADMIN.value],
+            "class_teacher": role_counts[UserRole.CLASS_TEACHER.value],
+            "teacher": role_counts[UserRole.TEACHER.value],
+            "student": role_counts[UserRole.STUDENT.value],
             "total": len(users)
         },
         "attendance_summary": {
-            "total_sessions": len(attendance_history),
-            "this_month_sessions": len(this_month_records),
+            "total_sessions": overall["sessions"],
+            "this_month_sessions": this_month_stats["sessions"],
             "department_stats": department_stats,
             "monthly_trend": monthly_trend
         }
     }
+
+
+@router.get("/student/{student_id}")
+async def get_student_dashboard(
+    student_id: str,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Get dashboard data for a specific student"""
+    # Check if the user is the student or an admin/teacher
+    if (current_user.get("role") == UserRole.STUDENT and 
+        current_user.get("id") != student_id and
+        not is_admin(current_user) and 
+        not is_teacher(current_user)):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view this student's dashboard"
+        )
+    
+    # Get student details
+    student = find_user(student_id, [UserRole.STUDENT])
+    
+    if not student:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Student not found"
+        )
+    
+    return build_student_dashboard(student)
+
+
+@router.get("/teacher/{teacher_id}")
+async def get_teacher_dashboard(
+    teacher_id: str,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Get dashboard data for a specific teacher"""
+    # Check if the user is the teacher or an admin
+    if (current_user.get("role") in [UserRole.TEACHER, UserRole.CLASS_TEACHER] and 
+        current_user.get("id") != teacher_id and
+        not is_admin(current_user)):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view this teacher's dashboard"
+        )
+    
+    # Get teacher details
+    teacher = find_user(teacher_id, [UserRole.TEACHER, UserRole.CLASS_TEACHER])
+    
+    if not teacher:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Teacher not found"
+        )
+    
+    return build_teacher_dashboard(teacher, history_index.get_history())
+
+
+@router.get("/stats")
+async def get_dashboard_stats(
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Get overall system statistics"""
+    if not is_admin(current_user) and not is_teacher(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view system statistics"
+        )
+    
+    return build_system_stats(user_index.get_users())
+
+
+@router.get("/bootstrap")
+async def get_dashboard_bootstrap(
+    view: str,
+    notifications_limit: int = Query(10, ge=1, le=pagination.MAX_LIMIT),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """
+    Everything a dashboard view needs in one response
+    Views: student, teacher, admin, class_management. Users and attendance history
+    are loaded once from the shared indexes and every section is built from them
+    """
+    if view not in BOOTSTRAP_VIEWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid view. Must be one of: {', '.join(BOOTSTRAP_VIEWS)}"
+        )
+    
+    if current_user.get("role") not in BOOTSTRAP_VIEWS[view]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view this dashboard"
+        )
+    
+    users = user_index.get_users()
+    history = history_index.get_history()
+    
+    notifications, next_cursor = notification_store.get_feed(current_user, notifications_limit)
+    state = read_state.get_state(current_user)
+    
+    payload = {
+        "view": view,
+        "user": pagination.project(current_user, None),
+        "notifications": {
+            "items": [
+                {**notification, "read": read_state.is_read(state, notification["seq"])}
+                for notification in notifications
+            ],
+            "next_cursor": next_cursor,
+            "unread_count": read_state.unread_count(current_user)
+        }
+    }
+    
+    if view == "student":
+        payload["dashboard"] = build_student_dashboard(current_user)
+    
+    elif view == "teacher":
+        payload["dashboard"] = build_teacher_dashboard(current_user, history)
+    
+    elif view == "admin":
+        payload["stats"] = build_system_stats(users)
+        payload["recent_sessions"] = heapq.nlargest(10, history, key=lambda x: x.get("date") or "")
+    
+    elif view == "class_management":
+        teacher_roles = [UserRole.TEACHER.value, UserRole.CLASS_TEACHER.value]
+        payload["classes"] = load_classes()
+        payload["teachers"] = [
+            dict(pagination.project(user, TEACHER_FIELDS), name=user.get("full_name"))
+            for user in users if user.get("role") in teacher_roles
+        ]
+    
+    return serialization.fast_response(payload)
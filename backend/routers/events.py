@@ -0,0 +1,119 @@
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect, status, Query
+from fastapi.responses import StreamingResponse
+from security import get_current_user, is_admin, is_class_teacher
+import notification_store
+import events
+import asyncio
+from typing import Optional
+
+router = APIRouter()
+
+# Seconds between keep-alive messages on an idle stream
+KEEPALIVE_INTERVAL = 15
+
+
+async def _authenticate(request_token: Optional[str], authorization: Optional[str]) -> dict:
+    """
+    Resolve the user for a push connection
+    Browsers cannot set headers on EventSource or WebSocket requests, so the
+    token may also be passed as the token query parameter
+    """
+    token = request_token
+    if not token and authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    user = await get_current_user(token)
+    if not user.get("is_active", True):
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return user
+
+
+def _subscription_keys(user: dict) -> list:
+    """Topics a user listens to: their notification targets plus attendance events"""
+    keys = notification_store.user_target_keys(user)
+
+    # Admins and class teachers follow every session; other teachers get their own via user:<id>
+    if is_admin(user) or is_class_teacher(user):
+        keys.append(events.ATTENDANCE_TOPIC)
+    # Students follow their own class's sessions
+    elif user.get("role") == "student":
+        student_info = user.get("student_info", {})
+        keys.append(events.class_topic(student_info.get("department"), student_info.get("year"),
+                                       student_info.get("division")))
+
+    return keys
+
+
+@router.get("/stream")
+async def stream_events(request: Request, token: Optional[str] = Query(None)):
+    """
+    Server-sent events stream of new notifications and finished attendance sessions
+    Events are named notification or attendance_session; idle streams receive a
+    keep-alive comment every KEEPALIVE_INTERVAL seconds
+    """
+    user = await _authenticate(token, request.headers.get("authorization"))
+    subscription = events.broker.subscribe(_subscription_keys(user))
+
+    async def event_stream():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=KEEPALIVE_INTERVAL)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield events.format_sse(event)
+        finally:
+            events.broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/ws")
+async def websocket_events(websocket: WebSocket, token: Optional[str] = Query(None)):
+    """WebSocket stream of the same events as /stream, sent as JSON messages"""
+    try:
+        user = await _authenticate(token, websocket.headers.get("authorization"))
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = events.broker.subscribe(_subscription_keys(user))
+
+    # Client messages are ignored; receiving them is how a disconnect is noticed.
+    # The pending queue read is kept across loop turns so no event is lost to a cancel
+    receiver = asyncio.ensure_future(websocket.receive_text())
+    getter = None
+    try:
+        while True:
+            if getter is None:
+                getter = asyncio.ensure_future(subscription.get(timeout=KEEPALIVE_INTERVAL))
+            done, _ = await asyncio.wait({receiver, getter}, return_when=asyncio.FIRST_COMPLETED)
+
+            if receiver in done:
+                receiver.result()
+                receiver = asyncio.ensure_future(websocket.receive_text())
+
+            if getter in done:
+                event = getter.result()
+                getter = None
+                await websocket.send_json(event if event is not None else {"type": "keep-alive"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        if getter is not None:
+            getter.cancel()
+        events.broker.unsubscribe(subscription)
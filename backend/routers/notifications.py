@@ -1,87 +1,78 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from security import get_current_active_user, is_admin, is_teacher
 from models import UserRole
-import os
-import json
+import notification_store
+import pagination
+import read_state
+import events
+import user_index
 from datetime import datetime
 import uuid
 from typing import List, Optional
 
 router = APIRouter()
 
-# Define file paths
-current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-data_dir = os.path.join(current_dir, 'data')
-NOTIFICATIONS_FILE = os.path.join(data_dir, 'notifications.json')
-USERS_FILE = os.path.join(data_dir, 'users.json')
 
-# Ensure notifications file exists
-if not os.path.exists(NOTIFICATIONS_FILE):
-    with open(NOTIFICATIONS_FILE, 'w') as f:
-        json.dump([], f)
-
-
-def get_users():
-    """Get all users from the database"""
-    if os.path.exists(USERS_FILE):
-        with open(USERS_FILE, 'r') as f:
-            return json.load(f)
-    return []
+@router.get("/")
+async def get_user_notifications(
+    limit: Optional[int] = Query(None, ge=1, le=pagination.MAX_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """
+    Get notifications for the current user, newest first, each with its read flag
+    Without limit the whole feed is returned as a list; with limit one page is
+    returned together with the cursor of the next page
+    """
+    try:
+        notifications, next_cursor = notification_store.get_feed(current_user, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    state = read_state.get_state(current_user)
+    notifications = [
+        {**notification, "read": read_state.is_read(state, notification["seq"])}
+        for notification in notifications
+    ]
+    
+    return pagination.page_response(notifications, limit, next_cursor, fields)
 
 
-def get_notifications():
-    """Get all notifications"""
-    if os.path.exists(NOTIFICATIONS_FILE):
-        with open(NOTIFICATIONS_FILE, 'r') as f:
-            return json.load(f)
-    return []
+@router.get("/unread-count")
+async def get_unread_count(current_user: dict = Depends(get_current_active_user)):
+    """Get the number of unread notifications for the current user"""
+    return {"unread_count": read_state.unread_count(current_user)}
 
 
-def save_notifications(notifications):
-    """Save notifications to file"""
-    with open(NOTIFICATIONS_FILE, 'w') as f:
-        json.dump(notifications, f, indent=4)
+@router.post("/read-all")
+async def mark_all_notifications_read(current_user: dict = Depends(get_current_active_user)):
+    """Mark all of the current user's notifications as read"""
+    read_state.mark_all_read(current_user)
+    return {"message": "All notifications marked as read"}
 
 
-@router.get("/")
-async def get_user_notifications(current_user: dict = Depends(get_current_active_user)):
-    """Get notifications for the current user"""
-    user_id = current_user.get("id")
-    role = current_user.get("role")
-    
-    all_notifications = get_notifications()
-    
-    # Filter notifications relevant to the user
-    user_notifications = []
-    
-    for notification in all_notifications:
-        # Check if the notification is for all users
-        if notification.get("target_type") == "all":
-            user_notifications.append(notification)
-        
-        # Check if the notification is for the user's role
-        elif notification.get("target_type") == "role" and notification.get("target_value") == role:
-            user_notifications.append(notification)
-        
-        # Check if the notification is specifically for this user
-        elif notification.get("target_type") == "user" and notification.get("target_value") == user_id:
-            user_notifications.append(notification)
-        
-        # For students, check if the notification is for their class
-        elif role == UserRole.STUDENT and notification.get("target_type") == "class":
-            student_info = current_user.get("student_info", {})
-            dept = student_info.get("department")
-            year = student_info.get("year")
-            div = student_info.get("division")
-            
-            target_class = notification.get("target_value", "")
-            if target_class == f"{dept}_{year}_{div}":
-                user_notifications.append(notification)
+@router.post("/{notification_id}/read")
+async def mark_notification_read(
+    notification_id: str,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Mark a notification as read for the current user"""
+    notification = notification_store.get_notification(notification_id)
+    if notification is None or not notification_store.is_visible(
+        notification["seq"], notification_store.user_target_keys(current_user)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Notification not found"
+        )
     
-    # Sort by date, newest first
-    user_notifications.sort(key=lambda x: x.get("created_at", ""), reverse=True)
+    read_state.mark_read(current_user, notification["seq"])
     
-    return user_notifications
+    return {"message": "Notification marked as read"}
 
 
 @router.post("/")
@@ -125,9 +116,7 @@ async def create_notification(
     
     # Validate user target
     if target_type == "user":
-        users = get_users()
-        user_ids = [user.get("id") for user in users]
-        if target_value not in user_ids:
+        if not user_index.user_exists(target_value):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid user ID"
@@ -146,9 +135,11 @@ async def create_notification(
     }
     
     # Save the notification
-    notifications = get_notifications()
-    notifications.append(new_notification)
-    save_notifications(notifications)
+    notification_store.add_notification(new_notification)
+    events.publish_notification(
+        new_notification,
+        notification_store.target_key(target_type, new_notification["target_value"])
+    )
     
     return {
         "message": "Notification created successfully",
@@ -168,23 +159,11 @@ async def delete_notification(
             detail="Not authorized to delete notifications"
         )
     
-    notifications = get_notifications()
-    
-    # Find the notification
-    notification_index = -1
-    for i, notification in enumerate(notifications):
-        if notification.get("id") == notification_id:
-            notification_index = i
-            break
-    
-    if notification_index == -1:
+    # Remove the notification
+    if not notification_store.remove_notification(notification_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Notification not found"
         )
     
-    # Remove the notification
-    del notifications[notification_index]
-    save_notifications(notifications)
-    
     return {"message": "Notification deleted successfully"}
@@ -1,13 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from fastapi.responses import StreamingResponse
-import pandas as pd
-import io
 import os
 import json
 from datetime import datetime, timedelta
 from typing import List, Optional
 from security import get_current_active_user, is_admin, is_teacher
 from models import UserRole
+import aggregates
+import report_cache
 
 router = APIRouter()
 
@@ -41,29 +41,9 @@ def get_students():
     return [user for user in users if user.get("role") == UserRole.STUDENT]
 
 
-@router.get("/monthly")
-async def get_monthly_report(
-    month: int = Query(..., description="Month (1-12)"),
-    year: int = Query(..., description="Year (e.g., 2025)"),
-    department: Optional[str] = None,
-    year_of_study: Optional[str] = None,
-    division: Optional[str] = None,
-    current_user: dict = Depends(get_current_active_user)
-):
-    """Generate a monthly attendance report"""
-    if not is_admin(current_user) and not is_teacher(current_user):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to access attendance reports"
-        )
-    
-    # Validate month and year
-    if month < 1 or month > 12:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid month. Must be between 1 and 12."
-        )
-    
+def _build_monthly_report(month, year, department, year_of_study, division):
+    """Build the monthly report payload"""
+    import report_engine  # pandas is loaded with the first report, not at startup
     # Get attendance records for the specified month and year
     attendance_history = load_attendance_history()
     
@@ -75,63 +55,25 @@ async def get_monthly_report(
     target_month_end = target_month_end.strftime("%Y-%m-%d")
     
     # Filter records for the specified month
-    filtered_records = [r for r in attendance_history 
-                       if r.get("date") >= target_month_start and r.get("date") <= target_month_end]
-    
-    # Apply additional filters if provided
-    if department:
-        filtered_records = [r for r in filtered_records if r.get("department") == department]
-    
-    if year_of_study:
-        filtered_records = [r for r in filtered_records if r.get("year") == year_of_study]
-    
-    if division:
-        filtered_records = [r for r in filtered_records if r.get("division") == division]
+    filtered_records = report_engine.filter_records(
+        attendance_history,
+        start_date=target_month_start,
+        end_date=target_month_end,
+        department=department,
+        year=year_of_study,
+        division=division
+    )
     
     if not filtered_records:
         return {"message": "No attendance records found for the specified criteria"}
     
-    # Collect all attendance data
-    all_data = []
+    # Load all attendance data in one pass and aggregate per student
+    combined_df = report_engine.load_frame(filtered_records)
     
-    for record in filtered_records:
-        attendance_file = os.path.join(ATTENDANCE_DIR, record.get("attendance_file", ""))
-        if os.path.exists(attendance_file):
-            try:
-                df = pd.read_csv(attendance_file)
-                
-                # Add additional information from the record
-                df["Date"] = record.get("date")
-                df["Subject"] = record.get("subject")
-                df["Teacher"] = record.get("teacher_name")
-                df["Department"] = record.get("department")
-                df["Year"] = record.get("year")
-                df["Division"] = record.get("division")
-                
-                all_data.append(df)
-            except Exception as e:
-                print(f"Error reading attendance file: {e}")
-    
-    if not all_data:
+    if combined_df.empty:
         return {"message": "No valid attendance data found for the specified criteria"}
     
-    # Combine all data
-    combined_df = pd.concat(all_data, ignore_index=True)
-    
-    # Group by student and calculate attendance statistics
-    student_stats = combined_df.groupby(["Student ID", "Name"]).agg(
-        total_classes=("Present", "count"),
-        present_count=("Present", "sum")
-    ).reset_index()
-    
-    # Calculate attendance percentage
-    student_stats["Attendance Percentage"] = (student_stats["present_count"] / student_stats["total_classes"] * 100).round(2)
-    
-    # Rename columns
-    student_stats = student_stats.rename(columns={
-        "total_classes": "Total Classes",
-        "present_count": "Classes Attended"
-    })
+    student_stats = report_engine.monthly_report(combined_df)
     
     # Prepare response data
     result = {
@@ -147,12 +89,122 @@ async def get_monthly_report(
     return result
 
 
+@router.get("/monthly")
+async def get_monthly_report(
+    request: Request,
+    month: int = Query(..., description="Month (1-12)"),
+    year: int = Query(..., description="Year (e.g., 2025)"),
+    department: Optional[str] = None,
+    year_of_study: Optional[str] = None,
+    division: Optional[str] = None,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Generate a monthly attendance report"""
+    if not is_admin(current_user) and not is_teacher(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access attendance reports"
+        )
+    
+    # Validate month and year
+    if month < 1 or month > 12:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid month. Must be between 1 and 12."
+        )
+    
+    return report_cache.cached_response(
+        request,
+        "monthly",
+        {
+            "month": month,
+            "year": year,
+            "department": department,
+            "year_of_study": year_of_study,
+            "division": division
+        },
+        report_cache.data_version(department, year_of_study, division),
+        lambda: _build_monthly_report(month, year, department, year_of_study, division)
+    )
+
+
+def _build_student_report(student, student_id, start_date, end_date, subject, include_details):
+    """Build the student report payload"""
+    import report_engine
+    # Summary-only reports over whole months are served from the materialized counters
+    span = aggregates.month_span(start_date, end_date)
+    if not include_details and span is not None:
+        counters = aggregates.get_student_aggregate(student_id) or {}
+        summary = aggregates.summarize(counters, subject=subject, start_month=span[0], end_month=span[1])
+        
+        if summary["total"] == 0:
+            return {
+                "message": "No attendance records found for this student",
+                "student_id": student_id,
+                "name": student.get("full_name")
+            }
+        
+        return {
+            "student_id": student_id,
+            "name": student.get("full_name"),
+            "department": student.get("student_info", {}).get("department"),
+            "year": student.get("student_info", {}).get("year"),
+            "division": student.get("student_info", {}).get("division"),
+            "overall_stats": {
+                "total_classes": summary["total"],
+                "classes_attended": summary["present"],
+                "attendance_percentage": round(summary["present"] / summary["total"] * 100, 2)
+            },
+            "subject_stats": [
+                {
+                    "Subject": name,
+                    "total_classes": stats["total"],
+                    "present_count": stats["present"],
+                    "attendance_percentage": round(stats["percentage"], 2)
+                }
+                for name, stats in summary["by_subject"].items()
+            ],
+            "detailed_attendance": []
+        }
+    
+    # Get attendance records
+    attendance_history = load_attendance_history()
+    filtered_records = report_engine.filter_records(
+        attendance_history,
+        start_date=start_date,
+        end_date=end_date,
+        subject=subject
+    )
+    
+    # Load this student's attendance rows in one pass
+    combined_df = report_engine.load_frame(filtered_records, student_id=student_id)
+    
+    if combined_df.empty:
+        return {
+            "message": "No attendance records found for this student",
+            "student_id": student_id,
+            "name": student.get("full_name")
+        }
+    
+    # Return the results
+    return {
+        "student_id": student_id,
+        "name": student.get("full_name"),
+        "department": student.get("student_info", {}).get("department"),
+        "year": student.get("student_info", {}).get("year"),
+        "division": student.get("student_info", {}).get("division"),
+        **report_engine.student_report(combined_df)
+    }
+
+
 @router.get("/student")
 async def get_student_report(
+    request: Request,
     student_id: str,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     subject: Optional[str] = None,
+    include_details: bool = True,
     current_user: dict = Depends(get_current_active_user)
 ):
     """Generate a report for a specific student"""
@@ -186,103 +238,31 @@ async def get_student_report(
             detail="Student not found"
         )
     
-    # Get attendance records
-    attendance_history = load_attendance_history()
-    
-    # Collect all attendance data for this student
-    all_data = []
-    
-    for record in attendance_history:
-        # Apply date filters if provided
-        if start_date and record.get("date") < start_date:
-            continue
-        
-        if end_date and record.get("date") > end_date:
-            continue
-        
-        # Apply subject filter if provided
-        if subject and record.get("subject") != subject:
-            continue
-        
-        attendance_file = os.path.join(ATTENDANCE_DIR, record.get("attendance_file", ""))
-        if os.path.exists(attendance_file):
-            try:
-                df = pd.read_csv(attendance_file)
-                
-                # Filter for this student
-                student_row = df[df["Student ID"] == student_id]
-                
-                if not student_row.empty:
-                    # Add additional information from the record
-                    student_row = student_row.copy()
-                    student_row["Date"] = record.get("date")
-                    student_row["Subject"] = record.get("subject")
-                    student_row["Teacher"] = record.get("teacher_name")
-                    student_row["Department"] = record.get("department")
-                    student_row["Year"] = record.get("year")
-                    student_row["Division"] = record.get("division")
-                    
-                    all_data.append(student_row)
-            except Exception as e:
-                print(f"Error reading attendance file: {e}")
-    
-    if not all_data:
-        return {
-            "message": "No attendance records found for this student",
+    student_info = student.get("student_info", {})
+    return report_cache.cached_response(
+        request,
+        "student",
+        {
             "student_id": student_id,
-            "name": student.get("full_name")
-        }
-    
-    # Combine all data
-    combined_df = pd.concat(all_data, ignore_index=True)
-    
-    # Calculate overall statistics
-    total_classes = len(combined_df)
-    classes_attended = combined_df["Present"].sum()
-    attendance_percentage = (classes_attended / total_classes * 100) if total_classes > 0 else 0
-    
-    # Group by subject
-    subject_stats = combined_df.groupby("Subject").agg(
-        total_classes=("Present", "count"),
-        present_count=("Present", "sum")
-    ).reset_index()
-    
-    # Calculate subject-wise attendance percentage
-    subject_stats["attendance_percentage"] = (subject_stats["present_count"] / subject_stats["total_classes"] * 100).round(2)
-    
-    # Group by date for detailed attendance
-    date_stats = combined_df[["Date", "Subject", "Present"]].copy()
-    date_stats["Status"] = date_stats["Present"].apply(lambda x: "Present" if x == 1 else "Absent")
-    date_stats = date_stats.drop("Present", axis=1)
-    
-    # Return the results
-    return {
-        "student_id": student_id,
-        "name": student.get("full_name"),
-        "department": student.get("student_info", {}).get("department"),
-        "year": student.get("student_info", {}).get("year"),
-        "division": student.get("student_info", {}).get("division"),
-        "overall_stats": {
-            "total_classes": total_classes,
-            "classes_attended": int(classes_attended),
-            "attendance_percentage": round(attendance_percentage, 2)
+            "start_date": start_date,
+            "end_date": end_date,
+            "subject": subject,
+            "include_details": include_details,
+            # The report shows the student's current name and class
+            "name": student.get("full_name"),
+            "department": student_info.get("department"),
+            "year": student_info.get("year"),
+            "division": student_info.get("division")
         },
-        "subject_stats": subject_stats.to_dict(orient="records"),
-        "detailed_attendance": date_stats.to_dict(orient="records")
-    }
+        # A student's sessions can come from earlier classes, so any session changes the report
+        report_cache.data_version(),
+        lambda: _build_student_report(student, student_id, start_date, end_date, subject, include_details)
+    )
 
 
-@router.get("/export/csv")
-async def export_attendance_report_csv(
-    department: str,
-    year: str,
-    division: str,
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
-    subject: Optional[str] = None,
-    current_user: dict = Depends(get_current_active_user)
-):
-    """Export attendance report as CSV"""
+def _export_pivot(department, year, division, start_date, end_date, subject, current_user):
+    """Select the records for an export and scan them into compact per-student marks"""
+    import report_engine
     if not is_admin(current_user) and not is_teacher(current_user):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -293,19 +273,15 @@ async def export_attendance_report_csv(
     attendance_history = load_attendance_history()
     
     # Filter records
-    filtered_records = [r for r in attendance_history 
-                       if r.get("department") == department and 
-                       r.get("year") == year and 
-                       r.get("division") == division]
-    
-    if start_date:
-        filtered_records = [r for r in filtered_records if r.get("date") >= start_date]
-    
-    if end_date:
-        filtered_records = [r for r in filtered_records if r.get("date") <= end_date]
-    
-    if subject:
-        filtered_records = [r for r in filtered_records if r.get("subject") == subject]
+    filtered_records = report_engine.filter_records(
+        attendance_history,
+        start_date=start_date,
+        end_date=end_date,
+        department=department,
+        year=year,
+        division=division,
+        subject=subject
+    )
     
     if not filtered_records:
         raise HTTPException(
@@ -313,55 +289,20 @@ async def export_attendance_report_csv(
             detail="No attendance records found for the specified criteria"
         )
     
-    # Collect all attendance data
-    all_data = []
+    # Students as rows, (date, subject) sessions as columns
+    pivot = report_engine.build_pivot_marks(filtered_records)
     
-    for record in filtered_records:
-        attendance_file = os.path.join(ATTENDANCE_DIR, record.get("attendance_file", ""))
-        if os.path.exists(attendance_file):
-            try:
-                df = pd.read_csv(attendance_file)
-                
-                # Add additional information from the record
-                df["Date"] = record.get("date")
-                df["Subject"] = record.get("subject")
-                df["Teacher"] = record.get("teacher_name")
-                
-                all_data.append(df)
-            except Exception as e:
-                print(f"Error reading attendance file: {e}")
-    
-    if not all_data:
+    if not len(pivot):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No valid attendance data found for the specified criteria"
         )
     
-    # Combine all data
-    combined_df = pd.concat(all_data, ignore_index=True)
-    
-    # Create a pivot table with dates as columns and students as rows
-    pivot_df = pd.pivot_table(
-        combined_df,
-        values="Present",
-        index=["Student ID", "Name"],
-        columns=["Date", "Subject"],
-        aggfunc="first",
-        fill_value="A"
-    )
-    
-    # Convert 1s to P (Present) and 0s to A (Absent)
-    pivot_df = pivot_df.applymap(lambda x: "P" if x == 1 else "A")
-    
-    # Reset index to make Student ID and Name regular columns
-    pivot_df = pivot_df.reset_index()
-    
-    # Create a buffer to hold the CSV data
-    buffer = io.StringIO()
-    pivot_df.to_csv(buffer, index=False)
-    buffer.seek(0)
-    
-    # Generate filename
+    return pivot
+
+
+def _export_filename(department, year, division, start_date, end_date, subject, extension):
+    """Generate the download filename for an export"""
     filename = f"attendance_report_{department}_{year}_{division}"
     if subject:
         filename += f"_{subject}"
@@ -369,11 +310,57 @@ async def export_attendance_report_csv(
         filename += f"_from_{start_date}"
     if end_date:
         filename += f"_to_{end_date}"
-    filename += ".csv"
+    return f"{filename}.{extension}"
+
+
+@router.get("/export/csv")
+async def export_attendance_report_csv(
+    department: str,
+    year: str,
+    division: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    subject: Optional[str] = None,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Export attendance report as CSV, streamed one chunk of students at a time"""
+    import report_engine
+    pivot = _export_pivot(department, year, division, start_date, end_date, subject, current_user)
+    filename = _export_filename(department, year, division, start_date, end_date, subject, "csv")
     
     # Return the CSV file as a downloadable attachment
     return StreamingResponse(
-        buffer,
+        report_engine.iter_pivot_csv(pivot),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
+
+
+@router.get("/export/xlsx")
+async def export_attendance_report_xlsx(
+    department: str,
+    year: str,
+    division: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    subject: Optional[str] = None,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Export attendance report as an Excel workbook"""
+    import report_engine
+    try:
+        import xlsxwriter  # noqa: F401
+    except ImportError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Excel export not available. Please install xlsxwriter."
+        )
+    
+    pivot = _export_pivot(department, year, division, start_date, end_date, subject, current_user)
+    filename = _export_filename(department, year, division, start_date, end_date, subject, "xlsx")
+    
+    return StreamingResponse(
+        report_engine.iter_pivot_xlsx(pivot),
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
 from security import get_current_active_user, is_admin, is_class_teacher
 from models import UserRole, StudentInfo
+import pagination
+import user_index
+import recognition
 import os
 import json
 import uuid
 import shutil
-from typing import List
+from typing import List, Optional
 
 router = APIRouter()
 
@@ -14,21 +17,8 @@ current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 data_dir = os.path.join(current_dir, 'data')
 USERS_FILE = os.path.join(data_dir, 'users.json')
 STUDENT_IMAGES_DIR = os.path.join(data_dir, 'student_images')
-
-# Ensure directories exist
-os.makedirs(STUDENT_IMAGES_DIR, exist_ok=True)
-
-
-def get_all_students():
-    """Get all students from the database"""
-    try:
-        if os.path.exists(USERS_FILE):
-            with open(USERS_FILE, 'r') as f:
-                users = json.load(f)
-                return [user for user in users if user.get("role") == UserRole.STUDENT]
-    except Exception as e:
-        print(f"Error fetching students: {e}")
-    return []
+# Extra enrollment photos, kept out of the top-level directory of primary photos
+STUDENT_TEMPLATES_DIR = os.path.join(STUDENT_IMAGES_DIR, 'templates')
 
 
 def save_users(users):
@@ -52,16 +42,28 @@ def get_student_by_id(student_id: str):
 
 
 @router.get("/")
-async def get_students(current_user: dict = Depends(get_current_active_user)):
-    """Get all students (accessible by admin, class teacher, or teacher)"""
+async def get_students(
+    limit: Optional[int] = Query(None, ge=1, le=pagination.MAX_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Get all students, paginated with limit/cursor (accessible by admin, class teacher, or teacher)"""
     if current_user.get("role") not in [UserRole.ADMIN, UserRole.CLASS_TEACHER, UserRole.TEACHER]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view students"
         )
     
-    students = get_all_students()
-    return students
+    try:
+        students, next_cursor = user_index.page_users([UserRole.STUDENT], limit, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return pagination.page_response(students, limit, next_cursor, fields)
 
 
 @router.get("/{student_id}")
@@ -169,6 +171,7 @@ async def upload_student_photo(
         # Save the uploaded file
         with open(file_path, "wb") as buffer:
             shutil.copyfileobj(photo.file, buffer)
+        recognition.photo_changed(file_path)
         
         # Update student info with photo filename
         with open(USERS_FILE, 'r') as f:
@@ -189,3 +192,106 @@ async def upload_student_photo(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error uploading photo: {str(e)}"
         )
+
+
+@router.post("/{student_id}/photos")
+async def add_student_photos(
+    student_id: str,
+    photos: List[UploadFile] = File(...),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Add enrollment photos to a student, used as extra recognition templates"""
+    if not is_admin(current_user) and not is_class_teacher(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to add photos for this student"
+        )
+    
+    student = get_student_by_id(student_id)
+    if not student:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Student not found"
+        )
+    
+    try:
+        os.makedirs(STUDENT_TEMPLATES_DIR, exist_ok=True)
+        photo_filename = (student.get("student_info", {}).get("photo_filename") or
+                          f"{student['full_name'].lower().replace(' ', '_')}.jpg")
+        added = []
+        for photo in photos:
+            template = f"templates/{os.path.splitext(photo_filename)[0]}_{uuid.uuid4().hex[:8]}.jpg"
+            with open(os.path.join(STUDENT_IMAGES_DIR, template), "wb") as buffer:
+                shutil.copyfileobj(photo.file, buffer)
+            added.append(template)
+        
+        # Update student info with the template filenames
+        with open(USERS_FILE, 'r') as f:
+            users = json.load(f)
+        
+        templates = []
+        for user in users:
+            if user.get("id") == student_id:
+                templates = user.setdefault("student_info", {}).setdefault("templates", [])
+                templates.extend(added)
+                break
+        
+        save_users(users)
+        
+        return {"message": "Photos added successfully", "templates": templates}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error adding photos: {str(e)}"
+        )
+
+
+@router.delete("/{student_id}/photos/{template}")
+async def delete_student_photo(
+    student_id: str,
+    template: str,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Remove an extra enrollment photo from a student"""
+    if not is_admin(current_user) and not is_class_teacher(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to remove photos for this student"
+        )
+    
+    student = get_student_by_id(student_id)
+    if not student:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Student not found"
+        )
+    if f"templates/{template}" not in student.get("student_info", {}).get("templates", []):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Photo not found"
+        )
+    
+    try:
+        file_path = os.path.join(STUDENT_TEMPLATES_DIR, template)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        
+        with open(USERS_FILE, 'r') as f:
+            users = json.load(f)
+        
+        templates = []
+        for user in users:
+            if user.get("id") == student_id:
+                templates = user.get("student_info", {}).get("templates", [])
+                if f"templates/{template}" in templates:
+                    templates.remove(f"templates/{template}")
+                break
+        
+        save_users(users)
+        
+        return {"message": "Photo removed successfully", "templates": templates}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error removing photo: {str(e)}"
+        )
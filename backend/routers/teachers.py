@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from security import get_current_active_user, is_admin
 from models import UserRole, TeacherInfo
+import pagination
+import user_index
 import os
 import json
 import uuid
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 router = APIRouter()
 
@@ -15,18 +17,6 @@ data_dir = os.path.join(current_dir, 'data')
 USERS_FILE = os.path.join(data_dir, 'users.json')
 
 
-def get_all_teachers():
-    """Get all teachers from the database"""
-    try:
-        if os.path.exists(USERS_FILE):
-            with open(USERS_FILE, 'r') as f:
-                users = json.load(f)
-                return [user for user in users if user.get("role") in [UserRole.TEACHER, UserRole.CLASS_TEACHER]]
-    except Exception as e:
-        print(f"Error fetching teachers: {e}")
-    return []
-
-
 def save_users(users):
     """Save users to the database file"""
     with open(USERS_FILE, 'w') as f:
@@ -48,16 +38,28 @@ def get_teacher_by_id(teacher_id: str):
 
 
 @router.get("/")
-async def get_teachers(current_user: dict = Depends(get_current_active_user)):
-    """Get all teachers (accessible by admin or teachers)"""
+async def get_teachers(
+    limit: Optional[int] = Query(None, ge=1, le=pagination.MAX_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Get all teachers, paginated with limit/cursor (accessible by admin or teachers)"""
     if current_user.get("role") not in [UserRole.ADMIN, UserRole.CLASS_TEACHER, UserRole.TEACHER]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view teachers"
         )
     
-    teachers = get_all_teachers()
-    return teachers
+    try:
+        teachers, next_cursor = user_index.page_users([UserRole.TEACHER, UserRole.CLASS_TEACHER], limit, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return pagination.page_response(teachers, limit, next_cursor, fields)
 
 
 @router.get("/{teacher_id}")
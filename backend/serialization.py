@@ -0,0 +1,81 @@
+import json
+from datetime import date, datetime, time
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    # Without orjson, responses are rendered with the standard json module
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Convert values the JSON encoder does not handle natively"""
+    if hasattr(value, "dict"):
+        return value.dict()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if hasattr(value, "tolist"):
+        # numpy arrays and scalars
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize already JSON-shaped content to bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered directly with orjson
+    Returning it from an endpoint skips response_model validation and jsonable_encoder,
+    so it is only for trusted data that is already JSON-shaped
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def fast_response(content: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> FastJSONResponse:
+    """Wrap trusted content in a FastJSONResponse"""
+    return FastJSONResponse(content=content, status_code=status_code, headers=headers)
+
+
+class RecordType:
+    """
+    Pre-validated record layout for trusted internal data
+    Shapes stored dicts to a response model's fields (with the model's defaults for
+    missing keys) without constructing or validating a model per item. Use it only
+    for data that was validated when it was written
+    """
+
+    def __init__(self, fields: Sequence[str], defaults: Optional[Dict[str, Any]] = None):
+        self.fields = tuple(fields)
+        self.defaults = defaults or {}
+
+    @classmethod
+    def from_model(cls, model) -> "RecordType":
+        """Take the field names and defaults of a pydantic model"""
+        defaults = {
+            name: field.get_default()
+            for name, field in model.__fields__.items()
+            if not field.required
+        }
+        return cls(list(model.__fields__), defaults)
+
+    def shape(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        defaults = self.defaults
+        return {name: item[name] if name in item else defaults.get(name) for name in self.fields}
+
+    def shape_all(self, items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [self.shape(item) for item in items]
@@ -7,6 +7,7 @@ from datetime import datetime
 from models import User, StudentInfo, Role
 from security import get_current_active_user, is_admin, is_class_teacher
 import database as db
+import recognition
 
 router = APIRouter(tags=["student-management"])
 
@@ -15,6 +16,8 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 data_dir = os.path.join(current_dir, 'data')
 base_dirs = {
     'student_images': os.path.join(data_dir, 'student_images'),
+    # Extra enrollment photos, kept out of the top-level directory of primary photos
+    'student_templates': os.path.join(data_dir, 'student_images', 'templates'),
 }
 
 
@@ -48,6 +51,7 @@ async def register_student(
         contents = await photo.read()
         with open(filepath, "wb") as f:
             f.write(contents)
+        recognition.photo_changed(filepath)
         
         # Update storage
         storage = db.load_storage()
@@ -148,6 +152,7 @@ async def get_student(
                 'division': data.get('division'),
                 'subjects': data.get('subjects', []),
                 'photo': filename,
+                'templates': data.get('templates', []),
                 'registered_date': data.get('registered_date')
             }
     
@@ -238,6 +243,7 @@ async def update_student(
                 filepath = os.path.join(base_dirs['student_images'], target_filename)
                 with open(filepath, "wb") as f:
                     f.write(contents)
+                recognition.photo_changed(filepath)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error updating photo: {str(e)}")
     
@@ -256,6 +262,88 @@ async def update_student(
     }
 
 
+def find_student_filename(storage, student_id: str) -> Optional[str]:
+    """The students_data key (primary photo filename) of a student"""
+    for filename, data in storage.get('students_data', {}).items():
+        if data.get('id') == student_id:
+            return filename
+    return None
+
+
+@router.post("/students/{student_id}/photos")
+async def add_student_photos(
+    student_id: str,
+    photos: List[UploadFile] = File(...),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Add enrollment photos to a student, used as extra recognition templates
+    Only admin or class teachers can add photos
+    """
+    if not (is_admin(current_user) or is_class_teacher(current_user)):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators and class teachers can add student photos"
+        )
+    
+    storage = db.load_storage()
+    target_filename = find_student_filename(storage, student_id)
+    if not target_filename:
+        raise HTTPException(status_code=404, detail="Student not found")
+    
+    try:
+        os.makedirs(base_dirs['student_templates'], exist_ok=True)
+        student_data = storage['students_data'][target_filename]
+        templates = student_data.setdefault('templates', [])
+        for photo in photos:
+            template = f"templates/{target_filename.split('.')[0]}_{uuid.uuid4().hex[:8]}.jpg"
+            contents = await photo.read()
+            with open(os.path.join(base_dirs['student_images'], template), "wb") as f:
+                f.write(contents)
+            templates.append(template)
+        
+        db.save_storage(storage)
+        return {'student_id': student_id, 'photo': target_filename, 'templates': templates}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error adding photos: {str(e)}")
+
+
+@router.delete("/students/{student_id}/photos/{template}")
+async def delete_student_photo(
+    student_id: str,
+    template: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Remove an extra enrollment photo from a student
+    Only admin or class teachers can remove photos
+    """
+    if not (is_admin(current_user) or is_class_teacher(current_user)):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators and class teachers can remove student photos"
+        )
+    
+    storage = db.load_storage()
+    target_filename = find_student_filename(storage, student_id)
+    if not target_filename:
+        raise HTTPException(status_code=404, detail="Student not found")
+    
+    templates = storage['students_data'][target_filename].get('templates', [])
+    if f"templates/{template}" not in templates:
+        raise HTTPException(status_code=404, detail="Photo not found")
+    
+    try:
+        filepath = os.path.join(base_dirs['student_templates'], template)
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        templates.remove(f"templates/{template}")
+        db.save_storage(storage)
+        return {'student_id': student_id, 'photo': target_filename, 'templates': templates}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error removing photo: {str(e)}")
+
+
 @router.delete("/students/{student_id}")
 async def delete_student(
     student_id: str,
@@ -292,6 +380,13 @@ async def delete_student(
         if os.path.exists(filepath):
             os.remove(filepath)
         
+        # Remove the extra enrollment photos and captured templates
+        for template in storage['students_data'][target_filename].get('templates', []):
+            template_path = os.path.join(base_dirs['student_images'], template)
+            if os.path.exists(template_path):
+                os.remove(template_path)
+        recognition.forget_student(student_id)
+        
         # Remove from students list
         if target_filename in storage['students']:
             storage['students'].remove(target_filename)
@@ -0,0 +1,34 @@
+"""ONNX backend against DeepFace, checked with benchmarks/check_backend_parity.py"""
+import os
+import sys
+import subprocess
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from recognition import config, faces  # noqa: E402
+
+IMAGES_DIR = os.path.join(BACKEND_DIR, "data", "student_images")
+
+
+def test_onnx_backend_matches_deepface():
+    pytest.importorskip("deepface")
+    pytest.importorskip("onnxruntime")
+    missing = [name for name in (config.ONNX_RECOGNIZER, config.ONNX_DETECTOR)
+               if not os.path.exists(os.path.join(config.MODEL_DIR, name))]
+    if missing:
+        pytest.skip(f"ONNX models not in {config.MODEL_DIR}: {', '.join(missing)}")
+    # The student photos are not in the repository
+    if not os.path.isdir(IMAGES_DIR) or not any(name.lower().endswith(faces.PHOTO_EXTENSIONS)
+                                                for name in os.listdir(IMAGES_DIR)):
+        pytest.skip(f"No photos in {IMAGES_DIR}")
+
+    result = subprocess.run(
+        [sys.executable, os.path.join("benchmarks", "check_backend_parity.py"), "--backend", "onnx"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
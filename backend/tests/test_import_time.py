@@ -0,0 +1,62 @@
+"""Startup import cost, checked against the budget of benchmarks/bench_import_time.py"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import bench_import_time  # noqa: E402
+
+REPEATS = 3
+
+
+def best_import(module):
+    """-X importtime entries of the fastest of REPEATS imports of a module, and the import error if any"""
+    best = None
+    for _ in range(REPEATS):
+        entries, error = bench_import_time.measure(module)
+        if error:
+            return None, error
+        total_us = sum(cumulative for depth, _, cumulative in entries if depth == 0)
+        if best is None or total_us < best[0]:
+            best = (total_us, entries)
+    return best[1], None
+
+
+@pytest.fixture(scope="module")
+def recognition_import():
+    entries, error = best_import("recognition")
+    assert error is None, f"import recognition failed:\n{error}"
+    return entries
+
+
+@pytest.fixture(scope="module")
+def main_import():
+    pytest.importorskip("fastapi")
+    entries, error = best_import("main")
+    if error:
+        # The app's own import problems are not what this checks; the recognition test still runs
+        pytest.skip(f"import main failed: {error.strip().splitlines()[-1]}")
+    return entries
+
+
+def eager_modules(entries):
+    imported = {name.split(".")[0] for _, name, _ in entries}
+    return [name for name in bench_import_time.LAZY_MODULES if name in imported]
+
+
+def total_ms(entries):
+    return sum(cumulative for depth, _, cumulative in entries if depth == 0) / 1000
+
+
+def test_recognition_stack_stays_lazy(recognition_import):
+    assert eager_modules(recognition_import) == []
+
+
+def test_main_stays_lazy(main_import):
+    assert eager_modules(main_import) == []
+
+
+def test_main_within_budget(main_import):
+    assert total_ms(main_import) <= bench_import_time.DEFAULT_BUDGET_MS
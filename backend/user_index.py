@@ -0,0 +1,115 @@
+import os
+import json
+import heapq
+import threading
+from bisect import bisect_right
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pagination
+
+# Define file paths
+current_dir = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.join(current_dir, 'data')
+USERS_FILE = os.path.join(data_dir, 'users.json')
+
+_lock = threading.Lock()
+_state = {'mtime': None, 'users': [], 'by_id': {}, 'positions': {}, 'by_role': {}}
+
+
+def _load() -> Dict[str, Any]:
+    """Reload users.json and rebuild the indexes only when the file has changed"""
+    with _lock:
+        if not os.path.exists(USERS_FILE):
+            _state.update({'mtime': None, 'users': [], 'by_id': {}, 'positions': {}, 'by_role': {}})
+            return _state
+
+        mtime = os.path.getmtime(USERS_FILE)
+        if _state['mtime'] != mtime:
+            try:
+                with open(USERS_FILE, 'r') as f:
+                    users = json.load(f)
+            except Exception as e:
+                print(f"Error fetching users: {e}")
+                return _state
+
+            # Each role keeps its users' file positions and the users, in file order
+            by_role = {}
+            for position, user in enumerate(users):
+                positions, members = by_role.setdefault(user.get("role"), ([], []))
+                positions.append(position)
+                members.append(user)
+
+            _state['users'] = users
+            _state['by_id'] = {user.get("id"): user for user in users}
+            _state['positions'] = {user.get("id"): position for position, user in enumerate(users)}
+            _state['by_role'] = by_role
+            _state['mtime'] = mtime
+        return _state
+
+
+def get_users() -> List[Dict[str, Any]]:
+    """Get all users (shared in-process copy, do not modify)"""
+    return _load()['users']
+
+
+def get_user(user_id: str) -> Optional[Dict[str, Any]]:
+    """Get a user by ID using the id index"""
+    return _load()['by_id'].get(user_id)
+
+
+def user_exists(user_id: str) -> bool:
+    """Check whether a user ID exists using the id index"""
+    return user_id in _load()['by_id']
+
+
+def get_users_by_role(*roles: str) -> List[Dict[str, Any]]:
+    """Get the users with any of the given roles, in file order"""
+    users, _ = page_users(roles)
+    return users
+
+
+def _after(positions: List[int], members: List[Dict[str, Any]], start: int):
+    for index in range(bisect_right(positions, start), len(members)):
+        yield positions[index], members[index]
+
+
+def page_users(roles: Optional[Iterable[str]] = None, limit: Optional[int] = None,
+               cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Get one page of users, optionally restricted to some roles, in file order
+    Only the role lists involved are walked, starting just after the cursor, and
+    at most limit + 1 users are visited. Raises ValueError for an invalid cursor
+    """
+    start = -1
+    if cursor:
+        decoded = pagination.decode_cursor(cursor)
+        if not isinstance(decoded, list) or len(decoded) != 2 or not isinstance(decoded[0], int):
+            raise ValueError("Invalid cursor")
+        last_position, last_id = decoded
+
+    _load()
+    with _lock:
+        users, positions, by_role = _state['users'], _state['positions'], _state['by_role']
+
+    if cursor:
+        # Follow the last user if it moved; fall back to its old position if it was deleted
+        start = positions.get(last_id, last_position)
+
+    if roles is None:
+        streams = [((position, users[position]) for position in range(start + 1, len(users)))]
+    else:
+        # Accept Role enum members as well as plain role strings
+        roles = {getattr(role, "value", role) for role in roles}
+        streams = [_after(*by_role[role], start) for role in roles if role in by_role]
+
+    merged = heapq.merge(*streams, key=lambda entry: entry[0])
+    if limit is None:
+        return [user for _, user in merged], None
+
+    page = list(islice(merged, limit + 1))
+    if len(page) > limit:
+        page = page[:limit]
+        position, user = page[-1]
+        return [user for _, user in page], pagination.encode_cursor([position, user.get("id")])
+    return [user for _, user in page], None